@@ -6,7 +6,8 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
-from .models import User, Producer
+from .bulk import bulk_update_producers, bulk_update_users
+from .models import DailySignupStat, User, Producer
 
 
 @admin.register(User)
@@ -125,7 +126,7 @@ class UserAdmin(BaseUserAdmin):
     # Custom actions
     def make_verified(self, request, queryset):
         """Mark selected users as verified."""
-        updated = queryset.update(is_verified=True)
+        updated = bulk_update_users(queryset, is_verified=True)
         self.message_user(
             request,
             f'{updated} user(s) marked as verified.'
@@ -135,7 +136,7 @@ class UserAdmin(BaseUserAdmin):
 
     def make_unverified(self, request, queryset):
         """Mark selected users as unverified."""
-        updated = queryset.update(is_verified=False)
+        updated = bulk_update_users(queryset, is_verified=False)
         self.message_user(
             request,
             f'{updated} user(s) marked as unverified.'
@@ -145,7 +146,7 @@ class UserAdmin(BaseUserAdmin):
 
     def activate_users(self, request, queryset):
         """Activate selected users."""
-        updated = queryset.update(is_active=True)
+        updated = bulk_update_users(queryset, is_active=True)
         self.message_user(
             request,
             f'{updated} user(s) activated.'
@@ -155,7 +156,7 @@ class UserAdmin(BaseUserAdmin):
 
     def deactivate_users(self, request, queryset):
         """Deactivate selected users."""
-        updated = queryset.update(is_active=False)
+        updated = bulk_update_users(queryset, is_active=False)
         self.message_user(
             request,
             f'{updated} user(s) deactivated.'
@@ -197,9 +198,35 @@ class ProducerAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
+    actions = ['make_verified', 'make_unverified']
+    
+    @admin.action(description='Marquer comme vérifiés')
+    def make_verified(self, request, queryset):
+        updated = bulk_update_producers(queryset, is_verified=True)
+        self.message_user(request, f'{updated} producteur(s) vérifié(s).')
+    
+    @admin.action(description='Marquer comme non vérifiés')
+    def make_unverified(self, request, queryset):
+        updated = bulk_update_producers(queryset, is_verified=False)
+        self.message_user(request, f'{updated} producteur(s) marqué(s) comme non vérifié(s).')
+
+
+@admin.register(DailySignupStat)
+class DailySignupStatAdmin(admin.ModelAdmin):
+    """Read-only view of the daily sign-up rollup."""
+
+    list_display = ('date', 'user_type', 'count')
+    list_filter = ('user_type',)
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # Customize admin site
 admin.site.site_header = 'GreenCart Administration'
 admin.site.site_title = 'GreenCart Admin'
-admin.site.index_title = 'Dashboard'
\ No newline at end of file
+admin.site.index_title = 'Dashboard'
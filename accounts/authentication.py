@@ -0,0 +1,168 @@
+"""
+Token authentication backed by a short-lived cache.
+
+DRF's ``TokenAuthentication`` runs a Token/User query on every request.
+``CachedTokenAuthentication`` keeps a snapshot of the user's identity and
+flags (``SNAPSHOT_FIELDS``, never the password hash) and of their producer
+profile, or its absence (``PRODUCER_SNAPSHOT_FIELDS``), in the cache for
+``AUTH_TOKEN_CACHE_TIMEOUT`` seconds, expires tokens after
+``AUTH_TOKEN_TTL`` and slides the expiry forward at most once per
+``AUTH_TOKEN_REFRESH_INTERVAL``. Other fields of ``request.user`` are
+loaded on first access.
+
+Entries are dropped when the user or their producer profile is saved or
+deleted (password change, deactivation, new producer...) or the token is
+deleted, see ``accounts.signals``. The
+snapshot is only cached when the cache is shared by every worker
+(``core.caches.cache_is_shared``): with a per-process cache a logout would
+stay valid in the other workers until the entry expires.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.caches import cache_is_shared
+from core.metrics import record_cache_lookup
+
+from .models import Producer
+from .roles import get_producer
+
+# Champs du snapshot mis en cache : identité et drapeaux de permission
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'user_type',
+    'is_active', 'is_staff', 'is_superuser', 'is_verified',
+)
+# Profil producteur : de quoi filtrer par producteur sans requête (get_producer)
+PRODUCER_SNAPSHOT_FIELDS = ('id', 'user_id', 'is_verified')
+
+
+def token_cache_key(key):
+    """Cache key for a token; the raw token never appears in the cache."""
+    return 'auth:token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def invalidate_token(key):
+    """Drop the cached snapshot for a token key."""
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user_ids):
+    """Drop the cached snapshots of several users with one query and one cache call."""
+    keys = Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def token_expired(created, now=None):
+    """True if a token created (or last refreshed) at ``created`` has expired."""
+    ttl = settings.AUTH_TOKEN_TTL
+    if not ttl:
+        return False
+    return (now or timezone.now()) - created > timedelta(seconds=ttl)
+
+
+def get_valid_token(user):
+    """
+    Return the user's token, replacing it first if it has expired.
+
+    Used by login and registration instead of ``Token.objects.get_or_create``
+    so an expired token is rotated rather than handed out again.
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token.created):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def token_cache_timeout():
+    """Snapshot lifetime in seconds; 0 when the cache is private to this process."""
+    return settings.AUTH_TOKEN_CACHE_TIMEOUT if cache_is_shared() else 0
+
+
+def user_snapshot(user):
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    producer = get_producer(user)
+    snapshot['producer'] = producer and {
+        field: getattr(producer, field) for field in PRODUCER_SNAPSHOT_FIELDS
+    }
+    return snapshot
+
+
+def instance_from_snapshot(model, fields):
+    """A ``model`` instance with the snapshot fields set; the others are deferred."""
+    # from_db attend les valeurs dans l'ordre des champs du modèle
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in fields]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+
+
+def user_from_snapshot(fields):
+    """A User from its snapshot, with the producer profile (or its absence) cached."""
+    model = get_user_model()
+    user = instance_from_snapshot(model, fields)
+    producer = fields.get('producer')
+    if producer is not None:
+        producer = instance_from_snapshot(Producer, producer)
+        Producer._meta.get_field('user').set_cached_value(producer, user)
+    model._meta.get_field('producer_profile').set_cached_value(user, producer)
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``Authorization: Token <key>`` resolved through the cache."""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        now = timezone.now()
+        use_cache = token_cache_timeout() > 0
+
+        snapshot = cache.get(cache_key) if use_cache else None
+        store = snapshot is None
+        if use_cache:
+            record_cache_lookup('auth_token', not store)
+        if store:
+            try:
+                token = Token.objects.select_related(
+                    'user__producer_profile'
+                ).get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            user = token.user
+            snapshot = {'user': user_snapshot(user), 'created': token.created}
+        else:
+            user = user_from_snapshot(snapshot['user'])
+        created = snapshot['created']
+
+        if not user.is_active:
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        if token_expired(created, now):
+            Token.objects.filter(key=key).delete()
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        # Expiration glissante : au plus une écriture par intervalle
+        if now - created > timedelta(seconds=settings.AUTH_TOKEN_REFRESH_INTERVAL):
+            Token.objects.filter(key=key).update(created=now)
+            snapshot['created'] = created = now
+            store = True
+
+        if store and use_cache:
+            self._store(cache_key, snapshot, now)
+
+        return user, Token(key=key, user=user, created=created)
+
+    def _store(self, cache_key, snapshot, now):
+        timeout = token_cache_timeout()
+        if settings.AUTH_TOKEN_TTL:
+            remaining = settings.AUTH_TOKEN_TTL - (now - snapshot['created']).total_seconds()
+            timeout = max(1, min(timeout, int(remaining)))
+        cache.set(cache_key, snapshot, timeout)
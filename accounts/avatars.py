@@ -0,0 +1,160 @@
+"""
+Avatar processing for GreenCart users.
+
+Uploaded avatars are kept as-is and an outbox event is published; the
+``process_outbox`` worker then crops them to squares and writes one JPEG
+per size in ``AVATAR_SIZES`` under a versioned path. Variants are served
+through ``avatar_variant`` with immutable caching, since a new upload gets
+a new version (and URL). Users without an avatar get an initials
+placeholder rendered locally and cached by a hash of the initials.
+"""
+import colorsys
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from core.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+AVATAR_UPLOADED = 'user.avatar_uploaded'
+
+# Un an : les URLs des variantes changent à chaque nouvel envoi
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def variant_path(user_id, version, size):
+    """Storage path of one processed avatar variant."""
+    return f'avatars/variants/{user_id}/v{version}/{size}.jpg'
+
+
+def closest_size(size):
+    """The configured size closest to (and preferably not below) ``size``."""
+    sizes = sorted(settings.AVATAR_SIZES)
+    for candidate in sizes:
+        if candidate >= size:
+            return candidate
+    return sizes[-1]
+
+
+def render_variants(source, sizes):
+    """
+    Yield ``(size, jpeg_bytes)`` square crops of an image file.
+
+    JPEG sources are decoded at reduced scale with ``Image.draft`` so large
+    photos are never fully expanded in memory.
+    """
+    with Image.open(source) as image:
+        image.draft('RGB', (max(sizes) * 2, max(sizes) * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        square = ImageOps.fit(image, (max(sizes), max(sizes)), Image.Resampling.LANCZOS)
+    for size in sorted(sizes, reverse=True):
+        variant = square if size == square.width else square.resize((size, size), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        variant.save(buffer, 'JPEG', quality=settings.AVATAR_JPEG_QUALITY, optimize=True, progressive=True)
+        yield size, buffer.getvalue()
+
+
+def process_avatar(user):
+    """
+    Write the variants of the user's current avatar under the next version.
+
+    ``avatar_version`` only ever grows, so every processed upload gets new
+    URLs. The version is only bumped if neither the avatar nor the version
+    changed meanwhile; returns the new version, or None if there was
+    nothing to do.
+    """
+    from .models import User
+
+    if not user.avatar:
+        return None
+
+    version = user.avatar_version + 1
+    with user.avatar.open('rb') as source:
+        for size, content in render_variants(source, settings.AVATAR_SIZES):
+            path = variant_path(user.pk, version, size)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(content))
+
+    updated = User.objects.filter(
+        pk=user.pk, avatar=user.avatar.name, avatar_version=user.avatar_version
+    ).update(avatar_version=version, avatar_processed=True)
+    if not updated:
+        return None
+
+    # Supprimer les variantes de la version précédente (best effort)
+    for size in settings.AVATAR_SIZES if user.avatar_version else ():
+        try:
+            default_storage.delete(variant_path(user.pk, user.avatar_version, size))
+        except OSError:
+            pass
+    return version
+
+
+def process_avatar_event(event):
+    """Outbox handler for ``user.avatar_uploaded``."""
+    from .models import User
+
+    user = User.objects.filter(pk=event.aggregate_id).first()
+    if user is None or user.avatar.name != event.payload.get('avatar'):
+        # Utilisateur supprimé ou avatar remplacé depuis : un autre événement suivra
+        return
+    if user.avatar_processed:
+        # Événement livré une seconde fois
+        return
+    version = process_avatar(user)
+    logger.info("Processed avatar of user %s (version %s)", user.pk, version)
+
+
+def initials_for(user):
+    """One or two upper-case initials for a user."""
+    parts = [user.first_name, user.last_name] if (user.first_name or user.last_name) else [user.username or user.email]
+    initials = ''.join(part.strip()[0] for part in parts if part and part.strip())
+    return (initials or '?')[:2].upper()
+
+
+def _background_color(initials):
+    """Stable, readable background color derived from the initials."""
+    digest = hashlib.sha256(initials.encode('utf-8')).digest()
+    red, green, blue = colorsys.hls_to_rgb(digest[0] / 255, 0.4, 0.5)
+    return int(red * 255), int(green * 255), int(blue * 255)
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, OSError):
+        # Pillow sans FreeType : police bitmap de taille fixe
+        return ImageFont.load_default()
+
+
+def render_placeholder(initials, size):
+    """PNG bytes of an initials avatar."""
+    image = Image.new('RGB', (size, size), _background_color(initials))
+    draw = ImageDraw.Draw(image)
+    draw.text(
+        (size / 2, size / 2), initials, fill='white',
+        font=_font(int(size * 0.42)), anchor='mm'
+    )
+    buffer = BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def placeholder_png(initials, size):
+    """Cached ``render_placeholder``; the cache key is a hash of initials and size."""
+    digest = hashlib.sha256(f'{initials}:{size}'.encode('utf-8')).hexdigest()
+    cache_key = f'avatar:placeholder:{digest}'
+    content = cache.get(cache_key)
+    record_cache_lookup('avatar_placeholder', content is not None)
+    if content is None:
+        content = render_placeholder(initials, size)
+        cache.set(cache_key, content, 60 * 60 * 24)
+    return content
@@ -0,0 +1,75 @@
+"""
+Set-based bulk operations on users and producers.
+
+``queryset.update()`` skips ``save()`` and the ``post_save`` receivers, so
+these helpers do their side effects once per batch instead: one UPDATE,
+one token-cache invalidation, one stats invalidation, one catalog-cache
+invalidation, one outbox event and one ``users_bulk_updated`` signal after
+commit.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from api.outbox import publish_event
+from products.cache import invalidate_catalog
+
+from .authentication import invalidate_user_tokens
+from .models import Producer, User
+from .stats import invalidate_user_stats
+
+# Sent after commit with `user_ids` (list) and `changes` (dict of field -> value)
+users_bulk_updated = Signal()
+
+USERS_BULK_UPDATED = 'users.bulk_updated'
+PRODUCERS_BULK_UPDATED = 'producers.bulk_updated'
+
+
+def bulk_update_users(queryset, **changes):
+    """Apply ``changes`` to every user in ``queryset``; returns the number updated."""
+    with transaction.atomic():
+        user_ids = list(queryset.values_list('pk', flat=True))
+        if not user_ids:
+            return 0
+        updated = User.objects.filter(pk__in=user_ids).update(
+            updated_at=timezone.now(), **changes
+        )
+        publish_event(USERS_BULK_UPDATED, User._meta.label, 'batch', {
+            'user_ids': user_ids,
+            'changes': changes,
+        })
+        transaction.on_commit(lambda: _after_users_update(user_ids, changes))
+    return updated
+
+
+def _after_users_update(user_ids, changes):
+    invalidate_user_tokens(user_ids)
+    invalidate_user_stats()
+    # Les producteurs (et leur compte) sont affichés dans le catalogue
+    invalidate_catalog()
+    users_bulk_updated.send(sender=User, user_ids=user_ids, changes=changes)
+
+
+def bulk_update_producers(queryset, **changes):
+    """Apply ``changes`` to every producer in ``queryset``; returns the number updated."""
+    with transaction.atomic():
+        rows = list(queryset.values_list('pk', 'user_id'))
+        if not rows:
+            return 0
+        producer_ids = [producer_id for producer_id, _user_id in rows]
+        user_ids = [user_id for _producer_id, user_id in rows]
+        updated = Producer.objects.filter(pk__in=producer_ids).update(
+            updated_at=timezone.now(), **changes
+        )
+        publish_event(PRODUCERS_BULK_UPDATED, Producer._meta.label, 'batch', {
+            'producer_ids': producer_ids,
+            'changes': changes,
+        })
+        # is_verified est dans l'instantané des tokens ; les producteurs, dans le catalogue
+        transaction.on_commit(lambda: _after_producers_update(user_ids))
+    return updated
+
+
+def _after_producers_update(user_ids):
+    invalidate_user_tokens(user_ids)
+    invalidate_catalog()
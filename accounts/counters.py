@@ -0,0 +1,91 @@
+"""
+Denormalized producer counters.
+
+``Producer.active_products_count``, ``orders_count`` and
+``catalog_updated_at`` let the producer directory list producers without
+counting products and orders per row. They are maintained on product
+changes (``products.signals``) and after checkout, and can be recomputed
+with ``manage.py reconcile_producer_counters``.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.db import atomic_with_retry
+from orders.models import SubOrder
+from products.models import Product
+
+from .models import Producer
+
+
+def _count_subquery(queryset):
+    """Correlated COUNT(*) of ``queryset`` rows for the outer producer."""
+    counts = (
+        queryset.filter(producer=OuterRef('pk'))
+        .order_by()
+        .values('producer')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def active_products_subquery():
+    return _count_subquery(Product.objects.filter(is_active=True))
+
+
+def orders_subquery():
+    return _count_subquery(SubOrder.objects.all())
+
+
+def refresh_catalog_counters(producer_id):
+    """Recount one producer's active products and mark its catalog as updated."""
+    Producer.objects.filter(pk=producer_id).update(
+        active_products_count=active_products_subquery(),
+        catalog_updated_at=timezone.now()
+    )
+
+
+def increment_orders_count(producer_ids):
+    """Count one more order for each producer (one UPDATE)."""
+    Producer.objects.filter(pk__in=producer_ids).update(orders_count=F('orders_count') + 1)
+
+
+def increment_orders_count_on_commit(producer_ids):
+    """
+    Run ``increment_orders_count`` once the current transaction commits.
+
+    Every checkout for a producer writes the same producer row; doing it
+    inside the SERIALIZABLE checkout makes concurrent checkouts abort each
+    other. The increment runs in its own short, retried transaction
+    instead. A lost increment (crash, retries exhausted) is logged and
+    fixed by ``reconcile_producer_counters``.
+    """
+    producer_ids = sorted(producer_ids)
+    transaction.on_commit(
+        lambda: atomic_with_retry(increment_orders_count)(producer_ids), robust=True
+    )
+
+
+def reconcile_producer_counters(dry_run=False):
+    """
+    Fix producers whose counters drifted from the real counts.
+
+    Returns the ids of the producers that were (or, with ``dry_run``,
+    would be) corrected.
+    """
+    drifted = list(
+        Producer.objects.annotate(
+            actual_products=active_products_subquery(),
+            actual_orders=orders_subquery(),
+        ).filter(
+            ~Q(active_products_count=F('actual_products')) | ~Q(orders_count=F('actual_orders'))
+        ).values_list('pk', flat=True)
+    )
+    if drifted and not dry_run:
+        Producer.objects.filter(pk__in=drifted).update(
+            active_products_count=active_products_subquery(),
+            orders_count=orders_subquery()
+        )
+    return drifted
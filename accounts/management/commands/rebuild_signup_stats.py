@@ -0,0 +1,18 @@
+"""
+Rebuild the daily sign-up rollup from the user table.
+
+Usage:
+    python manage.py rebuild_signup_stats
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.stats import invalidate_user_stats, rebuild_daily_signups
+
+
+class Command(BaseCommand):
+    help = "Recompute DailySignupStat rows from User.date_joined."
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_signups()
+        invalidate_user_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily sign-up row(s)."))
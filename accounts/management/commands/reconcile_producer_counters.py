@@ -0,0 +1,30 @@
+"""
+Recompute the denormalized producer counters and fix any drift.
+
+Usage:
+    python manage.py reconcile_producer_counters [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.counters import reconcile_producer_counters
+
+
+class Command(BaseCommand):
+    help = "Fix Producer.active_products_count and orders_count where they drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report the producers whose counters drifted",
+        )
+
+    def handle(self, *args, **options):
+        drifted = reconcile_producer_counters(dry_run=options['dry_run'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All producer counters are up to date."))
+            return
+        verb = "would be" if options['dry_run'] else "were"
+        self.stdout.write(self.style.WARNING(
+            f"{len(drifted)} producer(s) {verb} corrected: {', '.join(map(str, drifted))}"
+        ))
@@ -1,12 +1,11 @@
 # Generated by Django 5.2.4 on 2025-08-09 10:51
 
 from django.db import migrations
-from django.contrib.auth import get_user_model
 
 
 def create_default_superuser(apps, schema_editor):
     """Create default superuser for deployment."""
-    User = get_user_model()
+    User = apps.get_model('accounts', 'User')
     
     # Check if superuser already exists
     if not User.objects.filter(is_superuser=True).exists():
@@ -27,7 +26,7 @@ def create_default_superuser(apps, schema_editor):
 
 def reverse_create_default_superuser(apps, schema_editor):
     """Remove default superuser."""
-    User = get_user_model()
+    User = apps.get_model('accounts', 'User')
     
     try:
         user = User.objects.get(username='admin', email='admin@greencart.com')
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:14
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_signups(apps, schema_editor):
+    """Build the rollup from existing users."""
+    User = apps.get_model("accounts", "User")
+    DailySignupStat = apps.get_model("accounts", "DailySignupStat")
+    rows = (
+        User.objects.annotate(day=TruncDate("date_joined"))
+        .values("day", "user_type")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    DailySignupStat.objects.bulk_create(
+        [
+            DailySignupStat(
+                date=row["day"], user_type=row["user_type"], count=row["count"]
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_create_default_superuser"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySignupStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Date")),
+                (
+                    "user_type",
+                    models.CharField(
+                        choices=[
+                            ("CONSUMER", "Consommateur"),
+                            ("PRODUCER", "Producteur"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type d'utilisateur",
+                    ),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Inscriptions"),
+                ),
+            ],
+            options={
+                "verbose_name": "Inscriptions du jour",
+                "verbose_name_plural": "Inscriptions par jour",
+                "ordering": ["-date", "user_type"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "user_type"), name="unique_daily_signup_stat"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_daily_signups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_daily_signup_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Version of the processed avatar variants (0 = not processed yet)",
+                verbose_name="Avatar Version",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_producer_counters(apps, schema_editor):
+    """Compute the counters of existing producers (one UPDATE)."""
+    Producer = apps.get_model("accounts", "Producer")
+    Product = apps.get_model("products", "Product")
+    SubOrder = apps.get_model("orders", "SubOrder")
+
+    def count_of(queryset):
+        counts = (
+            queryset.filter(producer=OuterRef("pk"))
+            .order_by()
+            .values("producer")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Producer.objects.update(
+        active_products_count=count_of(Product.objects.filter(is_active=True)),
+        orders_count=count_of(SubOrder.objects.all()),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0005_user_avatar_version"),
+        ("orders", "0002_sub_orders"),
+        ("products", "0002_remove_product_image_remove_productimage_image_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="producer",
+            name="active_products_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Produits actifs"
+            ),
+        ),
+        migrations.AddField(
+            model_name="producer",
+            name="catalog_updated_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Catalogue mis à jour le",
+            ),
+        ),
+        migrations.AddField(
+            model_name="producer",
+            name="orders_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Commandes reçues"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="producer",
+            index=models.Index(
+                fields=["is_verified", "-orders_count"],
+                name="accounts_pr_is_veri_3c0177_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_producer_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+def mark_processed_avatars(apps, schema_editor):
+    """Until now a non-zero version meant the current avatar was processed."""
+    User = apps.get_model("accounts", "User")
+    User.objects.filter(avatar_version__gt=0).update(avatar_processed=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0006_producer_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_processed",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Whether the variants of avatar_version match the current avatar",
+                verbose_name="Avatar Processed",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="avatar_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Version of the latest processed avatar variants, bumped on every processing",
+                verbose_name="Avatar Version",
+            ),
+        ),
+        migrations.RunPython(mark_processed_avatars, migrations.RunPython.noop),
+    ]
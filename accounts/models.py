@@ -1,8 +1,10 @@
 """
 Models for user management.
 """
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.urls import reverse
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
 
@@ -69,6 +71,20 @@ class User(AbstractUser):
         null=True
     )
 
+    avatar_version = models.PositiveIntegerField(
+        'Avatar Version',
+        default=0,
+        editable=False,
+        help_text='Version of the latest processed avatar variants, bumped on every processing'
+    )
+
+    avatar_processed = models.BooleanField(
+        'Avatar Processed',
+        default=False,
+        editable=False,
+        help_text='Whether the variants of avatar_version match the current avatar'
+    )
+
     # Status fields
     is_verified = models.BooleanField(
         'Email Verified',
@@ -105,6 +121,47 @@ class User(AbstractUser):
         """String representation of the user."""
         return self.email
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Stored avatar, to detect new uploads in save(); set by from_db() for loaded rows
+        self._loaded_avatar = ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # None: avatar deferred, stored value unknown
+        instance._loaded_avatar = (instance.__dict__['avatar'] or '') if 'avatar' in instance.__dict__ else None
+        return instance
+
+    def _avatar_changed(self, update_fields):
+        if update_fields is not None and 'avatar' not in update_fields:
+            return False
+        if 'avatar' not in self.__dict__:
+            # Deferred and never assigned
+            return False
+        if self._loaded_avatar is None:
+            return True
+        return (self.avatar.name or '') != str(self._loaded_avatar)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self._avatar_changed(update_fields):
+            super().save(*args, **kwargs)
+        else:
+            # New upload: variants are rebuilt by the outbox worker. The
+            # version is kept, so the next variants get a new (immutable) URL
+            self.avatar_processed = False
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'avatar_processed'}
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if self.avatar:
+                    from api.outbox import publish
+                    from .avatars import AVATAR_UPLOADED
+                    publish(AVATAR_UPLOADED, self, {'avatar': self.avatar.name})
+        if 'avatar' in self.__dict__:
+            self._loaded_avatar = self.avatar.name or ''
+
     @property
     def full_name(self):
         """Returns the user's full name."""
@@ -115,13 +172,26 @@ class User(AbstractUser):
         """Returns the first name or username if no first name."""
         return self.first_name or self.username
 
+    def get_avatar_url(self, size=None):
+        """
+        Returns the avatar URL for a given size.
+
+        Processed variants first, then the original upload while it is being
+        processed, then a locally generated initials placeholder.
+        """
+        from .avatars import closest_size, initials_for
+
+        size = closest_size(size or settings.AVATAR_DEFAULT_SIZE)
+        if self.avatar and self.avatar_processed:
+            return reverse('api:accounts:avatar_variant', args=[self.pk, self.avatar_version, size])
+        if self.avatar and hasattr(self.avatar, 'url'):
+            return self.avatar.url
+        return reverse('api:accounts:avatar_placeholder', args=[initials_for(self), size])
+
     @property
     def avatar_url(self):
         """Returns the avatar URL or a default URL."""
-        if self.avatar and hasattr(self.avatar, 'url'):
-            return self.avatar.url
-        # Using a placeholder service for default avatar
-        return f'https://ui-avatars.com/api/?name={self.first_name}+{self.last_name}&background=4CAF50&color=fff&size=100'
+        return self.get_avatar_url()
 
     def get_absolute_url(self):
         """Returns the URL for the user's profile."""
@@ -213,6 +283,26 @@ class Producer(models.Model):
         help_text='Indique si le producteur a été vérifié par l\'équipe GreenCart'
     )
     
+    # Compteurs dénormalisés (voir accounts/counters.py)
+    active_products_count = models.PositiveIntegerField(
+        'Produits actifs',
+        default=0,
+        editable=False
+    )
+    
+    orders_count = models.PositiveIntegerField(
+        'Commandes reçues',
+        default=0,
+        editable=False
+    )
+    
+    catalog_updated_at = models.DateTimeField(
+        'Catalogue mis à jour le',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -224,6 +314,7 @@ class Producer(models.Model):
             models.Index(fields=['region']),
             models.Index(fields=['is_verified']),
             models.Index(fields=['city']),
+            models.Index(fields=['is_verified', '-orders_count']),
         ]
     
     def __str__(self):
@@ -232,4 +323,40 @@ class Producer(models.Model):
     @property
     def full_address(self):
         """Retourne l'adresse complète formatée."""
-        return f"{self.address}, {self.postal_code} {self.city}"
\ No newline at end of file
+        return f"{self.address}, {self.postal_code} {self.city}"
+
+
+class DailySignupStat(models.Model):
+    """
+    Number of sign-ups per day and user type.
+
+    Maintained incrementally on user creation (see ``accounts.stats``) so
+    the admin dashboard never scans the user table for its chart.
+    """
+    
+    date = models.DateField('Date')
+    
+    user_type = models.CharField(
+        'Type d\'utilisateur',
+        max_length=20,
+        choices=User.USER_TYPE_CHOICES
+    )
+    
+    count = models.PositiveIntegerField(
+        'Inscriptions',
+        default=0
+    )
+    
+    class Meta:
+        verbose_name = 'Inscriptions du jour'
+        verbose_name_plural = 'Inscriptions par jour'
+        ordering = ['-date', 'user_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'user_type'],
+                name='unique_daily_signup_stat'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.get_user_type_display()}: {self.count}"
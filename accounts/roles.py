@@ -0,0 +1,21 @@
+"""
+Role resolution for GreenCart users.
+
+Views and serializers ask ``get_producer(request.user)`` instead of probing
+``producer_profile`` with ``hasattr``. ``CachedTokenAuthentication`` loads
+the profile together with the user (``select_related``) and keeps its id,
+or its absence, in the cached token snapshot; Django caches both on the
+user instance, so the role costs at most one query per request (session
+logins) and none for token logins.
+"""
+from .models import Producer
+
+
+def get_producer(user):
+    """Return the user's producer profile, or None for consumers and anonymous users."""
+    if user is None or not user.is_authenticated:
+        return None
+    try:
+        return user.producer_profile
+    except Producer.DoesNotExist:
+        return None
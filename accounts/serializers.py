@@ -3,6 +3,7 @@ Serializers for the accounts app API.
 """
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from drf_spectacular.utils import extend_schema_field
@@ -23,9 +24,26 @@ class ProducerSerializer(serializers.ModelSerializer):
             'business_name', 'description', 'siret',
             'address', 'city', 'postal_code', 'region',
             'full_address', 'is_verified',
+            'active_products_count', 'orders_count', 'catalog_updated_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'user', 'is_verified',
+            'active_products_count', 'orders_count', 'catalog_updated_at',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'is_verified', 'created_at', 'updated_at']
+
+
+class ProducerDirectorySerializer(serializers.ModelSerializer):
+    """Public producer directory entry (counters are denormalized, no joins)."""
+    
+    class Meta:
+        model = Producer
+        fields = [
+            'id', 'business_name', 'description', 'city', 'postal_code', 'region',
+            'active_products_count', 'orders_count', 'catalog_updated_at'
+        ]
+        read_only_fields = fields
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -198,6 +216,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'id', 'email', 'user_type', 'is_verified', 'date_joined', 'last_login'
         )
 
+    def validate_avatar(self, value):
+        """Reject oversized uploads before they are stored."""
+        if value and value.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError(
+                f"Avatar must be at most {settings.AVATAR_MAX_UPLOAD_SIZE // (1024 * 1024)} MB."
+            )
+        return value
+
 
 class UserListSerializer(serializers.ModelSerializer):
     """Serializer for user list (minimal data)."""
@@ -275,6 +301,15 @@ class ChangePasswordSerializer(serializers.Serializer):
         return user
 
 
+class DailySignupSerializer(serializers.Serializer):
+    """Sign-ups for one day, per user type."""
+
+    date = serializers.DateField()
+    total = serializers.IntegerField()
+    CONSUMER = serializers.IntegerField()
+    PRODUCER = serializers.IntegerField()
+
+
 class UserStatsSerializer(serializers.Serializer):
     """Serializer for user statistics."""
 
@@ -282,3 +317,27 @@ class UserStatsSerializer(serializers.Serializer):
     verified_users = serializers.IntegerField()
     active_users = serializers.IntegerField()
     new_users_this_month = serializers.IntegerField()
+    users_by_type = serializers.DictField(child=serializers.IntegerField())
+    daily_signups = DailySignupSerializer(many=True)
+
+
+class BulkUserIdsSerializer(serializers.Serializer):
+    """Ids of the users (or producers) targeted by a bulk operation."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000
+    )
+
+
+class BulkVerifySerializer(BulkUserIdsSerializer):
+    """Bulk (un)verification."""
+
+    is_verified = serializers.BooleanField(default=True)
+
+
+class BulkActivateSerializer(BulkUserIdsSerializer):
+    """Bulk (de)activation."""
+
+    is_active = serializers.BooleanField(default=True)
@@ -1,9 +1,16 @@
 """
 Signals for the accounts app.
 """
-from django.db.models.signals import post_save
+import logging
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import User
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_token, invalidate_user_tokens
+from .models import Producer, User
+from .stats import USER_STATS_FIELDS, invalidate_user_stats, record_signup
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=User)
@@ -12,4 +19,43 @@ def user_post_save(sender, instance, created, **kwargs):
     if created:
         # Add any post-creation logic here
         # For example: send welcome email, create related objects, etc.
-        print(f"New user created: {instance.email}")
\ No newline at end of file
+        logger.info("New user created: %s", instance.email)
+
+
+@receiver(post_save, sender=User)
+def update_user_stats(sender, instance, created, update_fields=None, **kwargs):
+    """Count new sign-ups and drop the cached admin statistics."""
+    if created:
+        record_signup(instance)
+    elif update_fields is not None and USER_STATS_FIELDS.isdisjoint(update_fields):
+        # save(update_fields=['last_login']) à chaque connexion : totaux inchangés
+        return
+    invalidate_user_stats()
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    invalidate_user_stats()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_token(sender, instance, created, **kwargs):
+    """Drop the cached token snapshot so password/status changes apply at once."""
+    if created:
+        return
+    key = Token.objects.filter(user=instance).values_list('key', flat=True).first()
+    if key:
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=Producer)
+@receiver(post_delete, sender=Producer)
+def invalidate_producer_token(sender, instance, **kwargs):
+    """The token snapshot holds the producer profile, or its absence."""
+    invalidate_user_tokens([instance.user_id])
+
+
+@receiver(post_delete, sender=Token)
+def token_post_delete(sender, instance, **kwargs):
+    """Forget a deleted (logged out or rotated) token."""
+    invalidate_token(instance.key)
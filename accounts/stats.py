@@ -0,0 +1,118 @@
+"""
+User statistics for the admin dashboard.
+
+The totals come from one conditional-aggregate query and are cached until
+a user is created or deleted, or a save may change a counted field
+(``USER_STATS_FIELDS``). Daily sign-up counts are read from the
+``DailySignupStat`` rollup, which is incremented on each sign-up and can
+be rebuilt with ``manage.py rebuild_signup_stats``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.metrics import record_cache_lookup
+
+from .models import DailySignupStat, User
+
+USER_STATS_CACHE_KEY = 'accounts:user_stats'
+# Champs agrégés par compute_user_stats()
+USER_STATS_FIELDS = frozenset({'is_verified', 'is_active', 'date_joined', 'user_type'})
+
+
+def compute_user_stats():
+    """All user counters in a single query."""
+    now = timezone.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    aggregates = {
+        'total_users': Count('id'),
+        'verified_users': Count('id', filter=Q(is_verified=True)),
+        'active_users': Count('id', filter=Q(is_active=True)),
+        'new_users_this_month': Count('id', filter=Q(date_joined__gte=start_of_month)),
+    }
+    for user_type, _label in User.USER_TYPE_CHOICES:
+        aggregates[f'type_{user_type}'] = Count('id', filter=Q(user_type=user_type))
+    
+    stats = User.objects.aggregate(**aggregates)
+    stats['users_by_type'] = {
+        user_type: stats.pop(f'type_{user_type}')
+        for user_type, _label in User.USER_TYPE_CHOICES
+    }
+    return stats
+
+
+def get_user_stats():
+    """Cached version of compute_user_stats()."""
+    stats = cache.get(USER_STATS_CACHE_KEY)
+    record_cache_lookup('user_stats', stats is not None)
+    if stats is None:
+        stats = compute_user_stats()
+        cache.set(USER_STATS_CACHE_KEY, stats, settings.USER_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_user_stats():
+    cache.delete(USER_STATS_CACHE_KEY)
+
+
+def record_signup(user):
+    """Increment today's sign-up counter for the user's type."""
+    day = timezone.localdate(user.date_joined)
+    updated = DailySignupStat.objects.filter(
+        date=day, user_type=user.user_type
+    ).update(count=F('count') + 1)
+    if updated:
+        return
+    try:
+        # Savepoint: a concurrent sign-up may create the row first
+        with transaction.atomic():
+            DailySignupStat.objects.create(date=day, user_type=user.user_type, count=1)
+    except IntegrityError:
+        DailySignupStat.objects.filter(
+            date=day, user_type=user.user_type
+        ).update(count=F('count') + 1)
+
+
+def daily_signups(days=30):
+    """Sign-ups per day over the last ``days`` days, oldest first, zero-filled."""
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = DailySignupStat.objects.filter(date__gte=start).values('date', 'user_type', 'count')
+    
+    by_day = {
+        start + timedelta(days=offset): {
+            'date': start + timedelta(days=offset),
+            'total': 0,
+            **{user_type: 0 for user_type, _label in User.USER_TYPE_CHOICES},
+        }
+        for offset in range(days)
+    }
+    for row in rows:
+        entry = by_day.get(row['date'])
+        if entry is not None:
+            entry[row['user_type']] = row['count']
+            entry['total'] += row['count']
+    return list(by_day.values())
+
+
+def rebuild_daily_signups():
+    """Recompute the whole rollup from the user table; returns the number of rows."""
+    rows = (
+        User.objects.annotate(day=TruncDate('date_joined'))
+        .values('day', 'user_type')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        DailySignupStat.objects.all().delete()
+        created = DailySignupStat.objects.bulk_create([
+            DailySignupStat(date=row['day'], user_type=row['user_type'], count=row['count'])
+            for row in rows
+        ], batch_size=1000)
+    return len(created)
@@ -1,3 +1,202 @@
-from django.test import TestCase
+"""
+Tests for the cached token authentication, the login-failure lockout, the
+user statistics cache and avatar processing.
+"""
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import OutboxEvent
+from api.outbox import drain
+
+from .authentication import CachedTokenAuthentication, token_cache_key
+from .avatars import AVATAR_UPLOADED, variant_path
+from .models import Producer, User
+from .roles import get_producer
+from .stats import USER_STATS_CACHE_KEY, get_user_stats
+
+
+class SharedCache(LocMemCache):
+    """Stands in for Redis: a backend that ``cache_is_shared()`` accepts."""
+
+
+SHARED_CACHES = {'default': {'BACKEND': 'accounts.tests.SharedCache', 'LOCATION': 'shared'}}
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='alice', email='alice@example.com', password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+        self.auth = CachedTokenAuthentication()
+        self.addCleanup(cache.clear)
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.key)[0]
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_cache_hit_runs_no_query_and_holds_no_password(self):
+        self.authenticate()
+        snapshot = cache.get(token_cache_key(self.key))
+        self.assertNotIn('password', snapshot['user'])
+
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.email, user.is_active), (self.user.pk, self.user.email, True))
+        self.assertIn('password', user.get_deferred_fields())
+        # Deferred fields still load on access
+        self.assertTrue(user.check_password('testpass123'))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_deactivation_applies_at_once(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_deleted_token_is_rejected(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_cache_hit_resolves_the_role_without_query(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_producer(self.authenticate()))
+
+        producer = Producer.objects.create(
+            user=self.user, business_name='Ferme', address='1 rue des Champs', city='Lyon',
+            postal_code='69001', region='Auvergne-Rhône-Alpes',
+        )
+        # Nouveau profil : l'instantané sans producteur a été invalidé
+        self.assertIsNone(cache.get(token_cache_key(self.key)))
+        self.authenticate()
+        with self.assertNumQueries(0):
+            cached = get_producer(self.authenticate())
+        self.assertEqual(cached.pk, producer.pk)
+
+        producer.delete()
+        self.assertIsNone(get_producer(self.authenticate()))
+
+    def test_per_process_cache_is_not_used(self):
+        self.authenticate()
+        self.assertIsNone(cache.get(token_cache_key(self.key)))
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_RATES={'login_failures': '2/hour'})
+class LoginFailureLockoutTests(TestCase):
+
+    def setUp(self):
+        User.objects.create_user(username='carol', email='carol@example.com', password='testpass123')
+        self.client = APIClient()
+        self.addCleanup(cache.clear)
+
+    def login(self, password, email='carol@example.com'):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+
+    def test_failures_lock_the_address_out(self):
+        self.assertEqual(self.login('wrong').status_code, 400)
+        self.assertEqual(self.login('wrong').status_code, 400)
+        # Même le bon mot de passe est refusé, sans être vérifié
+        response = self.login('testpass123')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) >= 1)
+        # Clé normalisée : casse et espaces ne contournent pas le verrou
+        self.assertEqual(self.login('testpass123', ' Carol@Example.com ').status_code, 429)
+
+    def test_successful_logins_are_not_counted(self):
+        for _ in range(3):
+            self.assertEqual(self.login('testpass123').status_code, 200)
+
+
+class UserStatsInvalidationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dave', email='dave@example.com', password='testpass123')
+        self.addCleanup(cache.clear)
+        get_user_stats()
+
+    def test_login_keeps_the_cached_stats(self):
+        self.assertEqual(self.client.post('/api/auth/login/', {
+            'email': 'dave@example.com', 'password': 'testpass123'
+        }, content_type='application/json').status_code, 200)
+        self.assertIsNotNone(cache.get(USER_STATS_CACHE_KEY))
+
+    def test_counted_fields_invalidate_the_stats(self):
+        self.user.is_verified = True
+        self.user.save(update_fields=['is_verified', 'updated_at'])
+        self.assertIsNone(cache.get(USER_STATS_CACHE_KEY))
+        self.assertEqual(get_user_stats()['verified_users'], 1)
+
+    def test_full_save_invalidates_the_stats(self):
+        self.user.save()
+        self.assertIsNone(cache.get(USER_STATS_CACHE_KEY))
+
+
+def image_upload(color):
+    buffer = BytesIO()
+    Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(
+    AVATAR_SIZES=[32, 64],
+    OUTBOX_HANDLERS={'user.avatar_uploaded': ['accounts.avatars.process_avatar_event']},
+)
+class AvatarVersionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bob', email='bob@example.com', password='testpass123'
+        )
+
+    def upload(self, color):
+        self.user.avatar = image_upload(color)
+        self.user.save()
+        drain()
+        self.user.refresh_from_db()
+
+    def test_upload_on_a_new_instance_is_processed(self):
+        self.upload('red')
+        self.assertTrue(OutboxEvent.objects.filter(event_type=AVATAR_UPLOADED).exists())
+        self.assertEqual((self.user.avatar_version, self.user.avatar_processed), (1, True))
+        self.assertTrue(self.user.get_avatar_url(64).endswith('/v1/64.jpg'))
+
+    def test_every_upload_gets_a_new_version(self):
+        self.upload('red')
+        self.upload('blue')
+        self.assertEqual(self.user.avatar_version, 2)
+        self.assertTrue(self.user.get_avatar_url(64).endswith('/v2/64.jpg'))
+        self.assertTrue(default_storage.exists(variant_path(self.user.pk, 2, 64)))
+        self.assertFalse(default_storage.exists(variant_path(self.user.pk, 1, 64)))
+
+    def test_original_is_served_until_the_new_upload_is_processed(self):
+        self.upload('red')
+        self.user.avatar = image_upload('blue')
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.avatar_version, self.user.avatar_processed), (1, False))
+        self.assertEqual(self.user.get_avatar_url(64), self.user.avatar.url)
+
+    def test_saving_other_fields_publishes_nothing(self):
+        self.upload('red')
+        self.user.first_name = 'Bob'
+        self.user.save()
+        self.assertEqual(OutboxEvent.objects.filter(event_type=AVATAR_UPLOADED).count(), 1)
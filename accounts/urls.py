@@ -19,6 +19,18 @@ urlpatterns = [
     path('logout/', views.logout_user, name='logout'),
     path('profile/', views.user_profile, name='profile'),
 
+    # Avatars (variantes redimensionnées et avatars à initiales)
+    path(
+        'avatars/<int:user_id>/v<int:version>/<int:size>.jpg',
+        views.avatar_variant,
+        name='avatar_variant'
+    ),
+    path(
+        'avatars/initials/<str:initials>/<int:size>.png',
+        views.avatar_placeholder,
+        name='avatar_placeholder'
+    ),
+
     # API info
     path('', views.api_info, name='api_info'),
 
@@ -2,19 +2,25 @@
 API views for the accounts app.
 """
 from rest_framework import status, viewsets, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.contrib.auth import login
-from django.db.models import Q, Count
-from django.utils import timezone
-from datetime import datetime, timedelta
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.views.decorators.http import require_GET
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.openapi import OpenApiTypes
 
+from core.throttling import AuthThrottle, SlidingWindowLimiter, hashed
+from .authentication import get_valid_token
+from .avatars import IMMUTABLE_MAX_AGE, placeholder_png, variant_path
+from .bulk import bulk_update_producers, bulk_update_users
+from .stats import daily_signups, get_user_stats
 from .models import User, Producer
 from .serializers import (
     UserRegistrationSerializer,
@@ -23,7 +29,10 @@ from .serializers import (
     UserListSerializer,
     ChangePasswordSerializer,
     UserStatsSerializer,
-    ProducerSerializer
+    ProducerDirectorySerializer,
+    ProducerSerializer,
+    BulkVerifySerializer,
+    BulkActivateSerializer
 )
 
 
@@ -189,17 +198,65 @@ class UserViewSet(viewsets.ModelViewSet):
             )
 
         user = self.get_object()
-        user.is_verified = True
-        user.save()
+        bulk_update_users(User.objects.filter(pk=user.pk), is_verified=True)
 
         return Response({
             'message': f'User {user.email} has been verified.'
         })
 
+    @extend_schema(
+        tags=['Authentication'],
+        summary="Vérifier des utilisateurs en masse",
+        description="Marque (ou démarque) une liste d'utilisateurs comme vérifiés en une seule requête (admin uniquement)",
+        request=BulkVerifySerializer,
+        responses={
+            200: {"description": "Nombre d'utilisateurs mis à jour"},
+            403: {"description": "Permission refusée"}
+        }
+    )
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_verify(self, request):
+        """Verify or unverify many users at once (admin only)."""
+        return self._bulk_update(request, BulkVerifySerializer, 'is_verified')
+
+    @extend_schema(
+        tags=['Authentication'],
+        summary="Activer des utilisateurs en masse",
+        description="Active ou désactive une liste d'utilisateurs en une seule requête (admin uniquement)",
+        request=BulkActivateSerializer,
+        responses={
+            200: {"description": "Nombre d'utilisateurs mis à jour"},
+            403: {"description": "Permission refusée"}
+        }
+    )
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk_activate(self, request):
+        """Activate or deactivate many users at once (admin only)."""
+        return self._bulk_update(request, BulkActivateSerializer, 'is_active')
+
+    def _bulk_update(self, request, serializer_class, field):
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        value = serializer.validated_data[field]
+        updated = bulk_update_users(
+            User.objects.filter(pk__in=serializer.validated_data['ids']),
+            **{field: value}
+        )
+        return Response({'updated': updated, field: value})
+
     @extend_schema(
         tags=['Authentication'],
         summary="Statistiques utilisateurs",
         description="Récupère les statistiques générales des utilisateurs (admin uniquement)",
+        parameters=[
+            OpenApiParameter('days', OpenApiTypes.INT, description='Nombre de jours d\'inscriptions quotidiennes (défaut 30, max 365)'),
+        ],
         responses={
             200: UserStatsSerializer,
             403: {"description": "Permission refusée"}
@@ -214,24 +271,17 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Calculate stats
-        total_users = User.objects.count()
-        verified_users = User.objects.filter(is_verified=True).count()
-        active_users = User.objects.filter(is_active=True).count()
-
-        # Users created this month
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        new_users_this_month = User.objects.filter(
-            date_joined__gte=start_of_month
-        ).count()
-
-        stats_data = {
-            'total_users': total_users,
-            'verified_users': verified_users,
-            'active_users': active_users,
-            'new_users_this_month': new_users_this_month
-        }
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Compteurs en cache (une seule requête agrégée au besoin)
+        stats_data = dict(get_user_stats())
+        stats_data['daily_signups'] = daily_signups(days)
 
         serializer = UserStatsSerializer(stats_data)
         return Response(serializer.data)
@@ -272,6 +322,7 @@ class UserViewSet(viewsets.ModelViewSet):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def register_user(request):
     """Register a new user."""
     serializer = UserRegistrationSerializer(data=request.data)
@@ -280,7 +331,7 @@ def register_user(request):
         user = serializer.save()
 
         # Create token for the new user
-        token, created = Token.objects.get_or_create(user=user)
+        token = get_valid_token(user)
 
         # Return user data with token
         user_serializer = UserProfileSerializer(user)
@@ -313,7 +364,8 @@ def register_user(request):
                 }
             }
         },
-        400: {"description": "Email ou mot de passe incorrect"}
+        400: {"description": "Email ou mot de passe incorrect"},
+        429: {"description": "Trop de tentatives, réessayez plus tard"}
     },
     examples=[
         OpenApiExample(
@@ -327,8 +379,22 @@ def register_user(request):
 )
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def login_user(request):
     """Login user and return token."""
+    # Limite des échecs par e-mail, vérifiée avant le coûteux hachage du mot de passe
+    failures = SlidingWindowLimiter.for_scope('login_failures') if settings.RATELIMIT_ENABLED else None
+    email_key = hashed(str(request.data.get('email', '')).strip().lower())
+    if failures is not None:
+        wait = failures.check(email_key)
+        if wait is not None:
+            response = Response(
+                {'error': 'Too many failed login attempts. Please try again later.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(wait)
+            return response
+
     serializer = UserLoginSerializer(
         data=request.data,
         context={'request': request}
@@ -337,8 +403,8 @@ def login_user(request):
     if serializer.is_valid():
         user = serializer.validated_data['user']
 
-        # Get or create token
-        token, created = Token.objects.get_or_create(user=user)
+        # Get or create token (expired tokens are rotated)
+        token = get_valid_token(user)
 
         # Login user (for session-based auth if needed)
         login(request, user)
@@ -352,6 +418,9 @@ def login_user(request):
             'token': token.key
         })
 
+    if failures is not None:
+        failures.hit(email_key)
+
     return Response(
         serializer.errors,
         status=status.HTTP_400_BAD_REQUEST
@@ -468,7 +537,10 @@ class ProducerViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['region', 'city', 'is_verified']
     search_fields = ['business_name', 'user__first_name', 'user__last_name', 'region', 'city']
-    ordering_fields = ['created_at', 'business_name', 'region']
+    ordering_fields = [
+        'created_at', 'business_name', 'region',
+        'active_products_count', 'orders_count', 'catalog_updated_at'
+    ]
     ordering = ['-created_at']
     
     def get_queryset(self):
@@ -483,9 +555,90 @@ class ProducerViewSet(viewsets.ModelViewSet):
     
     def get_permissions(self):
         """Set permissions based on action."""
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'directory']:
             permission_classes = [permissions.AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         
-        return [permission() for permission in permission_classes]
\ No newline at end of file
+        return [permission() for permission in permission_classes]
+    
+    @extend_schema(
+        tags=['Producers'],
+        summary="Annuaire des producteurs",
+        description="Liste publique des producteurs vérifiés avec leurs compteurs (produits actifs, commandes), filtrable par région et ville",
+        parameters=[
+            OpenApiParameter('region', OpenApiTypes.STR, description='Filtrer par région'),
+            OpenApiParameter('city', OpenApiTypes.STR, description='Filtrer par ville'),
+        ],
+        responses={200: ProducerDirectorySerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'])
+    def directory(self, request):
+        """Verified producers with their denormalized counters, one query per page."""
+        queryset = self.filter_queryset(
+            Producer.objects.filter(is_verified=True).only(*ProducerDirectorySerializer.Meta.fields)
+        )
+        if 'ordering' not in request.query_params:
+            queryset = queryset.order_by('-orders_count', 'business_name')
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = ProducerDirectorySerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = ProducerDirectorySerializer(queryset, many=True)
+        return Response(serializer.data)
+    
+    @extend_schema(
+        tags=['Producers'],
+        summary="Vérifier des producteurs en masse",
+        description="Marque (ou démarque) une liste de producteurs comme vérifiés en une seule requête (admin uniquement)",
+        request=BulkVerifySerializer,
+        responses={
+            200: {"description": "Nombre de producteurs mis à jour"},
+            403: {"description": "Permission refusée"}
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def bulk_verify(self, request):
+        """Verify or unverify many producers at once (admin only)."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = BulkVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        is_verified = serializer.validated_data['is_verified']
+        updated = bulk_update_producers(
+            Producer.objects.filter(pk__in=serializer.validated_data['ids']),
+            is_verified=is_verified
+        )
+        return Response({'updated': updated, 'is_verified': is_verified})
+
+
+@require_GET
+def avatar_variant(request, user_id, version, size):
+    """Serve a processed avatar variant; the URL is versioned, so it is cached for good."""
+    if size not in settings.AVATAR_SIZES:
+        raise Http404('Unknown avatar size.')
+    try:
+        image = default_storage.open(variant_path(user_id, version, size), 'rb')
+    except (FileNotFoundError, OSError):
+        raise Http404('Avatar not found.')
+
+    response = FileResponse(image, content_type='image/jpeg')
+    response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+@require_GET
+def avatar_placeholder(request, initials, size):
+    """Initials avatar rendered locally (deterministic, so cached for good)."""
+    if size not in settings.AVATAR_SIZES or not 1 <= len(initials) <= 2:
+        raise Http404('Unknown avatar.')
+
+    response = HttpResponse(placeholder_png(initials.upper(), size), content_type='image/png')
+    response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
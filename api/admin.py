@@ -1,3 +1,23 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import OutboxEvent
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'event_type', 'aggregate_type', 'aggregate_id',
+        'status', 'attempts', 'available_at', 'created_at'
+    ]
+    list_filter = ['status', 'event_type', 'created_at']
+    search_fields = ['event_type', 'aggregate_id', 'last_error']
+    readonly_fields = ['created_at', 'processed_at']
+    actions = ['retry_events']
+
+    @admin.action(description='Relancer les événements sélectionnés')
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status='PROCESSED').update(
+            status='PENDING', attempts=0, available_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} événement(s) remis en file.')
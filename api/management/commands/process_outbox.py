@@ -0,0 +1,52 @@
+"""
+Deliver pending outbox events to their handlers.
+
+Usage:
+    python manage.py process_outbox            # run until SIGTERM/SIGINT
+    python manage.py process_outbox --once     # drain due events and exit
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Process outbox events in batches, with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain due events once, then exit')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.OUTBOX_POLL_INTERVAL,
+            help='Seconds to sleep when no event is due'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            processed, failed = drain(options['batch_size'])
+            self.stdout.write(f"Processed {processed} event(s), {failed} failure(s).")
+            return
+
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        self.stdout.write("Outbox worker started.")
+
+        while self._running:
+            close_old_connections()
+            # One batch at a time so a stop request is honoured quickly
+            processed, failed = drain(options['batch_size'], max_batches=1)
+            if processed or failed:
+                self.stdout.write(f"Processed {processed} event(s), {failed} failure(s).")
+            else:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write("Outbox worker stopped.")
+
+    def _stop(self, signum, frame):
+        self._running = False
@@ -0,0 +1,68 @@
+"""
+Release phase: run once per deploy, before the new web processes start.
+
+Runs the system checks, then applies migrations and creates the cache
+table under a PostgreSQL advisory lock, so concurrent releases (or several
+instances started at once) migrate one after the other and the later ones
+find nothing to do. Static files and the OpenAPI schema are built with the
+image, not here.
+
+Usage:
+    python manage.py release                # checks + migrations
+    python manage.py release --test-data    # also seed test data (DEBUG only)
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Clé du verrou consultatif PostgreSQL partagée par toutes les releases
+RELEASE_LOCK_ID = 0x67726e63617274  # "grncart"
+
+
+@contextmanager
+def release_lock(alias=DEFAULT_DB_ALIAS):
+    """Hold a session-level advisory lock on PostgreSQL (no-op elsewhere)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [RELEASE_LOCK_ID])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [RELEASE_LOCK_ID])
+
+
+class Command(BaseCommand):
+    help = "Run the release phase: checks and migrations under an advisory lock."
+
+    requires_system_checks = []  # Lancés explicitement, avec les tags de déploiement
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test-data',
+            action='store_true',
+            help="Run manage.py seed after migrating (refused unless DEBUG)",
+        )
+
+    def handle(self, *args, **options):
+        if options['test_data'] and not settings.DEBUG:
+            raise CommandError("Test data is only loaded when DEBUG is enabled.")
+
+        call_command('check', deploy=not settings.DEBUG, fail_level='ERROR')
+
+        verbosity = options['verbosity']
+        with release_lock():
+            self.stdout.write("Release lock acquired.")
+            call_command('migrate', interactive=False, verbosity=verbosity)
+            call_command('createcachetable', verbosity=verbosity)
+
+        if options['test_data']:
+            call_command('seed', verbosity=verbosity)
+
+        self.stdout.write(self.style.SUCCESS("Release completed."))
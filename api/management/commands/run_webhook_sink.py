@@ -0,0 +1,64 @@
+"""
+Local HTTP stand-in for webhook receivers, to exercise outbox delivery.
+
+Usage:
+    python manage.py run_webhook_sink --port 8765 --fail-rate 0.3
+    OUTBOX_WEBHOOK_URLS=http://127.0.0.1:8765/ python manage.py process_outbox
+"""
+import hashlib
+import hmac
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Run a local webhook receiver that logs (and optionally rejects) deliveries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--fail-rate', type=float, default=0.0,
+            help='Share of deliveries answered with HTTP 503 (0-1)'
+        )
+
+    def handle(self, *args, **options):
+        command = self
+        fail_rate = options['fail_rate']
+        secret = settings.OUTBOX_WEBHOOK_SECRET
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                event = self.headers.get('X-GreenCart-Event', '?')
+                delivery = self.headers.get('X-GreenCart-Delivery', '?')
+
+                if secret:
+                    expected = 'sha256=' + hmac.new(
+                        secret.encode('utf-8'), body, hashlib.sha256
+                    ).hexdigest()
+                    if not hmac.compare_digest(expected, self.headers.get('X-GreenCart-Signature', '')):
+                        command.stdout.write(f"[401] {event} #{delivery}: bad signature")
+                        self.send_response(401)
+                        self.end_headers()
+                        return
+
+                status = 503 if random.random() < fail_rate else 204
+                command.stdout.write(f"[{status}] {event} #{delivery} ({len(body)} bytes)")
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"Webhook sink listening on http://{options['host']}:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
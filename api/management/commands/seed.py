@@ -0,0 +1,53 @@
+"""
+Generate a synthetic dataset (see ``api/seeding.py``).
+
+Usage:
+    python manage.py seed                                   # small dev dataset + demo accounts
+    python manage.py seed --consumers 1000000 --producers 20000 \\
+        --products 2000000 --carts 200000 --orders 1000000 --workers 8   # PostgreSQL
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.seeding import EMAIL_DOMAIN, PASSWORD, create_demo_accounts, seed
+
+
+class Command(BaseCommand):
+    help = "Generate consumers, producers, products, carts and orders with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumers', type=int, default=200)
+        parser.add_argument('--producers', type=int, default=20)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--images', type=int, default=1, help='Extra images per product')
+        parser.add_argument('--carts', type=int, default=50, help='At most one per consumer')
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42, help='Same seed, same rows')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes inserting batches in parallel (PostgreSQL only)'
+        )
+        parser.add_argument('--no-demo', action='store_true', help='Skip the demo accounts')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        log = self.stdout.write if options['verbosity'] else (lambda message: None)
+        try:
+            seed(
+                options['consumers'], options['producers'], options['products'],
+                options['images'], options['carts'], options['orders'],
+                seed=options['seed'], batch_size=options['batch_size'],
+                workers=options['workers'], log=log,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Dataset generated in {time.perf_counter() - started:.1f}s "
+            f"(accounts: *@{EMAIL_DOMAIN} / {PASSWORD})."
+        ))
+
+        if not options['no_demo']:
+            for email in create_demo_accounts():
+                self.stdout.write(f"Demo account: {email} / {PASSWORD}")
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:09
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        help_text="Ex: order.created, order.status_changed",
+                        max_length=100,
+                        verbose_name="Type d'événement",
+                    ),
+                ),
+                (
+                    "aggregate_type",
+                    models.CharField(
+                        help_text="Modèle concerné (ex: orders.Order)",
+                        max_length=100,
+                        verbose_name="Type d'objet",
+                    ),
+                ),
+                (
+                    "aggregate_id",
+                    models.CharField(
+                        max_length=64, verbose_name="Identifiant de l'objet"
+                    ),
+                ),
+                (
+                    "payload",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        verbose_name="Données",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("PROCESSED", "Traité"),
+                            ("FAILED", "En échec"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Tentatives"),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Date avant laquelle l'événement ne sera pas (re)traité",
+                        verbose_name="Disponible à partir de",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Dernière erreur"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Traité le"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Événement (outbox)",
+                "verbose_name_plural": "Événements (outbox)",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="api_outboxe_status_fb4198_idx",
+                    ),
+                    models.Index(
+                        fields=["aggregate_type", "aggregate_id"],
+                        name="api_outboxe_aggrega_be88c4_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxevent",
+            name="completed",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Handlers et URLs de webhook déjà servis, sautés lors des nouvelles tentatives",
+                verbose_name="Étapes réussies",
+            ),
+        ),
+    ]
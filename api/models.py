@@ -1,3 +1,94 @@
+"""
+Models shared across the GreenCart API.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class OutboxEvent(models.Model):
+    """
+    Domain event written in the same transaction as the change it describes.
+
+    Events are delivered to handlers by the ``process_outbox`` worker, so
+    notifications and webhooks never lengthen the write transaction.
+    """
+
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('PROCESSED', 'Traité'),
+        ('FAILED', 'En échec'),
+    ]
+
+    event_type = models.CharField(
+        'Type d\'événement',
+        max_length=100,
+        help_text='Ex: order.created, order.status_changed'
+    )
+
+    aggregate_type = models.CharField(
+        'Type d\'objet',
+        max_length=100,
+        help_text='Modèle concerné (ex: orders.Order)'
+    )
+
+    aggregate_id = models.CharField(
+        'Identifiant de l\'objet',
+        max_length=64
+    )
+
+    payload = models.JSONField(
+        'Données',
+        default=dict,
+        encoder=DjangoJSONEncoder
+    )
+
+    status = models.CharField(
+        'Statut',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='PENDING'
+    )
+
+    attempts = models.PositiveIntegerField(
+        'Tentatives',
+        default=0
+    )
+
+    available_at = models.DateTimeField(
+        'Disponible à partir de',
+        default=timezone.now,
+        help_text='Date avant laquelle l\'événement ne sera pas (re)traité'
+    )
+
+    last_error = models.TextField(
+        'Dernière erreur',
+        blank=True
+    )
+
+    completed = models.JSONField(
+        'Étapes réussies',
+        default=list,
+        blank=True,
+        help_text='Handlers et URLs de webhook déjà servis, sautés lors des nouvelles tentatives'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    processed_at = models.DateTimeField(
+        'Traité le',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Événement (outbox)'
+        verbose_name_plural = 'Événements (outbox)'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['aggregate_type', 'aggregate_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
@@ -0,0 +1,207 @@
+"""
+Transactional outbox for GreenCart domain events.
+
+``publish()`` stores an event in the caller's transaction. The
+``process_outbox`` management command claims pending events in batches,
+hands them to the handlers configured in ``OUTBOX_HANDLERS`` and retries
+failures with exponential backoff. Each handler that succeeds, and each
+webhook URL that accepts the event, is recorded in ``completed``: a retry
+only runs what failed, so one failing receiver does not make the others
+see the event again. Handlers must still be idempotent: a worker crashing
+mid-event replays it (at-least-once delivery).
+"""
+import fnmatch
+import hashlib
+import hmac
+import json
+import logging
+import random
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+_handler_cache = {}
+
+
+def publish(event_type, instance, payload):
+    """
+    Record an event about a model instance.
+
+    Call this inside the transaction that performs the change: the event
+    is committed (or rolled back) together with it.
+    """
+    return publish_event(event_type, instance._meta.label, instance.pk, payload)
+
+
+def publish_event(event_type, aggregate_type, aggregate_id, payload):
+    """Record an event that is not about a single instance (e.g. a batch)."""
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=str(aggregate_id),
+        payload=payload
+    )
+
+
+def get_handlers(event_type):
+    """Return ``(path, callable)`` for every handler whose pattern matches the event type."""
+    if event_type not in _handler_cache:
+        handlers = []
+        for pattern, paths in getattr(settings, 'OUTBOX_HANDLERS', {}).items():
+            if fnmatch.fnmatchcase(event_type, pattern):
+                handlers.extend((path, import_string(path)) for path in paths)
+        _handler_cache[event_type] = handlers
+    return _handler_cache[event_type]
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds, after ``attempts`` failures."""
+    base = settings.OUTBOX_RETRY_BASE_SECONDS
+    ceiling = settings.OUTBOX_RETRY_MAX_SECONDS
+    delay = min(ceiling, base * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_batch(batch_size=None):
+    """
+    Claim up to ``batch_size`` due events.
+
+    Claimed events are leased: their ``available_at`` is pushed forward so
+    another worker skips them, and a crashed worker's events become due
+    again once the lease expires.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                attempts=F('attempts') + 1,
+                available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            )
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def process_event(event):
+    """Run the handlers the event has not completed yet and record the outcome."""
+    errors = []
+    for path, handler in get_handlers(event.event_type):
+        if path in event.completed:
+            continue
+        try:
+            handler(event)
+        except Exception as exc:
+            errors.append(f"{path}: {type(exc).__name__}: {exc}")
+        else:
+            event.completed.append(path)
+
+    if errors:
+        event.last_error = "\n".join(errors)[:2000]
+        if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            event.status = 'FAILED'
+            logger.error("Outbox event %s failed permanently: %s", event.pk, event.last_error)
+        else:
+            event.available_at = timezone.now() + timedelta(seconds=retry_delay(event.attempts))
+            logger.warning(
+                "Outbox event %s failed (attempt %s), retrying at %s: %s",
+                event.pk, event.attempts, event.available_at, event.last_error
+            )
+        event.save(update_fields=['status', 'available_at', 'last_error', 'completed'])
+        return False
+
+    event.status = 'PROCESSED'
+    event.processed_at = timezone.now()
+    event.last_error = ''
+    event.save(update_fields=['status', 'processed_at', 'last_error', 'completed'])
+    return True
+
+
+def drain(batch_size=None, max_batches=None):
+    """Process due events until none are left; returns (processed, failed)."""
+    processed = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        events = claim_batch(batch_size)
+        if not events:
+            break
+        batches += 1
+        for event in events:
+            if process_event(event):
+                processed += 1
+            else:
+                failed += 1
+    return processed, failed
+
+
+# ==============================================================================
+# BUILT-IN HANDLERS
+# ==============================================================================
+
+def log_event(event):
+    """Handler that writes the event to the application log."""
+    logger.info("Outbox event %s %s %s", event.event_type, event.aggregate_id, event.payload)
+
+
+def deliver_webhooks(event):
+    """
+    Handler that POSTs the event as JSON to every ``OUTBOX_WEBHOOK_URLS``.
+
+    When ``OUTBOX_WEBHOOK_SECRET`` is set the body is signed with HMAC-SHA256
+    in the ``X-GreenCart-Signature`` header. A URL that answers 2xx is
+    recorded in ``event.completed`` and skipped on retries; the others are
+    still tried, then the first failure is raised to schedule a retry.
+    """
+    urls = getattr(settings, 'OUTBOX_WEBHOOK_URLS', [])
+    if not urls:
+        return
+
+    body = json.dumps({
+        'id': event.pk,
+        'type': event.event_type,
+        'aggregate_type': event.aggregate_type,
+        'aggregate_id': event.aggregate_id,
+        'created_at': event.created_at,
+        'payload': event.payload,
+    }, cls=DjangoJSONEncoder).encode('utf-8')
+
+    headers = {
+        'Content-Type': 'application/json',
+        'X-GreenCart-Event': event.event_type,
+        'X-GreenCart-Delivery': str(event.pk),
+    }
+    secret = getattr(settings, 'OUTBOX_WEBHOOK_SECRET', '')
+    if secret:
+        signature = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        headers['X-GreenCart-Signature'] = f'sha256={signature}'
+
+    failure = None
+    for url in urls:
+        step = f'webhook:{url}'
+        if step in event.completed:
+            continue
+        request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        try:
+            # urlopen raises HTTPError for 4xx/5xx answers
+            with urllib.request.urlopen(request, timeout=settings.OUTBOX_WEBHOOK_TIMEOUT):
+                pass
+        except Exception as exc:
+            failure = failure or exc
+        else:
+            event.completed.append(step)
+    if failure is not None:
+        raise failure
@@ -0,0 +1,491 @@
+"""
+Synthetic data generator behind ``manage.py seed``.
+
+Generates consumers, producers across the French regions, categories,
+products with images, carts and past orders (items, sub-orders and status
+history) with ``bulk_create``, one batch at a time.
+
+Every batch draws from its own generator seeded with ``(seed, kind, batch
+number)``, so the same seed and batch size give the same rows whatever the
+number of worker processes (dates are relative to the run). With
+``workers > 1`` the batches of each phase
+are spread over forked processes (PostgreSQL only: SQLite allows a single
+writer). Phases run in dependency order; the keys that later phases need
+(user and producer ids, the product catalog) are read back between them.
+
+Generated accounts use ``EMAIL_DOMAIN`` and ``PASSWORD``.
+"""
+import base64
+import colorsys
+import multiprocessing
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from math import ceil
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Length
+from django.utils import timezone
+from PIL import Image
+
+from accounts.counters import reconcile_producer_counters
+from accounts.models import Producer, User
+from accounts.stats import invalidate_user_stats, rebuild_daily_signups
+from cart.models import Cart, CartItem
+from orders.models import Order, OrderItem, OrderStatusHistory, SubOrder
+from products.cache import invalidate_catalog
+from products.models import Category, Product, ProductImage
+
+EMAIL_DOMAIN = 'seed.greencart.test'
+PASSWORD = 'testpass123'
+
+REGIONS = [
+    'Auvergne-Rhône-Alpes', 'Bourgogne-Franche-Comté', 'Bretagne', 'Centre-Val de Loire',
+    'Corse', 'Grand Est', 'Hauts-de-France', 'Île-de-France', 'Normandie',
+    'Nouvelle-Aquitaine', 'Occitanie', 'Pays de la Loire', "Provence-Alpes-Côte d'Azur",
+]
+CATEGORIES = {
+    'Légumes': ('🥕', ['Tomates', 'Carottes', 'Courgettes', 'Poireaux', 'Salade', 'Pommes de terre']),
+    'Fruits': ('🍎', ['Pommes', 'Poires', 'Fraises', 'Cerises', 'Abricots', 'Raisin']),
+    'Produits laitiers': ('🧀', ['Fromage de chèvre', 'Yaourt', 'Beurre', 'Lait cru', 'Tomme']),
+    'Viandes': ('🥩', ['Poulet fermier', 'Saucisses', 'Rôti de porc', 'Steak haché']),
+    'Pain et céréales': ('🥖', ['Pain de campagne', 'Brioche', 'Baguette', 'Farine de blé']),
+    'Épicerie': ('🍯', ['Miel', 'Confiture', 'Huile de noix', 'Lentilles']),
+    'Boissons': ('🧃', ['Jus de pomme', 'Cidre', 'Sirop de menthe', 'Bière artisanale']),
+    'Œufs': ('🥚', ['Œufs bio', 'Œufs de caille', 'Œufs plein air']),
+}
+QUALIFIERS = ['bio', 'de saison', 'du terroir', 'extra', 'en vrac', 'fermier', 'AOP', 'local']
+FIRST_NAMES = ['Marie', 'Jean', 'Sophie', 'Luc', 'Camille', 'Hugo', 'Léa', 'Louis', 'Chloé', 'Paul']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand']
+UNITS = [unit for unit, _label in Product.UNIT_CHOICES]
+
+# Statut final des commandes passées et étapes pour y arriver
+ORDER_STATUSES = ['DELIVERED'] * 12 + ['SHIPPED'] * 2 + ['CONFIRMED'] * 2 + ['PENDING', 'CANCELLED']
+STATUS_PATHS = {
+    'PENDING': ['PENDING'],
+    'CONFIRMED': ['PENDING', 'CONFIRMED'],
+    'SHIPPED': ['PENDING', 'CONFIRMED', 'SHIPPED'],
+    'DELIVERED': ['PENDING', 'CONFIRMED', 'SHIPPED', 'DELIVERED'],
+    'CANCELLED': ['PENDING', 'CANCELLED'],
+}
+STATUS_DELAYS = {'CONFIRMED': timedelta(hours=2), 'SHIPPED': timedelta(days=1),
+                 'DELIVERED': timedelta(days=2), 'CANCELLED': timedelta(hours=5)}
+
+# État partagé avec les processus forkés (volumes, clés relues entre phases)
+_context = {}
+
+
+def batch_rows(index, count):
+    start = index * _context['batch_size']
+    return range(start, min(count, start + _context['batch_size']))
+
+
+def batch_rng(kind, index):
+    return random.Random(f"{_context['seed']}:{kind}:{index}")
+
+
+def random_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def render_images(count=16, size=96):
+    """A small pool of base64 JPEG swatches shared by all generated products."""
+    images = []
+    for index in range(count):
+        red, green, blue = colorsys.hls_to_rgb(index / count, 0.55, 0.6)
+        buffer = BytesIO()
+        Image.new('RGB', (size, size), (int(red * 255), int(green * 255), int(blue * 255))).save(
+            buffer, 'JPEG', quality=70
+        )
+        images.append(base64.b64encode(buffer.getvalue()).decode('ascii'))
+    return images
+
+
+# ==============================================================================
+# Lots : chacun s'exécute dans le processus principal ou dans un worker
+# ==============================================================================
+
+def generate_users(index, role):
+    count = _context[f'{role}s']
+    user_type = 'PRODUCER' if role == 'producer' else 'CONSUMER'
+    rng = batch_rng(role, index)
+    now = _context['now']
+    User.objects.bulk_create([
+        User(
+            username=f'seed_{role}{number}',
+            email=f'{role}{number}@{EMAIL_DOMAIN}',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            user_type=user_type,
+            password=_context['password'],
+            is_verified=rng.random() < 0.9,
+            date_joined=now - timedelta(seconds=rng.randint(0, 2 * 365 * 24 * 3600)),
+        )
+        for number in batch_rows(index, count)
+    ])
+
+
+def generate_producers(index):
+    rng = batch_rng('producer_profile', index)
+    user_ids = _context['producer_user_ids']
+    Producer.objects.bulk_create([
+        Producer(
+            user_id=user_ids[number],
+            business_name=f'{rng.choice(["Ferme", "Domaine", "Jardins", "Maraîchage"])} '
+                          f'{rng.choice(LAST_NAMES)} {number}',
+            description='Exploitation familiale en circuit court.',
+            address=f'{rng.randint(1, 200)} route des Champs',
+            city=f'Commune {rng.randint(1, 500)}',
+            postal_code=f'{rng.randint(1000, 95999):05d}',
+            region=rng.choice(REGIONS),
+            is_verified=rng.random() < 0.8,
+        )
+        for number in batch_rows(index, _context['producers'])
+    ])
+
+
+def generate_products(index):
+    rng = batch_rng('product', index)
+    now = _context['now']
+    categories = _context['categories']
+    producer_ids = _context['producer_ids']
+    images = _context['images']
+    products, gallery = [], []
+    for _number in batch_rows(index, _context['products']):
+        category_id, names = rng.choice(categories)
+        product = Product(
+            id=random_uuid(rng),
+            producer_id=rng.choice(producer_ids),
+            category_id=category_id,
+            name=f'{rng.choice(names)} {rng.choice(QUALIFIERS)}',
+            description='Produit récolté à maturité, vendu en direct par le producteur.',
+            price=Decimal(rng.randint(50, 3000)) / 100,
+            unit=rng.choice(UNITS),
+            quantity_available=rng.randint(0, 5000),
+            expiry_date=(now + timedelta(days=rng.randint(1, 60))).date(),
+            harvest_date=(now - timedelta(days=rng.randint(0, 10))).date(),
+            image_data=rng.choice(images),
+            image_format='JPEG',
+            is_organic=rng.random() < 0.4,
+            is_local=rng.random() < 0.7,
+            is_active=rng.random() < 0.95,
+        )
+        products.append(product)
+        gallery.extend(
+            ProductImage(id=random_uuid(rng), product=product, image_data=rng.choice(images),
+                         image_format='JPEG', alt_text=product.name, order=position)
+            for position in range(_context['images_per_product'])
+        )
+    with transaction.atomic():
+        Product.objects.bulk_create(products)
+        ProductImage.objects.bulk_create(gallery)
+
+
+def generate_carts(index):
+    rng = batch_rng('cart', index)
+    consumer_ids = _context['consumer_ids']
+    catalog = _context['catalog']
+    carts, items = [], []
+    for number in batch_rows(index, _context['carts']):
+        cart = Cart(id=random_uuid(rng), consumer_id=consumer_ids[number])
+        carts.append(cart)
+        items.extend(
+            CartItem(id=random_uuid(rng), cart=cart, product_id=product_id,
+                     quantity=rng.randint(1, 3), price_at_time=price)
+            for product_id, _producer_id, price in rng.sample(catalog, min(rng.randint(1, 4), len(catalog)))
+        )
+    with transaction.atomic():
+        Cart.objects.bulk_create(carts)
+        CartItem.objects.bulk_create(items)
+
+
+def order_number(number, order_date):
+    """Per-year sequence, after the numbers already taken that year."""
+    year = order_date.year
+    return f'GC{year}{number - _context["year_first"][year] + _context["year_offset"][year] + 1:03d}'
+
+
+def generate_orders(index):
+    rng = batch_rng('order', index)
+    start, step, now = _context['orders_start'], _context['orders_step'], _context['now']
+    consumer_ids = _context['consumer_ids']
+    producer_users = _context['producer_users']
+    catalog = _context['catalog']
+    orders, items, sub_orders, history = [], [], [], []
+    for number in batch_rows(index, _context['orders']):
+        order_date = start + step * number
+        final_status = rng.choice(ORDER_STATUSES)
+        order = Order(
+            id=random_uuid(rng),
+            order_number=order_number(number, order_date),
+            consumer_id=rng.choice(consumer_ids),
+            delivery_address=f'{rng.randint(1, 150)} rue des Lilas',
+            delivery_city=f'Commune {rng.randint(1, 500)}',
+            delivery_postal_code=f'{rng.randint(1000, 95999):05d}',
+            order_date=order_date,
+            total_amount=Decimal('0'),
+        )
+        totals = {}
+        lines = rng.sample(catalog, min(rng.randint(1, 5), len(catalog)))
+        for product_id, producer_id, price in lines:
+            quantity = rng.randint(1, 5)
+            total = price * quantity
+            items.append(OrderItem(
+                id=random_uuid(rng), order=order, product_id=product_id, producer_id=producer_id,
+                quantity=quantity, unit_price=price, total_price=total,
+            ))
+            order.total_amount += total
+            subtotal = totals.setdefault(producer_id, [Decimal('0'), 0])
+            subtotal[0] += total
+            subtotal[1] += quantity
+
+        # Historique : création par le client, puis chaque étape déjà passée vers le statut visé
+        changed_at = order_date
+        previous = ''
+        for step_status in STATUS_PATHS[final_status]:
+            if step_status != 'PENDING':
+                changed_at += STATUS_DELAYS[step_status]
+                if changed_at > now:
+                    break
+                setattr(order, f'{step_status.lower()}_at', changed_at)
+            changed_by = (order.consumer_id if step_status in ('PENDING', 'CANCELLED')
+                          else producer_users[next(iter(totals))])
+            history.append(OrderStatusHistory(
+                id=random_uuid(rng), order=order, old_status=previous, new_status=step_status,
+                changed_by_id=changed_by, changed_at=changed_at,
+                reason='Order created' if step_status == 'PENDING' else '',
+            ))
+            previous = step_status
+        order.status = previous
+        orders.append(order)
+        sub_orders.extend(
+            SubOrder(id=random_uuid(rng), order=order, producer_id=producer_id,
+                     status=order.status, subtotal=subtotal, total_items=total_items,
+                     confirmed_at=order.confirmed_at, shipped_at=order.shipped_at,
+                     delivered_at=order.delivered_at)
+            for producer_id, (subtotal, total_items) in totals.items()
+        )
+    order_ids = [order.id for order in orders]
+    placed_at = Subquery(Order.objects.filter(pk=OuterRef('order_id')).values('order_date'))
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create(items)
+        SubOrder.objects.bulk_create(sub_orders)
+        OrderStatusHistory.objects.bulk_create(history)
+        # auto_now_add écrase created_at : on le recale sur la date de commande
+        Order.objects.filter(pk__in=order_ids).update(created_at=F('order_date'))
+        OrderItem.objects.filter(order_id__in=order_ids).update(created_at=placed_at)
+        SubOrder.objects.filter(order_id__in=order_ids).update(created_at=placed_at)
+
+
+# ==============================================================================
+# Orchestration
+# ==============================================================================
+
+def run_batches(function, count, *args, workers=1):
+    """Run ``function(index, *args)`` for every batch of ``count`` rows."""
+    batches = range(ceil(count / _context['batch_size']))
+    if workers <= 1 or len(batches) <= 1:
+        for index in batches:
+            function(index, *args)
+        return
+    # Les workers forkés ouvrent chacun leur connexion. En DB_POOL_MODE=pool,
+    # close_all() rend seulement les connexions au pool, partagé par la classe
+    # et hérité au fork avec ses sockets : on le ferme avant de forker
+    connections.close_all()
+    for alias in connections:
+        close_pool = getattr(connections[alias], 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        for future in [pool.submit(function, index, *args) for index in batches]:
+            future.result()
+
+
+def generated_user_ids(role):
+    """``pk`` of the generated users of a role, in generation order."""
+    prefix = f'seed_{role}'
+    rows = User.objects.filter(username__startswith=prefix).values_list('username', 'pk')
+    user_ids = [None] * _context[f'{role}s']
+    for username, pk in rows:
+        user_ids[int(username[len(prefix):])] = pk
+    return user_ids
+
+
+def order_numbering(start, step, count):
+    """First order index of each year and the last number already used that year."""
+    year_first, year_offset = {}, {}
+    for year in range(start.year, (start + step * (count - 1)).year + 1):
+        # Premier indice dont la date tombe dans l'année (même calcul que generate_orders)
+        low, high = 0, count - 1
+        while low < high:
+            middle = (low + high) // 2
+            if (start + step * middle).year >= year:
+                high = middle
+            else:
+                low = middle + 1
+        year_first[year] = low
+        prefix = f'GC{year}'
+        last = (
+            Order.objects.filter(order_number__startswith=prefix)
+            .order_by(Length('order_number').desc(), '-order_number')
+            .values_list('order_number', flat=True).first()
+        )
+        year_offset[year] = int(last[len(prefix):]) if last else 0
+    return year_first, year_offset
+
+
+def seed(consumers, producers, products, images, carts, orders,
+         seed=42, batch_size=5000, workers=1, log=print):
+    """Generate the dataset phase by phase; return ``{phase: rows}``."""
+    if User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+        raise ValueError(
+            f"Generated data (@{EMAIL_DOMAIN}) is already present: start from an empty database."
+        )
+    if workers > 1 and connection.vendor == 'sqlite':
+        raise ValueError("SQLite allows a single writer: use --workers 1.")
+    if (carts or orders) and not (consumers and products):
+        raise ValueError("Carts and orders need consumers and products.")
+    if products and not producers:
+        raise ValueError("Products need producers.")
+
+    _context.clear()
+    _context.update(
+        seed=seed, batch_size=batch_size, now=timezone.now(), password=make_password(PASSWORD),
+        consumers=consumers, producers=producers, products=products,
+        images_per_product=images, carts=min(carts, consumers), orders=orders,
+    )
+    inserted = {}
+
+    def phase(name, function, count, *args):
+        started = time.perf_counter()
+        run_batches(function, count, *args, workers=workers)
+        inserted[name] = count
+        log(f"{name}: {count} in {time.perf_counter() - started:.1f}s")
+
+    _context['categories'] = [
+        (Category.objects.get_or_create(
+            name=name, defaults={'icon': icon, 'description': f'{name} de producteurs locaux'}
+        )[0].pk, names)
+        for name, (icon, names) in CATEGORIES.items()
+    ]
+    phase('consumers', generate_users, consumers, 'consumer')
+    phase('producer users', generate_users, producers, 'producer')
+
+    _context['producer_user_ids'] = generated_user_ids('producer')
+    phase('producers', generate_producers, producers)
+
+    # Ordre de génération, pas celui des clés : identique quel que soit le nombre de workers
+    by_user = dict(
+        Producer.objects.filter(user__username__startswith='seed_producer')
+        .values_list('user_id', 'pk')
+    )
+    producer_ids = [by_user[user_id] for user_id in _context['producer_user_ids']]
+    producer_users = {pk: user_id for user_id, pk in by_user.items()}
+    _context.update(producer_ids=producer_ids, producer_users=producer_users, images=render_images())
+    phase('products', generate_products, products)
+
+    _context.update(
+        consumer_ids=generated_user_ids('consumer'),
+        catalog=list(
+            Product.objects.filter(producer__user__username__startswith='seed_producer')
+            .order_by('pk')
+            .values_list('pk', 'producer_id', 'price')
+        ),
+    )
+    phase('carts', generate_carts, _context['carts'])
+
+    if orders:
+        start = _context['now'] - timedelta(days=365)
+        step = timedelta(days=365) / orders
+        year_first, year_offset = order_numbering(start, step, orders)
+        _context.update(orders_start=start, orders_step=step,
+                        year_first=year_first, year_offset=year_offset)
+    phase('orders', generate_orders, orders)
+
+    # bulk_create ne déclenche pas les signaux : compteurs et statistiques à refaire
+    reconcile_producer_counters()
+    rebuild_daily_signups()
+    invalidate_user_stats()
+    invalidate_catalog()
+    _context.clear()
+    return inserted
+
+
+# ==============================================================================
+# Comptes de démonstration
+# ==============================================================================
+
+DEMO_CONSUMER = {
+    'email': 'consumer@test.com', 'username': 'consumer_marie',
+    'first_name': 'Marie', 'last_name': 'Dupont',
+}
+DEMO_PRODUCERS = [
+    {
+        'email': 'ferme.bio@test.com', 'username': 'producer_jean',
+        'first_name': 'Jean', 'last_name': 'Martin',
+        'business_name': 'Ferme Bio Martin',
+        'description': 'Ferme biologique familiale depuis 3 générations',
+        'products': [
+            ('Légumes', 'Tomates cerises bio', 'Tomates cerises biologiques, cultivées sous serre',
+             '4.50', 50, 'kg', True),
+            ('Légumes', 'Courgettes bio', 'Courgettes fraîches biologiques', '3.20', 30, 'kg', True),
+            ('Fruits', 'Pommes Golden bio', 'Pommes Golden biologiques, récoltées à maturité',
+             '5.80', 100, 'kg', True),
+        ],
+    },
+    {
+        'email': 'maraicher.local@test.com', 'username': 'producer_sophie',
+        'first_name': 'Sophie', 'last_name': 'Bernard',
+        'business_name': 'Maraîchage Local Sophie',
+        'description': 'Légumes frais cultivés localement sans pesticides',
+        'products': [
+            ('Légumes', 'Salade mesclun', 'Mélange de jeunes pousses de salade',
+             '2.80', 25, 'box', False),
+            ('Légumes', 'Radis roses', 'Radis roses croquants et savoureux', '1.50', 40, 'bunch', False),
+            ('Fruits', 'Fraises de saison', 'Fraises fraîches cultivées localement',
+             '8.90', 20, 'box', False),
+        ],
+    },
+]
+
+
+def _demo_user(data, user_type):
+    user, _ = User.objects.get_or_create(
+        email=data['email'],
+        defaults={
+            'username': data['username'], 'first_name': data['first_name'],
+            'last_name': data['last_name'], 'user_type': user_type,
+            'phone_number': '+237677123456', 'password': make_password(PASSWORD),
+        }
+    )
+    return user
+
+
+def create_demo_accounts():
+    """The fixed accounts used in the docs (``PASSWORD``); idempotent."""
+    _demo_user(DEMO_CONSUMER, 'CONSUMER')
+    for data in DEMO_PRODUCERS:
+        user = _demo_user(data, 'PRODUCER')
+        producer, _ = Producer.objects.get_or_create(
+            user=user,
+            defaults={'business_name': data['business_name'], 'description': data['description'],
+                      'region': 'Île-de-France', 'is_verified': True}
+        )
+        for category, name, description, price, quantity, unit, organic in data['products']:
+            Product.objects.get_or_create(
+                producer=producer, name=name,
+                defaults={
+                    'category': Category.objects.get_or_create(name=category)[0],
+                    'description': description, 'price': Decimal(price),
+                    'quantity_available': quantity, 'unit': unit,
+                    'is_organic': organic, 'is_local': True,
+                }
+            )
+    return [DEMO_CONSUMER['email']] + [data['email'] for data in DEMO_PRODUCERS]
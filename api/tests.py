@@ -1,3 +1,240 @@
-from django.test import TestCase
+"""
+Tests for the transactional outbox (claiming and leasing, retries with
+backoff, webhook delivery) and for the ``seed`` command.
+"""
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from cart.models import Cart
+from orders.models import Order, OrderItem
+
+from . import outbox
+from .models import OutboxEvent
+
+handled = []
+
+
+def record_handler(event):
+    handled.append(event.pk)
+
+
+def failing_handler(event):
+    raise RuntimeError('receiver down')
+
+
+flaky = []
+
+
+def flaky_handler(event):
+    """Raises the queued exceptions one call at a time, then succeeds."""
+    if flaky:
+        raise flaky.pop(0)
+
+
+def make_event(event_type='order.created', **fields):
+    return OutboxEvent.objects.create(
+        event_type=event_type, aggregate_type='orders.Order', aggregate_id='1',
+        payload={'order_number': 'GC2026001'}, **fields
+    )
+
+
+class OutboxTestCase(TestCase):
+
+    def setUp(self):
+        handled.clear()
+        flaky.clear()
+        outbox._handler_cache.clear()
+        self.addCleanup(outbox._handler_cache.clear)
+
+
+@override_settings(OUTBOX_LEASE_SECONDS=300)
+class ClaimBatchTests(OutboxTestCase):
+
+    def test_claims_due_events_in_order_and_leases_them(self):
+        first, second = make_event(), make_event()
+        make_event(available_at=timezone.now() + timedelta(minutes=5))
+        make_event(status='PROCESSED')
+
+        claimed = outbox.claim_batch()
+
+        self.assertEqual([event.pk for event in claimed], [first.pk, second.pk])
+        self.assertEqual([event.attempts for event in claimed], [1, 1])
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 1)
+        self.assertGreater(first.available_at, timezone.now() + timedelta(seconds=290))
+
+    def test_leased_events_are_not_claimed_again(self):
+        make_event()
+        self.assertEqual(len(outbox.claim_batch()), 1)
+        self.assertEqual(outbox.claim_batch(), [])
+
+    def test_expired_lease_makes_the_event_due_again(self):
+        event = make_event()
+        outbox.claim_batch()
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+
+        claimed = outbox.claim_batch()
+
+        self.assertEqual([e.attempts for e in claimed], [2])
+
+    def test_batch_size_limits_the_claim(self):
+        for _ in range(3):
+            make_event()
+        self.assertEqual(len(outbox.claim_batch(batch_size=2)), 2)
+        self.assertEqual(len(outbox.claim_batch(batch_size=2)), 1)
+
+
+@override_settings(
+    OUTBOX_HANDLERS={'order.*': ['api.tests.record_handler'], 'user.*': ['api.tests.failing_handler']},
+    OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=2, OUTBOX_RETRY_MAX_SECONDS=60,
+)
+class ProcessEventTests(OutboxTestCase):
+
+    def test_success_marks_the_event_processed(self):
+        event = make_event()
+        self.assertEqual(outbox.drain(), (1, 0))
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'PROCESSED')
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(handled, [event.pk])
+
+    def test_failure_schedules_a_retry_with_backoff(self):
+        event = make_event('user.deleted')
+        self.assertEqual(outbox.drain(), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'PENDING')
+        self.assertEqual(event.last_error, 'api.tests.failing_handler: RuntimeError: receiver down')
+        # First retry: 2s base, jittered down to half
+        delay = (event.available_at - timezone.now()).total_seconds()
+        self.assertTrue(0 < delay <= 2, delay)
+        # Not due yet, so a second drain leaves it alone
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    def test_last_attempt_marks_the_event_failed(self):
+        event = make_event('user.deleted', attempts=2)
+        outbox.drain()
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ('FAILED', 3))
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        self.assertEqual(outbox.claim_batch(), [])
+
+    @override_settings(OUTBOX_HANDLERS={'order.*': ['api.tests.record_handler', 'api.tests.flaky_handler']})
+    def test_retries_only_run_the_failed_handlers(self):
+        event = make_event()
+        flaky.append(RuntimeError('receiver down'))
+        self.assertEqual(outbox.drain(), (0, 1))
+        event.refresh_from_db()
+        self.assertEqual(event.completed, ['api.tests.record_handler'])
+
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(handled, [event.pk])
+        event.refresh_from_db()
+        self.assertEqual(event.completed, ['api.tests.record_handler', 'api.tests.flaky_handler'])
+
+    def test_events_without_handlers_are_processed(self):
+        make_event('product.updated')
+        self.assertEqual(outbox.drain(), (1, 0))
+
+    def test_retry_delay_grows_exponentially_up_to_the_ceiling(self):
+        for attempts, ceiling in ((1, 2), (2, 4), (4, 16), (10, 60)):
+            delay = outbox.retry_delay(attempts)
+            self.assertTrue(ceiling / 2 <= delay <= ceiling, (attempts, delay))
+
+
+class WebhookSink(BaseHTTPRequestHandler):
+    """Records each delivery and answers with the server's ``status`` (or its path's)."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.deliveries.append((self.headers, body))
+        self.send_response(self.server.statuses.get(self.path, self.server.status))
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DeliverWebhooksTests(OutboxTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookSink)
+        self.server.deliveries = []
+        self.server.status = 204
+        self.server.statuses = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hooks'
+
+    def test_posts_a_signed_event(self):
+        event = make_event()
+        with self.settings(OUTBOX_WEBHOOK_URLS=[self.url], OUTBOX_WEBHOOK_SECRET='s3cret'):
+            outbox.deliver_webhooks(event)
+
+        [(headers, body)] = self.server.deliveries
+        self.assertEqual(headers['X-GreenCart-Event'], 'order.created')
+        self.assertEqual(headers['X-GreenCart-Delivery'], str(event.pk))
+        expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers['X-GreenCart-Signature'], f'sha256={expected}')
+        self.assertEqual(json.loads(body)['payload'], {'order_number': 'GC2026001'})
+
+    def test_no_urls_sends_nothing(self):
+        with self.settings(OUTBOX_WEBHOOK_URLS=[]):
+            outbox.deliver_webhooks(make_event())
+        self.assertEqual(self.server.deliveries, [])
+
+    @override_settings(OUTBOX_HANDLERS={'*': ['api.outbox.deliver_webhooks']})
+    def test_rejected_delivery_is_retried(self):
+        event = make_event()
+        self.server.status = 503
+        with self.settings(OUTBOX_WEBHOOK_URLS=[self.url]):
+            self.assertEqual(outbox.drain(), (0, 1))
+            event.refresh_from_db()
+            self.assertEqual(event.status, 'PENDING')
+            self.assertIn('503', event.last_error)
+
+            self.server.status = 204
+            OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+            self.assertEqual(outbox.drain(), (1, 0))
+
+        self.assertEqual(len(self.server.deliveries), 2)
+
+    @override_settings(OUTBOX_HANDLERS={'*': ['api.outbox.deliver_webhooks']})
+    def test_retries_skip_the_urls_that_accepted_the_event(self):
+        event = make_event()
+        down = self.url.replace('/hooks', '/down')
+        self.server.statuses['/down'] = 503
+        with self.settings(OUTBOX_WEBHOOK_URLS=[down, self.url]):
+            self.assertEqual(outbox.drain(), (0, 1))
+            event.refresh_from_db()
+            self.assertEqual(event.completed, [f'webhook:{self.url}'])
+
+            self.server.statuses.clear()
+            OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+            self.assertEqual(outbox.drain(), (1, 0))
+
+        # /down deux fois, /hooks une seule
+        self.assertEqual(len(self.server.deliveries), 3)
+
+
+class SeedTests(TestCase):
+
+    def test_catalog_smaller_than_an_order(self):
+        # Jusqu'à 5 lignes par commande et 4 par panier, pour 2 produits
+        call_command(
+            'seed', consumers=3, producers=1, products=2, carts=3, orders=20,
+            no_demo=True, verbosity=0,
+        )
+        self.assertEqual(Cart.objects.count(), 3)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertLessEqual(OrderItem.objects.count(), 40)
@@ -6,6 +6,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.conf import settings
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
@@ -13,6 +14,8 @@ from drf_spectacular.utils import extend_schema
 from drf_spectacular.openapi import OpenApiResponse
 import django
 
+from core.profiling import profile_download, profile_list
+
 
 @extend_schema(
     summary="API Root",
@@ -78,6 +81,13 @@ def api_root(request):
                 'schema': '/api/schema/',
                 'swagger_ui': '/api/docs/',
                 'redoc': '/api/redoc/',
+            },
+            'health': {
+                'liveness': settings.HEALTH_LIVENESS_PATH,
+                'readiness': settings.HEALTH_READINESS_PATH,
+            },
+            'profiling': {
+                'profiles': '/api/profiles/',
             }
         },
         'authentication': {
@@ -91,6 +101,30 @@ def api_root(request):
 
 app_name = 'api'
 
+
+class PrebuiltSpectacularAPIView(SpectacularAPIView):
+    """
+    Serve the schema generated at image build (``OPENAPI_SCHEMA_DIR``).
+
+    Falls back to generating it when the file is missing (development) or
+    when a specific ``lang``/``version`` is requested.
+    """
+
+    prebuilt_files = {'yaml': 'schema.yaml', 'openapi': 'schema.yaml',
+                      'json': 'schema.json', 'openapi-json': 'schema.json'}
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        filename = self.prebuilt_files.get(request.accepted_renderer.format)
+        path = settings.OPENAPI_SCHEMA_DIR / filename if filename else None
+        if path is None or 'lang' in request.GET or 'version' in request.GET or not path.exists():
+            return super().get(request, *args, **kwargs)
+        content_type = request.accepted_media_type
+        if request.accepted_renderer.charset:
+            content_type = f'{content_type}; charset={request.accepted_renderer.charset}'
+        return HttpResponse(path.read_bytes(), content_type=content_type)
+
+
 # CSRF-exempt wrapper for Swagger views
 @method_decorator(csrf_exempt, name='dispatch')
 class CSRFExemptSpectacularSwaggerView(SpectacularSwaggerView):
@@ -109,7 +143,7 @@ urlpatterns = [
     path('', api_root, name='api_root'),
 
     # API Documentation with CSRF exemption
-    path('schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('schema/', PrebuiltSpectacularAPIView.as_view(), name='schema'),
     path('docs/', CSRFExemptSpectacularSwaggerView.as_view(url_name='api:schema'), name='swagger-ui'),
     path('redoc/', CSRFExemptSpectacularRedocView.as_view(url_name='api:schema'), name='redoc'),
 
@@ -119,6 +153,9 @@ urlpatterns = [
     path('cart/', include('cart.urls', namespace='cart')),
     path('orders/', include('orders.urls', namespace='orders')),
 
-    # Health check
-    path('health/', api_root, name='health_check'),
+    # Request profiles (staff only), recorded by core.profiling.ProfilingMiddleware
+    path('profiles/', profile_list, name='profile-list'),
+    path('profiles/<str:profile_id>/', profile_download, name='profile-download'),
+
+    # Health checks: served by core.health.HealthCheckMiddleware
 ]
\ No newline at end of file
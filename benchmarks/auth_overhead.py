@@ -0,0 +1,77 @@
+"""
+Measure per-request token authentication overhead.
+
+Compares DRF's TokenAuthentication with CachedTokenAuthentication on an
+in-memory database and prints p50/p99 latencies and query counts.
+
+Usage:
+    python benchmarks/auth_overhead.py [--requests 2000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.testing')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework.authentication import TokenAuthentication  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from accounts.authentication import CachedTokenAuthentication  # noqa: E402
+from accounts.models import User  # noqa: E402
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def measure(authenticator, request, count):
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(count):
+            start = time.perf_counter()
+            authenticator.authenticate(request)
+            timings.append((time.perf_counter() - start) * 1e6)
+    return timings, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    user = User.objects.create_user(
+        email='bench@greencart.test', username='bench', password='bench-pass'
+    )
+    token = Token.objects.create(user=user)
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    print(f"{'backend':<28}{'p50 (µs)':>10}{'p99 (µs)':>10}{'queries':>10}")
+    for name, authenticator in (
+        ('TokenAuthentication', TokenAuthentication()),
+        ('CachedTokenAuthentication', CachedTokenAuthentication()),
+    ):
+        measure(authenticator, request, 50)  # warm-up
+        timings, queries = measure(authenticator, request, args.requests)
+        print(
+            f"{name:<28}{statistics.median(timings):>10.1f}"
+            f"{percentile(timings, 99):>10.1f}{queries:>10}"
+        )
+
+
+if __name__ == '__main__':
+    main()
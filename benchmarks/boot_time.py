@@ -0,0 +1,108 @@
+"""
+Measure container boot time: the legacy start command against release + web.
+
+``legacy`` is the former Dockerfile CMD (diagnostic, migrate, collectstatic
+--clear, test data and tokens on every start, then gunicorn). Its test
+data step ran ``create_test_data.py``, since replaced by ``manage.py
+seed``: the demo accounts and products only (every count at 0), which is
+what the script created, idempotent so that each boot reruns it. ``web`` is the
+current CMD (gunicorn only), after ``manage.py release`` ran once. Each boot
+is timed from process spawn to the first successful HTTP response, on a
+throwaway SQLite database, under core.settings.production_minimal.
+
+Usage:
+    python benchmarks/boot_time.py [--runs 3] [--workers 1] [--modes legacy,web]
+"""
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROBE_PATH = '/api/products/categories/'
+
+LEGACY_COMMAND = (
+    "python diagnostic.py && python manage.py migrate --noinput && "
+    "python manage.py collectstatic --noinput --clear && "
+    "python manage.py seed --consumers 0 --producers 0 --products 0 --carts 0 --orders 0 && "
+    "python fix_swagger_auth.py || true && "
+    "gunicorn --bind 0.0.0.0:$PORT --workers $WORKERS --timeout 120 core.wsgi:application"
+)
+WEB_COMMAND = "gunicorn -c gunicorn.conf.py"
+
+
+def wait_for_http(process, port, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"server exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', PROBE_PATH)
+            if connection.getresponse().status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.02)
+    sys.exit(f"no response on port {port} after {timeout}s")
+
+
+def boot(command, env, port):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        ['sh', '-c', command], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        wait_for_http(process, port)
+        return time.perf_counter() - start
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def timed(args, env):
+    start = time.perf_counter()
+    subprocess.run(args, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--modes', default='legacy,web')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='greencart-boot-'))
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='core.settings.production_minimal',
+        DATABASE_URL=f'sqlite:///{workdir / "db.sqlite3"}',
+        PORT=str(args.port),
+        WORKERS=str(args.workers),
+        SERVER_MODE='wsgi',
+    )
+    try:
+        manage = [sys.executable, 'manage.py']
+        print(f"{'step':<24}{'seconds':>10}")
+        print(f"{'release (first)':<24}{timed(manage + ['release'], env):>10.2f}")
+        print(f"{'release (no-op)':<24}{timed(manage + ['release'], env):>10.2f}")
+        for mode in args.modes.split(','):
+            command = LEGACY_COMMAND if mode == 'legacy' else WEB_COMMAND
+            timings = [boot(command, env, args.port) for _ in range(args.runs)]
+            print(f"{f'boot {mode} (median)':<24}{statistics.median(timings):>10.2f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure response compression and the catalog cache on product listings.
+
+Seeds products (``manage.py seed``) in an in-memory database, then prints,
+for the product list, a product and the categories, the body size and
+compression time per encoding and level (the fast levels used per
+request, the dense ones used once for cached variants), and the p50 time
+of a full request (``Accept-Encoding: br, gzip``) without cache, on a
+cache miss and on a hit.
+
+Usage:
+    python benchmarks/compression.py [--products 100] [--runs 50]
+"""
+import argparse
+
+from json_rendering import timed  # sets Django up
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from core.compression import ENCODINGS, compress
+from products.cache import invalidate_catalog
+from products.models import Product
+
+
+class SingleProcessCache(LocMemCache):
+    """``LocMemCache`` that ``cache_is_shared()`` accepts: every request runs in this process."""
+
+
+SHARED_CACHES = {'default': {'BACKEND': '__main__.SingleProcessCache'}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command(
+        'seed', consumers=10, producers=20, products=args.products, carts=0, orders=0,
+        no_demo=True, verbosity=0,
+    )
+    client = APIClient(HTTP_ACCEPT_ENCODING='br, gzip')
+    product = Product.objects.filter(is_active=True).order_by('pk').first()
+
+    for url in ('/api/products/products/', f'/api/products/products/{product.pk}/',
+                '/api/products/categories/'):
+        body = client.get(url, HTTP_ACCEPT_ENCODING='').content
+        print(f"{url}: {len(body) / 1024:.1f} KiB")
+        for encoding in ENCODINGS:
+            for cached in (False, True):
+                label = f"{encoding} (cache)" if cached else encoding
+                print(f"  {label:<16}{len(compress(body, encoding, cached)) / 1024:>8.1f} KiB"
+                      f"{timed(lambda: compress(body, encoding, cached), args.runs):>9.2f}ms")
+
+        with override_settings(CATALOG_CACHE_TIMEOUT=0):
+            uncached = timed(lambda: client.get(url), args.runs)
+        with override_settings(CATALOG_CACHE_TIMEOUT=60, CACHES=SHARED_CACHES):
+            def miss():
+                invalidate_catalog()
+                client.get(url)
+            missed = timed(miss, args.runs)
+            hit = timed(lambda: client.get(url), args.runs)
+            cache.clear()
+        print(f"  request: no cache {uncached:.2f}ms, miss {missed:.2f}ms, hit {hit:.2f}ms\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare PostgreSQL connection modes on a connect-heavy workload.
+
+Each simulated request runs a few short queries and then ends the way a
+Django request does (``close_if_unusable_or_obsolete``), from several
+threads at once. The modes are:
+
+- ``no-reuse``: CONN_MAX_AGE=0, a new connection per request (the cost
+  paid after idle periods and during deploys);
+- ``persistent``: CONN_MAX_AGE=60 with health checks;
+- ``pool``: psycopg 3 pool (DB_POOL_* settings).
+
+Prints latency percentiles and the number of server connections opened.
+Requires a PostgreSQL DATABASE_URL.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/db_connections.py \\
+        [--requests 2000] [--threads 8] [--queries 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.base')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db.utils import ConnectionHandler  # noqa: E402
+
+from core.settings.base import connection_settings  # noqa: E402
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def database_for(mode):
+    database = {
+        key: value for key, value in settings.DATABASES['default'].items()
+        if key not in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')
+    }
+    database['OPTIONS'] = {
+        key: value for key, value in database.get('OPTIONS', {}).items()
+        if key != 'pool'
+    }
+    if mode == 'no-reuse':
+        connection_settings(database, 'persistent')
+        database['CONN_MAX_AGE'] = 0
+    else:
+        connection_settings(database, mode)
+    return database
+
+
+def run(mode, requests, threads, queries):
+    handler = ConnectionHandler({'default': database_for(mode)})
+    backends = set()
+    backends_lock = threading.Lock()
+
+    def request(_):
+        connection = handler['default']
+        start = time.perf_counter()
+        connection.close_if_unusable_or_obsolete()  # request_started
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+            for _ in range(queries - 1):
+                cursor.execute('SELECT 1')
+        connection.close_if_unusable_or_obsolete()  # request_finished
+        elapsed = (time.perf_counter() - start) * 1000
+        with backends_lock:
+            backends.add(pid)
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(request, range(threads * 2)))  # warm-up
+        backends.clear()
+        start = time.perf_counter()
+        timings = list(executor.map(request, range(requests)))
+        duration = time.perf_counter() - start
+        # Fermer les connexions de chaque thread avant de changer de mode
+        list(executor.map(lambda _: handler['default'].close(), range(threads)))
+
+    if mode == 'pool':
+        handler['default'].close_pool()
+    return timings, duration, len(backends)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=3)
+    parser.add_argument('--modes', default='no-reuse,persistent,pool')
+    args = parser.parse_args()
+
+    if 'postgresql' not in settings.DATABASES['default']['ENGINE']:
+        sys.exit("Set DATABASE_URL to a PostgreSQL database to run this benchmark.")
+
+    print(
+        f"{'mode':<12}{'req/s':>9}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+        f"{'max (ms)':>10}{'backends':>10}"
+    )
+    for mode in args.modes.split(','):
+        timings, duration, backends = run(mode, args.requests, args.threads, args.queries)
+        print(
+            f"{mode:<12}{len(timings) / duration:>9.0f}{statistics.median(timings):>10.2f}"
+            f"{percentile(timings, 99):>10.2f}{max(timings):>10.2f}{backends:>10}"
+        )
+
+
+if __name__ == '__main__':
+    main()
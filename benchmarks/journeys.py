@@ -0,0 +1,326 @@
+"""
+Benchmark the API hot paths with scripted user journeys.
+
+Seeds a dataset (``manage.py seed``) into ``DATABASE_URL`` (by
+default a throwaway SQLite file), starts ``gunicorn -c gunicorn.conf.py``
+on it, then runs virtual users through weighted journeys:
+
+- ``browse``: catalog list, search, category filter, product detail;
+- ``cart``: add to cart, current cart, cart summary;
+- ``checkout``: add two products, order from the cart, order detail;
+- ``producer``: producer orders, statistics, own products.
+
+Prints throughput and p50/p95/p99 per endpoint. With a baseline
+(``--baseline``, written by ``--save-baseline``), flags the endpoints whose
+p95 grew or whose throughput dropped by more than ``--tolerance`` and
+exits with status 1.
+
+Usage:
+    python benchmarks/journeys.py [--scale 0.1] [--duration 60] [--users 32] \\
+        [--save-baseline | --baseline benchmarks/baselines/journeys.json]
+    python benchmarks/journeys.py --url http://127.0.0.1:8000 --no-seed
+"""
+import argparse
+import atexit
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baselines' / 'journeys.json'
+
+WORKDIR = Path(tempfile.mkdtemp(prefix='greencart-journeys-'))
+atexit.register(shutil.rmtree, WORKDIR, ignore_errors=True)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.production_minimal')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{WORKDIR / "db.sqlite3"}')
+# Les limites de débit fausseraient la mesure
+os.environ['RATELIMIT_ENABLED'] = 'False'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from api.seeding import EMAIL_DOMAIN  # noqa: E402
+from loadgen import percentile, start_server, stop_server  # noqa: E402
+from products.models import Category, Product  # noqa: E402
+
+SEARCH_TERMS = ['tomates', 'miel', 'fromage', 'pommes', 'pain', 'bio', 'ferme', 'cidre']
+JOURNEY_WEIGHTS = {'browse': 60, 'cart': 15, 'checkout': 10, 'producer': 15}
+# En dessous, le p95 d'un endpoint est trop bruité pour signaler une régression
+MIN_SAMPLES = 30
+DELIVERY = {
+    'delivery_address': '12 rue des Lilas',
+    'delivery_city': 'Lyon',
+    'delivery_postal_code': '69001',
+}
+
+
+class Session:
+    """One virtual user: a keep-alive connection, a token and its timings."""
+
+    def __init__(self, base_url, token, results):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.headers = {'Authorization': f'Token {token}', 'Content-Type': 'application/json'}
+        self.results = results
+        self.connection = None
+
+    def request(self, label, method, path, body=None):
+        """Time one request under ``label``; return the decoded JSON (or ``None``)."""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            self.connection.request(
+                method, path, body=json.dumps(body) if body is not None else None,
+                headers=self.headers
+            )
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            self.results.error(label)
+            return None
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status >= 400:
+            self.results.error(label)
+            return None
+        self.results.record(label, elapsed)
+        return json.loads(content) if content else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, elapsed):
+        with self.lock:
+            self.timings[label].append(elapsed)
+
+    def error(self, label):
+        with self.lock:
+            self.errors[label] += 1
+
+    def summary(self, elapsed):
+        labels = sorted(set(self.timings) | set(self.errors))
+        return {
+            label: {
+                'requests': len(self.timings[label]),
+                'errors': self.errors[label],
+                'rps': round(len(self.timings[label]) / elapsed, 2),
+                'p50': round(percentile(self.timings[label], 50), 2) if self.timings[label] else None,
+                'p95': round(percentile(self.timings[label], 95), 2) if self.timings[label] else None,
+                'p99': round(percentile(self.timings[label], 99), 2) if self.timings[label] else None,
+            }
+            for label in labels
+        }
+
+
+# ==============================================================================
+# Parcours
+# ==============================================================================
+
+def browse(session, rng, fixtures):
+    session.request('catalog list', 'GET', '/api/products/products/')
+    session.request('catalog search', 'GET',
+                    f'/api/products/products/?search={quote(rng.choice(SEARCH_TERMS))}')
+    session.request('catalog by category', 'GET',
+                    f'/api/products/products/?category={rng.choice(fixtures["categories"])}'
+                    '&ordering=price')
+    session.request('product detail', 'GET',
+                    f'/api/products/products/{rng.choice(fixtures["products"])}/')
+
+
+def cart(session, rng, fixtures):
+    session.request('cart add', 'POST', '/api/cart/add/',
+                    {'product_id': rng.choice(fixtures['products']), 'quantity': 1})
+    session.request('cart current', 'GET', '/api/cart/cart/current/')
+    session.request('cart summary', 'GET', '/api/cart/summary/')
+
+
+def checkout(session, rng, fixtures):
+    for product_id in rng.sample(fixtures['products'], 2):
+        session.request('cart add', 'POST', '/api/cart/add/',
+                        {'product_id': product_id, 'quantity': 1})
+    created = session.request('checkout', 'POST', '/api/orders/create-from-cart/', DELIVERY)
+    if created:
+        session.request('order detail', 'GET', f"/api/orders/{created['order']['id']}/")
+    session.request('my orders', 'GET', '/api/orders/my-orders/')
+
+
+def producer(session, rng, fixtures):
+    session.request('producer orders', 'GET', '/api/orders/producer-orders/')
+    session.request('order statistics', 'GET', '/api/orders/statistics/')
+    session.request('my products', 'GET', '/api/products/products/my_products/')
+
+
+JOURNEYS = {'browse': browse, 'cart': cart, 'checkout': checkout, 'producer': producer}
+
+
+def run(base_url, fixtures, users, duration, seed):
+    """Run ``users`` virtual users for ``duration`` seconds; return the summary."""
+    results = Results()
+    names = list(JOURNEY_WEIGHTS)
+    weights = [JOURNEY_WEIGHTS[name] for name in names]
+    stop_at = time.monotonic() + duration
+
+    def virtual_user(index):
+        rng = random.Random(seed + index)
+        sessions = {
+            'consumer': Session(base_url, fixtures['consumer_tokens'][index], results),
+            'producer': Session(base_url, fixtures['producer_tokens'][index], results),
+        }
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            role = 'producer' if name == 'producer' else 'consumer'
+            JOURNEYS[name](sessions[role], rng, fixtures)
+        for session in sessions.values():
+            session.close()
+
+    threads = [threading.Thread(target=virtual_user, args=(index,)) for index in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.summary(time.perf_counter() - start)
+
+
+# ==============================================================================
+# Données, rapport et comparaison
+# ==============================================================================
+
+def load_fixtures(users, seed):
+    """Tokens for ``users`` consumers and producers, and sample catalog ids."""
+    rng = random.Random(seed)
+    fixtures = {}
+    for role, user_type in (('consumer', 'CONSUMER'), ('producer', 'PRODUCER')):
+        accounts = list(
+            User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}', user_type=user_type)
+            .order_by('pk')[:users]
+        )
+        if len(accounts) < users:
+            sys.exit(f"only {len(accounts)} seeded {role}s for {users} virtual users")
+        fixtures[f'{role}_tokens'] = [Token.objects.get_or_create(user=user)[0].key
+                                      for user in accounts]
+    product_ids = list(
+        Product.objects.filter(is_active=True, quantity_available__gte=100)
+        .order_by('pk').values_list('pk', flat=True)[:20000]
+    )
+    fixtures['products'] = [str(pk) for pk in rng.sample(product_ids, min(2000, len(product_ids)))]
+    fixtures['categories'] = [str(pk) for pk in Category.objects.values_list('pk', flat=True)]
+    return fixtures
+
+
+def report(summary, baseline, tolerance):
+    """Print the results table; return the labels that regressed against ``baseline``."""
+    regressions = []
+    print(f"{'endpoint':<22}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+          f"{'p95 vs base':>13}")
+    for label, row in summary.items():
+        line = (f"{label:<22}{row['rps']:>8.1f}{row['p50'] or 0:>9.1f}"
+                f"{row['p95'] or 0:>9.1f}{row['p99'] or 0:>9.1f}{row['errors']:>8}")
+        base = baseline.get(label)
+        comparable = (base and base.get('p95') and row['p95']
+                      and min(row['requests'], base['requests']) >= MIN_SAMPLES)
+        if comparable:
+            change = row['p95'] / base['p95'] - 1
+            slower = change > tolerance
+            fewer = row['rps'] < base['rps'] * (1 - tolerance)
+            line += f"{change:>+12.0%}" + (' REGRESSION' if slower or fewer else '')
+            if slower or fewer:
+                regressions.append(label)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='benchmark a running server instead of starting gunicorn')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', default='wsgi', help='SERVER_MODE of the started server')
+    parser.add_argument('--users', type=int, default=32, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='dataset size: 1.0 = 2k producers, 200k products, 100k orders')
+    parser.add_argument('--no-seed', action='store_true', help='reuse an already seeded database')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--seed-workers', type=int, default=1,
+                        help='processes generating the dataset (PostgreSQL only)')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed p95 increase / throughput decrease before flagging')
+    parser.add_argument('--output', type=Path, help='also write the results as JSON')
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        call_command('migrate', verbosity=0)
+        start = time.perf_counter()
+        call_command(
+            'seed',
+            consumers=max(args.users, int(20000 * args.scale)),
+            producers=max(args.users, int(2000 * args.scale)),
+            products=int(200000 * args.scale),
+            images=0,
+            carts=0,
+            orders=int(100000 * args.scale),
+            seed=args.seed,
+            workers=args.seed_workers,
+            no_demo=True,
+        )
+        print(f"seeded in {time.perf_counter() - start:.1f}s")
+    fixtures = load_fixtures(args.users, args.seed)
+
+    if args.url:
+        summary = run(args.url, fixtures, args.users, args.duration, args.seed)
+    else:
+        process = start_server(args.mode, args.port, args.workers)
+        try:
+            summary = run(f'http://127.0.0.1:{args.port}', fixtures, args.users,
+                          args.duration, args.seed)
+        finally:
+            stop_server(process)
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())['endpoints']
+    regressions = report(summary, baseline, args.tolerance)
+
+    document = {'users': args.users, 'duration': args.duration, 'scale': args.scale,
+                'mode': args.mode, 'endpoints': summary}
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(document, indent=2) + '\n')
+        print(f"baseline written to {args.baseline}")
+    if regressions:
+        sys.exit(f"regressions: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
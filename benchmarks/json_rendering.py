@@ -0,0 +1,101 @@
+"""
+Compare DRF's JSON renderer/parser with the orjson-backed ones.
+
+Seeds a small dataset (``manage.py seed``) in an in-memory database, builds
+``ProductListSerializer`` and ``OrderSerializer`` payloads plus raw order
+rows (native Decimal/UUID/datetime values), then prints the serialization
+time and the p50 render and parse times of ``JSONRenderer``/``JSONParser``
+against ``FastJSONRenderer``/``FastJSONParser``, and whether both
+renderers give the same bytes.
+
+Usage:
+    python benchmarks/json_rendering.py [--products 500] [--orders 200] [--runs 50]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.testing')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from core.parsers import FastJSONParser  # noqa: E402
+from core.renderers import FastJSONRenderer, orjson  # noqa: E402
+from orders.models import Order  # noqa: E402
+from orders.serializers import OrderSerializer  # noqa: E402
+from products.models import Product  # noqa: E402
+from products.serializers import ProductListSerializer  # noqa: E402
+
+
+def timed(function, runs):
+    """Median duration of ``function()`` in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def payloads(products, orders):
+    """``{name: (serialization ms, data)}``."""
+    product_rows = Product.objects.select_related('producer', 'category').order_by('pk')[:products]
+    order_rows = Order.objects.prefetch_related(
+        'items__product', 'status_history__changed_by', 'sub_orders__producer__user',
+    ).order_by('pk')[:orders]
+    built = {}
+    for name, build in (
+        ('products', lambda: ProductListSerializer(product_rows, many=True).data),
+        ('orders', lambda: OrderSerializer(order_rows, many=True).data),
+        ('order rows', lambda: list(Order.objects.order_by('pk').values()[:orders * 10])),
+    ):
+        start = time.perf_counter()
+        data = build()
+        built[name] = ((time.perf_counter() - start) * 1000, data)
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+    if orjson is None:
+        sys.exit("orjson is not installed: both renderers would be the standard one")
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command(
+        'seed', consumers=200, producers=20, products=args.products, images=0, carts=0,
+        orders=args.orders * 10, no_demo=True, verbosity=0,
+    )
+
+    print(f"{'payload':<12}{'KiB':>8}{'serialize':>11}{'render std':>12}{'render fast':>13}"
+          f"{'parse std':>11}{'parse fast':>12}{'same bytes':>12}")
+    for name, (serialize_ms, data) in payloads(args.products, args.orders).items():
+        body = JSONRenderer().render(data)
+        fast_body = FastJSONRenderer().render(data)
+        timings = [
+            timed(lambda: JSONRenderer().render(data), args.runs),
+            timed(lambda: FastJSONRenderer().render(data), args.runs),
+            timed(lambda: JSONParser().parse(io.BytesIO(body)), args.runs),
+            timed(lambda: FastJSONParser().parse(io.BytesIO(body)), args.runs),
+        ]
+        print(f"{name:<12}{len(body) / 1024:>8.0f}{serialize_ms:>9.1f}ms"
+              + ''.join(f"{timing:>{width}.2f}ms" for timing, width in zip(timings, (10, 11, 9, 10)))
+              + f"{'yes' if body == fast_body else 'NO':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Load test the hot read endpoints under the WSGI and ASGI serving modes.
+
+For each mode, starts ``gunicorn -c gunicorn.conf.py`` with the matching
+``SERVER_MODE`` on a local port, then replays GET requests on the catalog
+(and, with ``--token``, the cart) from many concurrent clients.
+``--slow-read-ms`` makes each client read the response body in
+small chunks with a pause between them, like a mobile client on a poor
+connection. Prints throughput and latency percentiles per mode.
+
+``--url`` benchmarks an already running server instead.
+
+Usage:
+    python benchmarks/loadgen.py [--modes wsgi,asgi] [--workers 2] \\
+        [--concurrency 64] [--duration 20] [--slow-read-ms 0] [--token KEY]
+"""
+import argparse
+import http.client
+import itertools
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CATALOG_PATHS = [
+    '/api/products/products/',
+    '/api/products/products/?ordering=price',
+    '/api/products/categories/',
+]
+AUTHENTICATED_PATHS = [
+    '/api/cart/cart/current/',
+    '/api/cart/summary/',
+]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ, SERVER_MODE=mode, PORT=str(port), WORKERS=str(workers))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"gunicorn ({mode}) exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', CATALOG_PATHS[0])
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    sys.exit(f"gunicorn ({mode}) did not answer on port {port}")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(timeout=30)
+
+
+def read_slowly(response, chunk_size, pause):
+    while response.read(chunk_size):
+        time.sleep(pause)
+
+
+def run(base_url, paths, concurrency, duration, slow_read_ms, token):
+    url = urlsplit(base_url)
+    headers = {'Authorization': f'Token {token}'} if token else {}
+    path_cycle = itertools.cycle(paths)
+    cycle_lock = threading.Lock()
+    timings, errors = [], []
+    results_lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        local_timings, local_errors = [], 0
+        while time.monotonic() < stop_at:
+            with cycle_lock:
+                path = next(path_cycle)
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                if slow_read_ms:
+                    read_slowly(response, 4096, slow_read_ms / 1000)
+                else:
+                    response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                continue
+            local_timings.append((time.perf_counter() - start) * 1000)
+        connection.close()
+        with results_lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return timings, sum(errors), time.perf_counter() - start
+
+
+def report(label, timings, errors, elapsed):
+    if not timings:
+        print(f"{label:<8}no successful request ({errors} errors)")
+        return
+    print(
+        f"{label:<8}{len(timings) / elapsed:>9.0f}{statistics.median(timings):>10.1f}"
+        f"{percentile(timings, 95):>10.1f}{percentile(timings, 99):>10.1f}"
+        f"{max(timings):>10.1f}{errors:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--url', help='benchmark a running server instead of starting gunicorn')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--slow-read-ms', type=float, default=0,
+                        help='pause between 4 KiB reads of each response body')
+    parser.add_argument('--token', help='auth token: also hit the cart endpoints')
+    args = parser.parse_args()
+
+    paths = CATALOG_PATHS + (AUTHENTICATED_PATHS if args.token else [])
+    print(
+        f"{'mode':<8}{'req/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+        f"{'p99 (ms)':>10}{'max (ms)':>10}{'errors':>8}"
+    )
+    if args.url:
+        report('url', *run(args.url, paths, args.concurrency, args.duration,
+                           args.slow_read_ms, args.token))
+        return
+
+    for mode in args.modes.split(','):
+        process = start_server(mode, args.port, args.workers)
+        try:
+            result = run(f'http://127.0.0.1:{args.port}', paths, args.concurrency,
+                         args.duration, args.slow_read_ms, args.token)
+        finally:
+            stop_server(process)
+        report(mode, *result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Demonstrate read-replica routing on a local primary + two SQLite replicas.
+
+Replication is simulated by copying the primary database file. The script
+prints which database served the queries of each request while checking
+round-robin, read-your-writes pinning, non-catalog paths and ejection of
+a broken replica.
+
+Usage:
+    python benchmarks/replica_routing.py [--requests 6]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+WORKDIR = Path(tempfile.mkdtemp(prefix='greencart-replicas-'))
+PRIMARY = WORKDIR / 'primary.sqlite3'
+REPLICAS = [WORKDIR / 'replica_1.sqlite3', WORKDIR / 'replica_2.sqlite3']
+
+os.environ['DJANGO_SETTINGS_MODULE'] = 'core.settings.base'
+os.environ['DATABASE_URL'] = f'sqlite:///{PRIMARY}'
+os.environ['DATABASE_REPLICA_URLS'] = ','.join(f'sqlite:///{path}' for path in REPLICAS)
+os.environ['DATABASE_REPLICA_EJECT_SECONDS'] = '60'
+os.environ['RATELIMIT_ENABLED'] = 'false'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from products.models import Category  # noqa: E402
+
+served = Counter()
+
+
+def track(execute, sql, params, many, context):
+    served[context['connection'].alias] += 1
+    return execute(sql, params, many, context)
+
+
+def replicate():
+    """Copy the primary to every replica (stands in for streaming replication)."""
+    connections.close_all()
+    for path in REPLICAS:
+        shutil.copyfile(PRIMARY, path)
+
+
+def run(client, label, path, count=1):
+    for _ in range(count):
+        cache.clear()
+        served.clear()
+        response = client.get(path)
+        aliases = ', '.join(f'{alias}={n}' for alias, n in sorted(served.items()))
+        print(f"{label:<34}{path:<22}{response.status_code:>5}  {aliases}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=6)
+    args = parser.parse_args()
+
+    print(f"primary={PRIMARY}\nreplicas={settings.DATABASE_REPLICAS}\n")
+    call_command('migrate', verbosity=0)
+    Category.objects.create(name='Légumes')
+    User.objects.create_user(
+        email='replica@greencart.test', username='replica', password='replica-pass'
+    )
+    replicate()
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(track))
+
+        client = APIClient(HTTP_HOST='localhost')
+        run(client, 'catalog read (round-robin)', '/api/products/categories/', args.requests)
+
+        response = client.post('/api/auth/login/', {
+            'email': 'replica@greencart.test', 'password': 'replica-pass'
+        }, format='json')
+        client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        run(client, 'catalog read after a write', '/api/products/categories/', 2)
+        client.cookies.pop(settings.DATABASE_PIN_COOKIE)
+        run(client, 'pin cookie expired', '/api/products/categories/', 2)
+        run(client, 'non-catalog read', '/api/auth/profile/')
+
+    # Rendre replica_1 injoignable : une nouvelle connexion échouera
+    connections.close_all()
+    REPLICAS[0].unlink()
+    REPLICAS[0].mkdir()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(track))
+        run(client, 'replica_1 down (ejected)', '/api/products/categories/', 4)
+
+    connections.close_all()
+    REPLICAS[1].unlink()
+    REPLICAS[1].mkdir()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(track))
+        run(client, 'all replicas down (primary)', '/api/products/categories/', 2)
+
+    connections.close_all()
+    shutil.rmtree(WORKDIR)
+
+
+if __name__ == '__main__':
+    main()
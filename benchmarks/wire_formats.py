@@ -0,0 +1,68 @@
+"""
+Compare JSON, MessagePack and CBOR for product listings.
+
+Seeds products (``manage.py seed``) in an in-memory database, serializes
+pages of ``ProductListSerializer`` and prints, per format, the body size
+(raw and gzipped) and the p50 encode and decode times. Listings embed the
+base64 product images, which weigh the same in every format, so pages are
+also measured without ``image_data``.
+
+Usage:
+    python benchmarks/wire_formats.py [--page-sizes 20,100,500] [--runs 50]
+"""
+import argparse
+import gzip
+import io
+import sys
+
+from json_rendering import timed  # sets Django up
+
+from django.core.management import call_command
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import CBORParser, FastJSONParser, MessagePackParser
+from core.renderers import CBORRenderer, FastJSONRenderer, MessagePackRenderer, cbor2, msgpack
+from products.models import Product
+from products.serializers import ProductListSerializer
+
+FORMATS = [
+    ('json', JSONRenderer, JSONParser),
+    ('json (orjson)', FastJSONRenderer, FastJSONParser),
+    ('msgpack', MessagePackRenderer, MessagePackParser),
+    ('cbor', CBORRenderer, CBORParser),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--page-sizes', default='20,100,500')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+    if msgpack is None or cbor2 is None:
+        sys.exit("msgpack and cbor2 are both needed")
+    page_sizes = [int(size) for size in args.page_sizes.split(',')]
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command(
+        'seed', consumers=10, producers=20, products=max(page_sizes), images=0, carts=0,
+        orders=0, no_demo=True, verbosity=0,
+    )
+    products = Product.objects.select_related('producer', 'category').order_by('pk')
+
+    print(f"{'page':<18}{'format':<15}{'KiB':>9}{'gzip KiB':>10}{'encode':>11}{'decode':>11}")
+    for size in page_sizes:
+        page = ProductListSerializer(products[:size], many=True).data
+        without_images = [{k: v for k, v in row.items() if k != 'image_data'} for row in page]
+        for label, data in ((f'{size} products', page), (f'{size}, no images', without_images)):
+            for name, renderer_class, parser_class in FORMATS:
+                body = renderer_class().render(data)
+                encode = timed(lambda: renderer_class().render(data), args.runs)
+                decode = timed(lambda: parser_class().parse(io.BytesIO(body)), args.runs)
+                print(f"{label:<18}{name:<15}{len(body) / 1024:>9.1f}"
+                      f"{len(gzip.compress(body)) / 1024:>10.1f}{encode:>9.2f}ms{decode:>9.2f}ms")
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,11 @@ Models for shopping cart management in GreenCart.
 """
 import uuid
 from django.db import models
+from django.db.models import F
 from django.core.validators import MinValueValidator
 from django.conf import settings
+from django.utils import timezone
+from core.db import atomic_with_retry
 from products.models import Product
 
 
@@ -32,9 +35,14 @@ class Cart(models.Model):
     def __str__(self):
         return f"Panier de {self.consumer.email}"
     
+    def _items_prefetched(self):
+        return 'items' in getattr(self, '_prefetched_objects_cache', {})
+    
     @property
     def total_items(self):
         """Retourne le nombre total d'articles dans le panier."""
+        if self._items_prefetched():
+            return sum(item.quantity for item in self.items.all())
         return self.items.aggregate(
             total=models.Sum('quantity')
         )['total'] or 0
@@ -50,15 +58,21 @@ class Cart(models.Model):
     @property
     def items_count(self):
         """Retourne le nombre de types d'articles différents."""
+        if self._items_prefetched():
+            return len(self.items.all())
         return self.items.count()
     
     def clear(self):
         """Vide le panier."""
         self.items.all().delete()
     
+    @atomic_with_retry
     def add_product(self, product, quantity=1):
         """
         Ajoute un produit au panier ou met à jour la quantité.
+
+        The quantity is incremented in SQL so concurrent additions of the
+        same product are not lost.
         """
         cart_item, created = CartItem.objects.get_or_create(
             cart=self,
@@ -71,8 +85,11 @@ class Cart(models.Model):
         
         if not created:
             # Si l'article existe déjà, on met à jour la quantité
-            cart_item.quantity += quantity
-            cart_item.save()
+            CartItem.objects.filter(pk=cart_item.pk).update(
+                quantity=F('quantity') + quantity,
+                updated_at=timezone.now()
+            )
+            cart_item.refresh_from_db(fields=['quantity', 'updated_at'])
         
         return cart_item
     
@@ -4,6 +4,7 @@ API views for cart management in GreenCart.
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.openapi import OpenApiTypes, OpenApiResponse
@@ -16,6 +17,23 @@ from .serializers import (
     UpdateCartItemSerializer
 )
 from products.models import Product
+from core.async_views import AsyncViewSetMixin, async_api_view
+
+
+def carts_with_items():
+    """Carts with their items and products loaded (required by the async views)."""
+    return Cart.objects.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('product__producer', 'product__category'))
+    )
+
+
+async def aget_current_cart(user):
+    """Get or create the user's cart, items prefetched, with the async ORM."""
+    cart = await carts_with_items().filter(consumer=user).afirst()
+    if cart is None:
+        await Cart.objects.aget_or_create(consumer=user)
+        cart = await carts_with_items().aget(consumer=user)
+    return cart
 
 
 @extend_schema_view(
@@ -30,8 +48,8 @@ from products.models import Product
         description="Récupère les détails d'un panier spécifique"
     )
 )
-class CartViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for cart management (consumer only)."""
+class CartViewSet(AsyncViewSetMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet for cart management (consumer only, ``current`` is async)."""
     
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -52,9 +70,9 @@ class CartViewSet(viewsets.ReadOnlyModelViewSet):
         responses={200: CartSerializer}
     )
     @action(detail=False, methods=['get'])
-    def current(self, request):
+    async def current(self, request):
         """Get current user's cart."""
-        cart, created = Cart.objects.get_or_create(consumer=request.user)
+        cart = await aget_current_cart(request.user)
         serializer = CartSerializer(cart)
         return Response(serializer.data)
     
@@ -122,7 +140,7 @@ def add_to_cart(request):
                 'type': 'object',
                 'properties': {
                     'message': {'type': 'string'},
-                    'cart_item': CartItemSerializer
+                    'cart_item': {'$ref': '#/components/schemas/CartItem'}
                 }
             }
         ),
@@ -211,7 +229,7 @@ def remove_from_cart(request, item_id):
                 'type': 'object',
                 'properties': {
                     'message': {'type': 'string'},
-                    'cart_item': CartItemSerializer
+                    'cart_item': {'$ref': '#/components/schemas/CartItem'}
                 }
             }
         ),
@@ -287,11 +305,11 @@ def add_product_to_cart(request, product_id):
         }
     }
 )
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def cart_summary(request):
+async def cart_summary(request):
     """Get cart summary with totals."""
-    cart, created = Cart.objects.get_or_create(consumer=request.user)
+    cart = await aget_current_cart(request.user)
     
     summary = {
         'total_items': cart.total_items,
@@ -0,0 +1,193 @@
+"""
+Async support for DRF views.
+
+DRF 3.15 only dispatches to sync handlers. ``AsyncAPIView``,
+``AsyncViewSetMixin`` and ``async_api_view`` dispatch to ``async def``
+handlers natively, so under ASGI (``SERVER_MODE=asgi``) a request waiting
+on the database or on a slow client does not hold a worker thread:
+
+- authentication, permissions and throttling run in a thread, as they are
+  sync (``CachedTokenAuthentication`` usually answers from the cache);
+- ``async def`` handlers are awaited and use the async ORM; whatever they
+  serialize must be loaded up front (``select_related``/``prefetch_related``),
+  since lazy loading raises ``SynchronousOnlyOperation`` in async code;
+- sync handlers of the same view (writes, rarely used actions) keep
+  working and run in a thread.
+
+Under WSGI the same views run through ``async_to_sync``.
+
+Under ASGI, Django reads a ``StreamingHttpResponse`` over a sync iterator
+whole (``sync_to_async(list)``) before sending anything; ``aiterate()``
+turns such an iterator into an async one that is still streamed.
+"""
+import inspect
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class AsyncDispatchMixin:
+    """``dispatch()`` that awaits async handlers and runs sync ones in a thread."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # drf-spectacular enveloppe les actions héritées dans une fonction sync
+            if iscoroutinefunction(inspect.unwrap(handler)):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_queryset(self):
+        """``filter_queryset(get_queryset())`` in a thread, as both may query the DB."""
+        return await sync_to_async(lambda: self.filter_queryset(self.get_queryset()))()
+
+    async def aget_object(self):
+        """``get_object()`` with the async ORM."""
+        queryset = await self.aget_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, ValidationError, ValueError, TypeError):
+            raise Http404
+        await sync_to_async(self.check_object_permissions)(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        """
+        ``paginate_queryset()`` with the async ORM.
+
+        Mirrors ``PageNumberPagination.paginate_queryset``: the count is
+        fetched with ``acount()`` and set on the Django paginator, so the
+        page is built without any sync query.
+        """
+        pagination = self.paginator
+        if pagination is None:
+            return None
+        page_size = pagination.get_page_size(self.request)
+        if not page_size:
+            return None
+
+        pagination.request = self.request
+        paginator = pagination.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = pagination.get_page_number(self.request, paginator)
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(pagination.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+
+        page.object_list = [obj async for obj in page.object_list]
+        pagination.page = page
+        if paginator.num_pages > 1 and pagination.template is not None:
+            pagination.display_page_controls = True
+        return page.object_list
+
+
+class AsyncAPIView(AsyncDispatchMixin, APIView):
+    """APIView whose handlers are ``async def``."""
+
+
+class AsyncViewSetMixin(AsyncDispatchMixin):
+    """
+    Viewset mixin allowing ``async def`` actions next to sync ones.
+
+    Put it first: ``class ProductViewSet(AsyncViewSetMixin, viewsets.ModelViewSet)``.
+    """
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        # Django n'attend la vue que si elle est marquée coroutine
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+
+class AsyncListModelMixin(AsyncViewSetMixin):
+    """Async ``list`` action; the queryset must load what the serializer renders."""
+
+    async def list(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+
+class AsyncRetrieveModelMixin(AsyncViewSetMixin):
+    """Async ``retrieve`` action; the queryset must load what the serializer renders."""
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def async_api_view(http_method_names):
+    """``@api_view`` for ``async def`` function views (same companion decorators)."""
+
+    def decorator(func):
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        attrs = {
+            'http_method_names': [method.lower() for method in set(http_method_names) | {'options'}],
+            '__module__': func.__module__,
+            '__doc__': func.__doc__,
+        }
+        for name in ('renderer_classes', 'parser_classes', 'authentication_classes',
+                     'throttle_classes', 'permission_classes', 'schema'):
+            attrs[name] = getattr(func, name, getattr(APIView, name))
+        for method in http_method_names:
+            attrs[method.lower()] = handler
+
+        return type(func.__name__, (AsyncAPIView,), attrs).as_view()
+
+    return decorator
+
+
+def is_asgi_request(request):
+    """True if ``request`` (Django or DRF) is served by the ASGI handler."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiterate(iterable):
+    """
+    Async iterator over a sync iterable, each item produced in a thread.
+
+    The thread is the request's thread-sensitive one, so a server-side
+    cursor read by the iterable stays on its connection.
+    """
+    iterator = iter(iterable)
+    done = object()
+    next_item = sync_to_async(next, thread_sensitive=True)
+    while (item := await next_item(iterator, done)) is not done:
+        yield item
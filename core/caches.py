@@ -0,0 +1,29 @@
+"""
+Cache helpers for GreenCart.
+
+Several features (token snapshots, catalog responses, rate limits) rely on
+invalidations or counters that every worker must see. ``LocMemCache`` is
+private to each process, so under gunicorn a logout or a catalog change
+would only reach the worker that handled it; those features check
+``cache_is_shared()`` first.
+
+Responses to requests that carry credentials may be personal: they are
+neither served from nor stored in shared response caches, and they are not
+compressed with brotli (see ``core/compression.py``).
+"""
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias='default'):
+    """True if every worker process sees the same cache (Redis, Memcached, database...)."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def carries_credentials(request):
+    """True if ``request`` sends an ``Authorization`` header or a session cookie."""
+    return 'Authorization' in request.headers or settings.SESSION_COOKIE_NAME in request.COOKIES
@@ -0,0 +1,224 @@
+"""
+Response compression negotiated by ``Accept-Encoding``.
+
+``CompressionMiddleware`` compresses responses with brotli (``br``, when
+the ``brotli`` package is installed) or gzip, whichever the client prefers
+(``q`` values; brotli on a tie). It leaves alone:
+
+- bodies smaller than ``COMPRESSION_MIN_SIZE`` bytes, which gain less
+  than the cost of compressing them;
+- content types starting with one of ``COMPRESSION_SKIP_TYPES`` (JPEG,
+  PNG, WebP, ... are already compressed);
+- responses already carrying ``Content-Encoding``, or
+  ``Cache-Control: no-transform``.
+
+Streaming responses (exports) are compressed chunk by chunk, each chunk
+being flushed so that the client receives rows as they are produced.
+Under ASGI a sync stream is first made async (``aiterate``): Django would
+otherwise read it whole before sending it.
+
+A response may carry ready-made bodies in ``compressed_variants``
+(``{encoding: bytes}``), as the catalog cache does (see
+``products/cache.py``): the matching variant is sent as is, without
+compressing again. ``compress_variants`` builds them once, at denser levels
+(``COMPRESSION_CACHE_*``).
+
+Like Django's ``GZipMiddleware``, gzip bodies and streams carry a
+random-length file name to mitigate BREACH, and strong ETags become weak.
+Brotli has no such padding, so responses that may hold secrets (requests
+with credentials, responses setting cookies or marked ``private`` or
+``no-store``) are only ever gzipped.
+"""
+import gzip
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import StreamingBuffer, compress_string
+
+from core.async_views import aiterate
+from core.caches import carries_credentials
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    brotli = None
+
+BROTLI = 'br'
+GZIP = 'gzip'
+# Préférence du serveur à qualité égale
+ENCODINGS = (BROTLI, GZIP) if brotli else (GZIP,)
+# Longueur maximale du nom de fichier aléatoire (mitigation BREACH, comme GZipMiddleware)
+MAX_RANDOM_BYTES = 100
+
+
+def negotiate(accept_encoding, encodings=ENCODINGS):
+    """Best of ``encodings`` for an ``Accept-Encoding`` header, or ``None``."""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    wildcard = qualities.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding, cached=False):
+    """``content`` compressed with ``encoding``; ``cached`` selects the slow, dense levels."""
+    if encoding == BROTLI:
+        quality = settings.COMPRESSION_CACHE_BROTLI_QUALITY if cached else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(content, quality=quality)
+    if cached:
+        # Corps public et partagé : pas de secret à protéger, compression déterministe
+        return gzip.compress(content, compresslevel=settings.COMPRESSION_CACHE_GZIP_LEVEL, mtime=0)
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+def may_hold_secrets(request, response):
+    """Whether ``response`` may be personal, so must not be compressed without padding."""
+    if carries_credentials(request) or response.cookies:
+        return True
+    cache_control = response.get('Cache-Control', '').lower()
+    return 'private' in cache_control or 'no-store' in cache_control
+
+
+def compressible(response):
+    """Whether the body of ``response`` is worth compressing, whatever the client."""
+    if not settings.COMPRESSION_ENABLED or response.has_header('Content-Encoding'):
+        return False
+    if 'no-transform' in response.get('Cache-Control', '').lower():
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    if content_type.startswith(tuple(settings.COMPRESSION_SKIP_TYPES)) and 'svg' not in content_type:
+        return False
+    return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+def compress_variants(response):
+    """``{encoding: body}`` for every available encoding that makes ``response`` smaller."""
+    if response.streaming or not compressible(response):
+        return {}
+    variants = {}
+    for encoding in ENCODINGS:
+        body = compress(response.content, encoding, cached=True)
+        if len(body) < len(response.content):
+            variants[encoding] = body
+    return variants
+
+
+def stream_compressor(encoding):
+    """``(compress, finish)`` callables compressing a stream chunk by chunk."""
+    if encoding == BROTLI:
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+    buffer = StreamingBuffer()
+    # Nom de fichier aléatoire dans l'en-tête, comme compress_string() (mitigation BREACH)
+    zfile = gzip.GzipFile(
+        'a' * secrets.randbelow(MAX_RANDOM_BYTES), mode='wb', compresslevel=6, fileobj=buffer, mtime=0
+    )
+
+    def compress_chunk(chunk):
+        zfile.write(chunk)
+        zfile.flush()
+        return buffer.read()
+
+    def finish():
+        zfile.close()
+        return buffer.read()
+
+    return compress_chunk, finish
+
+
+def compress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    for chunk in chunks:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compress_chunk, finish = stream_compressor(encoding)
+    async for chunk in chunks:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip according to ``Accept-Encoding``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def process_response(self, request, response):
+        if not compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Brotli sans remplissage aléatoire : réservé aux réponses publiques
+        encodings = (GZIP,) if may_hold_secrets(request, response) else ENCODINGS
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''), encodings)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # Taille inconnue avant la fin du flux
+            del response.headers['Content-Length']
+        else:
+            variants = getattr(response, 'compressed_variants', None)
+            if variants is not None:
+                content = variants.get(encoding)
+                if content is None:
+                    # Variante absente : le compresser ne réduisait pas le corps
+                    return response
+            else:
+                content = compress(response.content, encoding)
+                if len(content) >= len(response.content):
+                    return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # ETag fort -> faible (RFC 9110 §8.8.1), les requêtes conditionnelles restent valides
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if response.streaming and not response.is_async and compressible(response):
+            response.streaming_content = aiterate(response.streaming_content)
+        return self.process_response(request, response)
@@ -0,0 +1,93 @@
+"""
+Database helpers for GreenCart.
+
+Production runs PostgreSQL at SERIALIZABLE isolation, where concurrent
+transactions can be aborted with a serialization failure (SQLSTATE 40001)
+or a deadlock (40P01). Both are safe to retry from the start of the
+transaction; ``atomic_with_retry`` does so with jittered backoff, and
+counts retries and give-ups in the ``greencart_db_transaction_retries_total``
+metric.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections, transaction
+
+from core.metrics import record_transaction_retry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_SQLSTATES = {'40001', '40P01'}
+
+
+class RetryableConflict(IntegrityError):
+    """A constraint conflict with a concurrent transaction that a replay resolves."""
+
+
+def is_retryable(exc):
+    """True if a database error is a serialization failure, a deadlock or a RetryableConflict."""
+    if isinstance(exc, RetryableConflict):
+        return True
+    for error in (exc, exc.__cause__):
+        # psycopg2 exposes `pgcode`, psycopg 3 `sqlstate`
+        code = getattr(error, 'pgcode', None) or getattr(error, 'sqlstate', None)
+        if code in RETRYABLE_SQLSTATES:
+            return True
+    return False
+
+
+def atomic_with_retry(func=None, *, using=None, max_attempts=None):
+    """
+    Run ``func`` in a transaction, retrying it on serialization failures.
+
+    Each retry waits a random delay up to an exponentially growing cap
+    ("full jitter"), and retries stop once ``DB_RETRY_MAX_ATTEMPTS`` or the
+    ``DB_RETRY_BUDGET_SECONDS`` time budget is used up. When called inside
+    an existing transaction the function runs once, without retrying: only
+    the outermost block can be replayed.
+
+    Usable as ``@atomic_with_retry`` or ``@atomic_with_retry(using='...')``.
+    The wrapped function must be safe to re-run, i.e. re-read anything it
+    modifies instead of relying on objects loaded before the transaction.
+    """
+    if func is None:
+        return functools.partial(atomic_with_retry, using=using, max_attempts=max_attempts)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        alias = using or DEFAULT_DB_ALIAS
+        if connections[alias].in_atomic_block:
+            with transaction.atomic(using=alias):
+                return func(*args, **kwargs)
+
+        attempts = max_attempts or settings.DB_RETRY_MAX_ATTEMPTS
+        deadline = time.monotonic() + settings.DB_RETRY_BUDGET_SECONDS
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic(using=alias):
+                    return func(*args, **kwargs)
+            except DatabaseError as exc:
+                if not is_retryable(exc):
+                    raise
+                delay = random.uniform(0, min(
+                    settings.DB_RETRY_MAX_DELAY,
+                    settings.DB_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                ))
+                if attempt == attempts or time.monotonic() + delay > deadline:
+                    record_transaction_retry('abort')
+                    logger.warning(
+                        "Giving up %s after %s attempt(s): %s",
+                        func.__qualname__, attempt, exc
+                    )
+                    raise
+                record_transaction_retry('retry')
+                logger.info(
+                    "Retrying %s after serialization failure (attempt %s): %s",
+                    func.__qualname__, attempt, exc
+                )
+                time.sleep(delay)
+
+    return wrapper
@@ -0,0 +1,213 @@
+"""
+Read-replica routing for GreenCart.
+
+Replicas are configured with ``DATABASE_REPLICA_URLS`` and registered as
+``replica_1``, ``replica_2``, ... next to ``default`` (the primary).
+Reads only go to a replica when explicitly allowed:
+
+- ``ReplicaRoutingMiddleware`` allows it for safe requests (GET/HEAD)
+  under ``DATABASE_REPLICA_PATHS`` (the public catalog), unless the client
+  wrote something within the last ``DATABASE_READ_YOUR_WRITES_SECONDS``
+  (tracked with a cookie);
+- code can opt in with ``with use_replicas():``.
+
+Everything else — writes, reads inside a transaction, reads related to an
+object loaded from the primary, token and session lookups, management
+commands, the outbox worker — uses the primary. Replicas are picked round-robin; one that fails to
+connect or errors on a query is ejected for
+``DATABASE_REPLICA_EJECT_SECONDS``, and reads fall back to the primary
+when no replica is healthy.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Authentification : un token ou une session tout juste créés doivent être
+# trouvés même si la réplication a du retard
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'sessions.session'}
+
+# None : base principale ; sinon {'alias': réplica choisi pour le bloc}
+_replica_reads = ContextVar('replica_reads', default=None)
+
+_lock = threading.Lock()
+_ejected = {}  # alias -> monotonic time until which it is skipped
+_round_robin = itertools.count()
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """
+    Allow (or, with ``enabled=False``, forbid) replica reads in this block.
+
+    All reads of the block use the same replica, so one request sees one
+    consistent snapshot.
+    """
+    token = _replica_reads.set({'alias': None} if enabled else None)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_primary():
+    """Force reads in this block to the primary."""
+    return use_replicas(False)
+
+
+def eject(alias, reason=''):
+    """Stop routing reads to ``alias`` for ``DATABASE_REPLICA_EJECT_SECONDS``."""
+    with _lock:
+        _ejected[alias] = time.monotonic() + settings.DATABASE_REPLICA_EJECT_SECONDS
+    logger.warning("Ejected read replica %s: %s", alias, reason)
+
+
+def healthy_replicas():
+    """Configured replicas that are not currently ejected."""
+    now = time.monotonic()
+    with _lock:
+        return [
+            alias for alias in settings.DATABASE_REPLICAS
+            if _ejected.get(alias, 0) <= now
+        ]
+
+
+def _usable(alias):
+    """Open the replica connection if needed; eject it if that fails."""
+    connection = connections[alias]
+    if connection.connection is not None:
+        return True
+    try:
+        connection.ensure_connection()
+    except DatabaseError as exc:
+        eject(alias, exc)
+        return False
+    return True
+
+
+def pick_replica():
+    """Next healthy replica in round-robin order, or None."""
+    replicas = healthy_replicas()
+    if not replicas:
+        return None
+    start = next(_round_robin)
+    for offset in range(len(replicas)):
+        alias = replicas[(start + offset) % len(replicas)]
+        if _usable(alias):
+            return alias
+    return None
+
+
+def _eject_on_error(execute, sql, params, many, context):
+    try:
+        return execute(sql, params, many, context)
+    except (OperationalError, InterfaceError) as exc:
+        # Connexion perdue, réplica en récupération... : pas une erreur de requête
+        eject(context['connection'].alias, exc)
+        raise
+
+
+@receiver(connection_created)
+def watch_replica(sender, connection, **kwargs):
+    """Eject replicas whose queries fail at the connection level."""
+    if connection.alias not in settings.DATABASE_REPLICAS:
+        return
+    if _eject_on_error not in connection.execute_wrappers:
+        # En tête de liste : execute_wrapper() retire le dernier élément en sortie
+        connection.execute_wrappers.insert(0, _eject_on_error)
+
+
+class ReplicaRouter:
+    """Send allowed reads to a healthy replica and everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _replica_reads.get()
+        if state is None or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Rester sur la base d'où vient l'objet (lectures cohérentes)
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state['alias'] is None or state['alias'] not in healthy_replicas():
+            state['alias'] = pick_replica() or DEFAULT_DB_ALIAS
+        return state['alias']
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Toutes les bases contiennent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas reçoivent le schéma par réplication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Enable replica reads for safe requests to ``DATABASE_REPLICA_PATHS``.
+
+    After a successful write the response sets a short-lived cookie; while
+    it is present the client reads from the primary, so it sees its own
+    writes despite replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def replicas_allowed(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and settings.DATABASE_PIN_COOKIE not in request.COOKIES
+            and request.path.startswith(tuple(settings.DATABASE_REPLICA_PATHS))
+        )
+
+    def pin_to_primary(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.DATABASE_PIN_COOKIE, '1',
+                max_age=settings.DATABASE_READ_YOUR_WRITES_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with use_replicas(self.replicas_allowed(request)):
+            response = self.get_response(request)
+        return self.pin_to_primary(request, response)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        # Le ContextVar suit la requête dans les threads de sync_to_async
+        with use_replicas(self.replicas_allowed(request)):
+            response = await self.get_response(request)
+        return self.pin_to_primary(request, response)
@@ -0,0 +1,135 @@
+"""
+Liveness and readiness probes for GreenCart.
+
+``HealthCheckMiddleware`` sits first in ``MIDDLEWARE`` and answers the
+probe paths itself, before host validation, sessions, authentication,
+CSRF or rate limiting run:
+
+- ``HEALTH_LIVENESS_PATH``: the process is up and serving requests. A
+  constant response, no I/O;
+- ``HEALTH_READINESS_PATH``: the primary database and the cache answer.
+  Each check runs with ``HEALTH_CHECK_TIMEOUT`` and the result is reused
+  for ``HEALTH_READINESS_CACHE_SECONDS``, so frequent probes from the load
+  balancer cost one round-trip per interval and per process.
+
+Replies are 200 or 503 with a small JSON body.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LIVE_BODY = b'{"status":"ok"}'
+
+_lock = threading.Lock()
+_last = {'expires': 0.0, 'status': 503, 'body': b''}
+
+
+def check_database():
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+def check_cache():
+    key = f'health:{uuid.uuid4().hex}'
+    cache.set(key, 1, timeout=5)
+    if cache.get(key) != 1:
+        raise RuntimeError('value not read back')
+    cache.delete(key)
+
+
+CHECKS = {'database': check_database, 'cache': check_cache}
+
+# Un thread dédié par vérification : une dépendance bloquée ne bloque ni les
+# requêtes ni l'autre vérification, et la connexion de sonde reste la même
+_executors = {
+    name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'readiness-{name}')
+    for name in CHECKS
+}
+
+
+def run_checks(timeout):
+    """Run the checks concurrently; return ``(ok, {name: result})``."""
+    futures = {name: _executors[name].submit(check) for name, check in CHECKS.items()}
+    deadline = time.monotonic() + timeout
+    results = {}
+    for name, future in futures.items():
+        try:
+            future.result(timeout=max(0, deadline - time.monotonic()))
+            results[name] = 'ok'
+        except FutureTimeoutError:
+            results[name] = 'timeout'
+        except Exception as exc:
+            logger.warning("Readiness check %s failed: %r", name, exc)
+            results[name] = type(exc).__name__
+    return all(result == 'ok' for result in results.values()), results
+
+
+def readiness():
+    """Cached ``(status, body)`` of the readiness checks."""
+    if _last['expires'] > time.monotonic():
+        return _last['status'], _last['body']
+    with _lock:
+        # Une seule sonde à la fois ; les requêtes concurrentes réutilisent son résultat
+        if _last['expires'] <= time.monotonic():
+            ok, results = run_checks(settings.HEALTH_CHECK_TIMEOUT)
+            _last['status'] = 200 if ok else 503
+            _last['body'] = json.dumps(
+                {'status': 'ok' if ok else 'unavailable', 'checks': results},
+                separators=(',', ':')
+            ).encode()
+            _last['expires'] = time.monotonic() + settings.HEALTH_READINESS_CACHE_SECONDS
+        return _last['status'], _last['body']
+
+
+def probe_response(status, body):
+    response = HttpResponse(body, status=status, content_type='application/json')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class HealthCheckMiddleware:
+    """Answer liveness/readiness probes before any other middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.live_paths = {settings.HEALTH_LIVENESS_PATH, *settings.HEALTH_LIVENESS_ALIASES}
+        self.ready_path = settings.HEALTH_READINESS_PATH
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path in self.live_paths:
+            return probe_response(200, LIVE_BODY)
+        if request.path == self.ready_path:
+            return probe_response(*readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path in self.live_paths:
+            return probe_response(200, LIVE_BODY)
+        if request.path == self.ready_path:
+            if _last['expires'] > time.monotonic():
+                return probe_response(_last['status'], _last['body'])
+            return probe_response(*await sync_to_async(readiness, thread_sensitive=False)())
+        return await self.get_response(request)
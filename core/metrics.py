@@ -0,0 +1,221 @@
+"""
+Prometheus metrics for GreenCart.
+
+``MetricsMiddleware`` records, per resolved view name (``api:products:product-list``)
+and status code, the request duration and the number and total time of the
+SQL queries the request ran. Queries are counted by an execute wrapper
+installed on every database connection, which adds to the stats of the
+request in progress (a ContextVar, so queries run by async views through
+``sync_to_async`` are counted too).
+
+Cache lookups (``record_cache_lookup``), checkouts/orders, transaction
+retries (``core.db.atomic_with_retry``) and rate-limited requests
+(``core.throttling``) are counted where they happen.
+``metrics_view`` serves everything in the Prometheus text format on
+``METRICS_PATH``, to scrapers sending ``METRICS_AUTH_TOKEN`` as a Bearer
+token; without a token it only answers when ``DEBUG`` is on.
+
+Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` (set by gunicorn.conf.py)
+makes every worker write its samples to that directory; ``metrics_view``
+then aggregates all workers, whichever of them answers the scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_DURATION = Histogram(
+    'greencart_http_request_duration_seconds',
+    'Request duration by view and status code.',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'greencart_http_request_db_queries',
+    'SQL queries run per request, by view.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_DURATION = Histogram(
+    'greencart_http_request_db_duration_seconds',
+    'Time spent in SQL queries per request, by view.',
+    ['view'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_LOOKUPS = Counter(
+    'greencart_cache_lookups_total',
+    'Cache lookups by cache and result (hit/miss).',
+    ['cache', 'result'],
+)
+ORDERS_CREATED = Counter(
+    'greencart_orders_created_total',
+    'Orders placed (counted on commit).',
+)
+ORDERS_AMOUNT = Counter(
+    'greencart_orders_amount_euros_total',
+    'Total amount of the orders placed, in euros.',
+)
+CHECKOUT_FAILURES = Counter(
+    'greencart_checkout_failures_total',
+    'Checkouts rejected, by reason.',
+    ['reason'],
+)
+ORDER_STATUS_CHANGES = Counter(
+    'greencart_order_status_changes_total',
+    'Order and sub-order status changes, by new status (counted on commit).',
+    ['status'],
+)
+TRANSACTION_RETRIES = Counter(
+    'greencart_db_transaction_retries_total',
+    'Transactions replayed after a serialization failure, by outcome (retry/abort).',
+    ['outcome'],
+)
+THROTTLED_REQUESTS = Counter(
+    'greencart_throttled_requests_total',
+    'Requests rejected by a rate limit, by scope.',
+    ['scope'],
+)
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class QueryStats:
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_query_stats = ContextVar('greencart_query_stats', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    """Install the query counter on every new connection (all aliases and threads)."""
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_LOOKUPS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def record_order_created(total_amount):
+    ORDERS_CREATED.inc()
+    ORDERS_AMOUNT.inc(float(total_amount))
+
+
+def record_checkout_failure(reason):
+    CHECKOUT_FAILURES.labels(reason).inc()
+
+
+def record_status_change(status):
+    ORDER_STATUS_CHANGES.labels(status).inc()
+
+
+def record_transaction_retry(outcome):
+    TRANSACTION_RETRIES.labels(outcome).inc()
+
+
+def record_throttled(scope):
+    THROTTLED_REQUESTS.labels(scope).inc()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNRESOLVED_VIEW
+
+
+class MetricsMiddleware:
+    """Time every request and count its SQL queries."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def observe(self, request, response, start, stats):
+        view = view_name(request)
+        REQUEST_DURATION.labels(view, request.method, str(response.status_code)).observe(
+            time.perf_counter() - start
+        )
+        REQUEST_QUERIES.labels(view).observe(stats.count)
+        REQUEST_DB_DURATION.labels(view).observe(stats.duration)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self.observe(request, response, start, stats)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        self.observe(request, response, start, stats)
+        return response
+
+
+def metrics_view(request):
+    """All metrics in the Prometheus text format (every gunicorn worker)."""
+    expected = settings.METRICS_AUTH_TOKEN
+    if expected:
+        provided = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(provided, expected):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        # Sans jeton, /metrics n'est ouvert qu'en développement
+        return HttpResponse(status=403)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
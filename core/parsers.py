@@ -0,0 +1,72 @@
+"""
+API parsers: fast JSON and compact binary formats.
+
+``FastJSONParser`` decodes UTF-8 bodies with orjson when it is installed
+and returns the same values as DRF's ``JSONParser``. Bodies orjson refuses
+and other charsets go through ``JSONParser``, which also words the parse
+errors, as do bodies where orjson gave a float of 2**63 or more: it reads
+integers beyond 64 bits as floats. Without orjson the parser is
+``JSONParser``.
+Selected by ``FAST_JSON_ENABLED``.
+
+``MessagePackParser`` and ``CBORParser`` read request bodies sent with
+``Content-Type: application/msgpack`` / ``application/cbor`` for the formats
+listed in ``API_BINARY_FORMATS``; CBOR tags give Decimals, UUIDs and
+datetimes, which DRF's fields accept as well as their string forms.
+"""
+import io
+import math
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from core.renderers import cbor2, iter_floats, msgpack, orjson, require
+
+
+def has_huge_float(value):
+    """True if ``value`` holds a float of 2**63 or more, maybe an integer orjson overflowed."""
+    return any(abs(number) >= 2 ** 63 and math.isfinite(number) for number in iter_floats(value))
+
+
+class FastJSONParser(JSONParser):
+    """``JSONParser`` backed by orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8' or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        if has_huge_float(data):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        return data
+
+
+class MessagePackParser(BaseParser):
+    """MessagePack bodies; timestamps (extension -1) become datetimes."""
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        unpacker = require(msgpack, 'msgpack')
+        try:
+            return unpacker.unpackb(stream.read(), raw=False, timestamp=3)
+        except (ValueError, TypeError, unpacker.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % (str(exc) or 'invalid data'))
+
+
+class CBORParser(BaseParser):
+    """CBOR bodies, standard tags decoded."""
+
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        decoder = require(cbor2, 'cbor2')
+        try:
+            return decoder.loads(stream.read())
+        except (ValueError, TypeError, decoder.CBORDecodeError) as exc:
+            raise ParseError('CBOR parse error - %s' % str(exc))
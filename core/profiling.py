@@ -0,0 +1,335 @@
+"""
+On-demand request profiling for GreenCart.
+
+``ProfilingMiddleware`` profiles a request when:
+
+- its path matches one of ``PROFILING_PATHS`` (regular expressions), for a
+  ``PROFILING_SAMPLE_RATE`` fraction of the matching requests;
+- or a staff user sends ``X-Profile: 1`` (or ``sampling`` / ``cprofile``),
+  authenticated by session or token.
+
+Two profilers are available (``PROFILING_MODE`` or the header value):
+
+- ``sampling``: a background thread records the stack of the request
+  thread every ``PROFILING_SAMPLE_INTERVAL`` seconds and stores collapsed
+  stacks (``flamegraph.pl``, speedscope, ...). Under ASGI a request hops
+  between the event loop and its ``sync_to_async`` thread, so both are
+  sampled; the event loop also runs the coroutines of concurrent requests,
+  which may show up in the profile (``threads`` in the metadata);
+- ``cprofile``: deterministic, higher overhead, stored in pstats format
+  (``python -m pstats``, snakeviz). Sync requests only; async requests fall
+  back to sampling.
+
+Profiles go to ``PROFILING_DIR``, a ring buffer keeping the latest
+``PROFILING_MAX_PROFILES``; each profile has a JSON sidecar (view, path,
+duration, ...). The response carries ``X-Profile-Id``; staff list and
+download profiles under ``/api/profiles/``.
+"""
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import FileResponse
+from django.urls import reverse
+from drf_spectacular.utils import extend_schema
+from rest_framework import exceptions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from accounts.authentication import CachedTokenAuthentication
+from core.metrics import view_name
+
+SAMPLING = 'sampling'
+CPROFILE = 'cprofile'
+EXTENSIONS = {SAMPLING: 'collapsed', CPROFILE: 'pstats'}
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID = re.compile(r'^\d{13}-[0-9a-f]{8}$')
+STDLIB = os.path.join(sysconfig.get_paths()['stdlib'], '')
+
+
+def _location(code):
+    filename = code.co_filename
+    root = os.path.join(str(settings.BASE_DIR), '')
+    if filename.startswith(root):
+        filename = filename[len(root):]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[-1]
+    elif filename.startswith(STDLIB):
+        filename = filename[len(STDLIB):]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Count the stacks of some threads (all but itself when ``thread_ids`` is None)."""
+
+    def __init__(self, thread_ids=None, interval=0.005):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_location(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        """Write the collapsed stacks (``frame;frame;frame count`` per line)."""
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f'{stack} {count}\n')
+
+
+class CProfiler:
+    """``cProfile`` behind the sampler's start/stop/dump interface."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+# ==============================================================================
+# Stockage : tampon circulaire sur disque
+# ==============================================================================
+
+def profile_dir():
+    path = Path(settings.PROFILING_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def store(profiler, mode, metadata):
+    """Write a profile and its metadata, then drop the oldest beyond the limit."""
+    directory = profile_dir()
+    profile_id = f'{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}'
+    filename = f'{profile_id}.{EXTENSIONS[mode]}'
+    profiler.dump(directory / filename)
+    metadata = dict(metadata, id=profile_id, mode=mode, file=filename)
+    # Les métadonnées en dernier : un profil listé est toujours complet
+    (directory / f'{profile_id}.json').write_text(json.dumps(metadata), encoding='utf-8')
+
+    sidecars = sorted(directory.glob('*.json'))
+    for sidecar in sidecars[:-settings.PROFILING_MAX_PROFILES]:
+        for path in directory.glob(f'{sidecar.stem}.*'):
+            # Un autre worker peut faire le même ménage en parallèle
+            path.unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    profiles = []
+    for sidecar in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(sidecar.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def get_profile(profile_id):
+    """``(metadata, path)`` of a stored profile, or ``None``."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    directory = profile_dir()
+    try:
+        metadata = json.loads((directory / f'{profile_id}.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return metadata, directory / metadata['file']
+
+
+# ==============================================================================
+# Middleware
+# ==============================================================================
+
+def is_staff_request(request):
+    """Staff session or staff token; the DRF views authenticate the same way."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Profile requests selected by path pattern or by a staff header."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.patterns = [re.compile(pattern) for pattern in settings.PROFILING_PATHS]
+
+    def header_mode(self, request):
+        """Profiler requested by the header (staff checked separately), or ``None``."""
+        value = request.headers.get(PROFILE_HEADER, '').strip().lower()
+        if not value or value in ('0', 'false'):
+            return None
+        return value if value in EXTENSIONS else settings.PROFILING_MODE
+
+    def path_mode(self, request):
+        if any(pattern.search(request.path) for pattern in self.patterns):
+            if random.random() < settings.PROFILING_SAMPLE_RATE:
+                return settings.PROFILING_MODE
+        return None
+
+    def metadata(self, request, response, start, profiler, threads='request'):
+        return {
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'samples': getattr(profiler, 'samples', None),
+            'threads': threads,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = self.header_mode(request)
+        if mode is not None and not is_staff_request(request):
+            mode = None
+        mode = mode or self.path_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        if mode == CPROFILE:
+            profiler = CProfiler()
+        else:
+            profiler = StackSampler({threading.get_ident()}, settings.PROFILING_SAMPLE_INTERVAL)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        response['X-Profile-Id'] = store(
+            profiler, mode, self.metadata(request, response, start, profiler)
+        )
+        return response
+
+    async def __acall__(self, request):
+        mode = self.header_mode(request)
+        if mode is not None and not await sync_to_async(is_staff_request)(request):
+            mode = None
+        mode = mode or self.path_mode(request)
+        if mode is None:
+            return await self.get_response(request)
+
+        # cProfile ne suit que le thread courant : échantillonnage de la boucle
+        # d'événements et du thread où la requête exécute son code synchrone
+        mode = SAMPLING
+        sync_thread = await sync_to_async(threading.get_ident)()
+        profiler = StackSampler(
+            {threading.get_ident(), sync_thread}, settings.PROFILING_SAMPLE_INTERVAL
+        )
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(profiler.stop, thread_sensitive=False)()
+        response['X-Profile-Id'] = await sync_to_async(store, thread_sensitive=False)(
+            profiler, mode, self.metadata(request, response, start, profiler, 'event_loop+sync')
+        )
+        return response
+
+
+# ==============================================================================
+# Vues staff
+# ==============================================================================
+
+@extend_schema(
+    tags=['Profiling'],
+    operation_id='profiles_list',
+    summary="Lister les profils",
+    description="Profils de requêtes enregistrés, du plus récent au plus ancien (staff uniquement)",
+    responses={
+        200: {"description": "Liste des profils"},
+        403: {"description": "Permission refusée"}
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_list(request):
+    """List stored profiles (staff only)."""
+    if not request.user.is_staff:
+        return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+
+    profiles = list_profiles()
+    for profile in profiles:
+        profile['download_url'] = request.build_absolute_uri(
+            reverse('api:profile-download', args=[profile['id']])
+        )
+    return Response({'count': len(profiles), 'results': profiles})
+
+
+@extend_schema(
+    tags=['Profiling'],
+    operation_id='profiles_download',
+    summary="Télécharger un profil",
+    description="Fichier du profil : piles repliées (.collapsed) ou pstats (.pstats) (staff uniquement)",
+    responses={
+        (200, 'application/octet-stream'): {"description": "Fichier du profil"},
+        403: {"description": "Permission refusée"},
+        404: {"description": "Profil introuvable"}
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_download(request, profile_id):
+    """Download a stored profile (staff only)."""
+    if not request.user.is_staff:
+        return Response({'error': 'Permission denied.'}, status=status.HTTP_403_FORBIDDEN)
+
+    found = get_profile(profile_id)
+    if found is None or not found[1].exists():
+        return Response({'error': 'Profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+    metadata, path = found
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=metadata['file'])
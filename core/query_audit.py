@@ -0,0 +1,216 @@
+"""
+Slow-query and N+1 detector.
+
+``QueryAuditMiddleware`` is off unless ``QUERY_AUDIT_ENABLED`` is set, and
+then audits a ``QUERY_AUDIT_SAMPLE_RATE`` fraction of requests. For an
+audited request every SQL statement is fingerprinted (literals, parameter
+placeholders and ``IN (...)`` lists collapsed), timed and attributed to the
+innermost frames of project code that issued it.
+
+When the request ran the same fingerprint ``QUERY_AUDIT_REPEAT_THRESHOLD``
+times or more (an N+1 pattern, typically a serializer reaching through a
+relation per row) or a statement slower than ``QUERY_AUDIT_SLOW_MS``, one
+JSON log line is written to the ``core.query_audit`` logger::
+
+    {"event": "query_audit", "view": "api:orders:order-list", "status": 200,
+     "duration_ms": 84.1, "queries": 53, "db_ms": 41.7, "distinct": 4,
+     "repeated": [{"fingerprint": "3f2a...", "count": 50, "total_ms": 38.2,
+                   "sql": "SELECT ... WHERE \\"orders_orderitem\\".\\"order_id\\" = ?",
+                   "stack": ["orders/serializers.py:112 in get_producers_count", ...]}],
+     "slow": [...]}
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+SQL_EXCERPT_LENGTH = 300
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?|\$\d+')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*\(.*\)', re.IGNORECASE | re.DOTALL)
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with every value replaced by ``?``: same statement shape, same text."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode('utf-8')).hexdigest()[:12]
+
+
+class QueryAudit:
+    """Statements run by one audited request, grouped by fingerprint."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+        self.by_fingerprint = {}
+        self.slow = []
+
+    def record(self, sql, duration):
+        self.queries += 1
+        self.duration += duration
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        entry = self.by_fingerprint.get(key)
+        if entry is None:
+            # La pile n'est relevée qu'à la première occurrence d'une empreinte
+            entry = self.by_fingerprint[key] = {
+                'fingerprint': key,
+                'count': 0,
+                'total_ms': 0.0,
+                'sql': normalized[:SQL_EXCERPT_LENGTH],
+                'stack': project_stack(),
+            }
+        entry['count'] += 1
+        entry['total_ms'] += duration * 1000
+        if duration * 1000 >= settings.QUERY_AUDIT_SLOW_MS:
+            self.slow.append({
+                'fingerprint': key,
+                'ms': round(duration * 1000, 2),
+                'sql': normalized[:SQL_EXCERPT_LENGTH],
+                'stack': entry['stack'] if entry['count'] == 1 else project_stack(),
+            })
+
+    def report(self, request, response, duration):
+        """The JSON-ready report, or ``None`` when nothing was flagged."""
+        limit = settings.QUERY_AUDIT_MAX_OFFENDERS
+        repeated = sorted(
+            (entry for entry in self.by_fingerprint.values()
+             if entry['count'] >= settings.QUERY_AUDIT_REPEAT_THRESHOLD),
+            key=lambda entry: (entry['count'], entry['total_ms']), reverse=True
+        )
+        if not repeated and not self.slow:
+            return None
+        for entry in repeated:
+            entry['total_ms'] = round(entry['total_ms'], 2)
+        return {
+            'event': 'query_audit',
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': self.queries,
+            'db_ms': round(self.duration * 1000, 2),
+            'distinct': len(self.by_fingerprint),
+            'repeated': repeated[:limit],
+            'slow': sorted(self.slow, key=lambda query: query['ms'], reverse=True)[:limit],
+        }
+
+
+def project_stack():
+    """The innermost ``QUERY_AUDIT_STACK_DEPTH`` frames of project code, innermost first."""
+    root = os.path.join(str(settings.BASE_DIR), '')
+    stack = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    # Les execute wrappers (métriques, réplicas, cet audit) sont imbriqués dans
+    # django.db : l'appelant est le premier frame au-delà du dernier de django.db
+    start = 0
+    for index, frame in enumerate(stack):
+        if f'{os.sep}django{os.sep}db{os.sep}' in frame.f_code.co_filename:
+            start = index + 1
+    frames = []
+    for frame in stack[start:]:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and 'site-packages' not in filename:
+            frames.append(f'{filename[len(root):]}:{frame.f_lineno} in {frame.f_code.co_name}')
+            if len(frames) == settings.QUERY_AUDIT_STACK_DEPTH:
+                break
+    return frames
+
+
+_current_audit = ContextVar('greencart_query_audit', default=None)
+
+
+def _audit_query(execute, sql, params, many, context):
+    audit = _current_audit.get()
+    if audit is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        audit.record(sql, time.perf_counter() - start)
+
+
+@receiver(connection_created)
+def audit_queries(sender, connection, **kwargs):
+    """Install the audit wrapper on every new connection when auditing is on."""
+    if settings.QUERY_AUDIT_ENABLED and _audit_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_audit_query)
+
+
+class QueryAuditMiddleware:
+    """Audit the SQL of a sample of requests and log N+1 and slow queries."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        return settings.QUERY_AUDIT_ENABLED and random.random() < settings.QUERY_AUDIT_SAMPLE_RATE
+
+    def emit(self, audit, request, response, start):
+        report = audit.report(request, response, time.perf_counter() - start)
+        if report is not None:
+            logger.warning(json.dumps(report, separators=(',', ':')))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        audit = QueryAudit()
+        token = _current_audit.set(audit)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_audit.reset(token)
+        self.emit(audit, request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        audit = QueryAudit()
+        token = _current_audit.set(audit)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_audit.reset(token)
+        self.emit(audit, request, response, start)
+        return response
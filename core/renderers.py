@@ -0,0 +1,186 @@
+"""
+API renderers: fast JSON and compact binary formats.
+
+``FastJSONRenderer`` encodes with orjson when it is installed and gives the
+same bytes as DRF's ``JSONRenderer``: UUIDs, dates and datetimes (``Z``
+for UTC) are encoded natively by orjson, in the same format as DRF's
+encoder; Decimals, lazy strings, querysets, ... go through that encoder's
+``default``. Whatever orjson refuses (integers beyond 64 bits, non-string
+keys, aware times, ...) or would write differently is rendered by
+``JSONRenderer``:
+
+- floats that orjson writes differently from ``repr()`` (``1e16`` for
+  ``1e+16``, ``0.00001`` for ``1e-05``), and NaN and infinities, which
+  orjson writes ``null`` where ``JSONRenderer`` raises (strict mode). The
+  data is walked for them first (``needs_json_renderer``), a cost per value
+  rather than per byte;
+- indented responses (``indent`` in the ``Accept`` header or the renderer
+  context).
+
+Without orjson the renderer is ``JSONRenderer``. Selected by
+``FAST_JSON_ENABLED``.
+
+``MessagePackRenderer`` (``application/msgpack``) and ``CBORRenderer``
+(``application/cbor``) are negotiated through ``Accept`` (or ``?format=``)
+for the formats listed in ``API_BINARY_FORMATS``. They carry the JSON
+document, values included: serializers already give strings for UUIDs,
+dates and decimals, and other values are converted like in JSON, except
+raw Decimals which stay exact. MessagePack writes them as strings; CBOR
+uses its standard tags for Decimals (4), UUIDs (37) and datetimes (0).
+"""
+import datetime
+import decimal
+import math
+import uuid
+from itertools import compress
+from operator import not_
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    cbor2 = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z if orjson else 0
+# Ni JavaScript ni le JSON embarqué dans du HTML n'acceptent ces séparateurs bruts
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+# Valeurs sans flottant à l'intérieur (les Decimals passent par ``default``, vérifié à part)
+LEAF_TYPES = frozenset({
+    str, int, bool, type(None), decimal.Decimal, uuid.UUID,
+    datetime.datetime, datetime.date, datetime.time,
+})
+
+
+def iter_floats(value):
+    """Every float in ``value``, looking into dicts, lists and tuples."""
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            values = value.values()
+        elif isinstance(value, (list, tuple)):
+            values = value
+        elif isinstance(value, float):
+            yield value
+            continue
+        else:
+            continue
+        # Types des valeurs en une passe C : les conteneurs de feuilles sont écartés d'un coup
+        kinds = list(map(type, values))
+        if LEAF_TYPES.issuperset(kinds):
+            continue
+        # Le reste (flottants, conteneurs, autres objets) est trié au tour suivant
+        stack.extend(compress(values, map(not_, map(LEAF_TYPES.__contains__, kinds))))
+
+
+def needs_json_renderer(value):
+    """
+    True if ``value`` holds a float orjson would write differently.
+
+    NaN and infinities (orjson writes ``null``, strict JSON raises) and
+    floats outside ``[1e-4, 1e16)``, where ``repr()`` switches to exponent
+    notation and orjson does not (``0.00001`` for ``1e-05``, ``1e16`` for
+    ``1e+16``).
+    """
+    return any(
+        not math.isfinite(number) or (number and not 1e-4 <= abs(number) < 1e16)
+        for number in iter_floats(value)
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` backed by orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indentation, UNICODE_JSON / COMPACT_JSON / STRICT_JSON modifiés : pas d'équivalent orjson
+        if (orjson is None or self.get_indent(accepted_media_type, renderer_context or {})
+                or self.ensure_ascii or not self.compact or not self.strict):
+            return super().render(data, accepted_media_type, renderer_context)
+        if needs_json_renderer(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder_default = self.encoder_class().default
+
+        def default(obj):
+            value = encoder_default(obj)
+            if needs_json_renderer(value):
+                # Decimal('NaN'), Decimal('1E-7')... : rendu par JSONRenderer
+                raise TypeError(f'{type(obj).__name__} gives a float orjson writes differently')
+            return value
+
+        try:
+            ret = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+def require(module, name):
+    if module is None:
+        raise ImproperlyConfigured(
+            f"{name} is not installed: remove it from API_BINARY_FORMATS or install it."
+        )
+    return module
+
+
+def binary_default(obj):
+    """Values msgpack does not know: like JSON, but exact Decimals."""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return JSONEncoder().default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack; dates and UUIDs as in JSON, Decimals as strings."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return require(msgpack, 'msgpack').packb(
+            data, default=binary_default, use_bin_type=True, datetime=False
+        )
+
+
+class CBORRenderer(BaseRenderer):
+    """CBOR (RFC 8949) with the standard tags for Decimals, UUIDs and datetimes."""
+
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        cbor = require(cbor2, 'cbor2')
+
+        def default(encoder, value):
+            encoder.encode(JSONEncoder().default(value))
+
+        # Datetimes naïfs : fuseau courant, comme les affiche Django
+        return cbor.dumps(data, default=default, timezone=timezone.get_current_timezone())
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import warnings
 from pathlib import Path
 from decouple import config
 from dj_database_url import parse as db_url
@@ -70,13 +72,21 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 # ==============================================================================
 
 MIDDLEWARE = [
+    'core.health.HealthCheckMiddleware',  # En premier : sondes sans auth/session/CSRF
+    'core.metrics.MetricsMiddleware',  # Durée et requêtes SQL par vue (hors sondes)
+    'core.query_audit.QueryAuditMiddleware',  # N+1 et requêtes lentes (opt-in, échantillonné)
+    'core.compression.CompressionMiddleware',  # gzip/brotli, autour de tout ce qui produit le corps
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'core.throttling.RateLimitMiddleware',  # Avant sessions/auth : rejet peu coûteux
+    'core.db_router.ReplicaRoutingMiddleware',
+    'products.cache.CatalogCacheMiddleware',  # Avant sessions/auth : catalogue public en cache
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'core.middleware.SwaggerCSRFExemptMiddleware',  # Exempt Swagger from CSRF
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',  # Après l'auth : en-tête X-Profile réservé au staff
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.CSRFDebugMiddleware',  # Debug CSRF issues if needed
@@ -119,6 +129,106 @@ DATABASES = {
     )
 }
 
+# Rejeu des transactions en cas d'échec de sérialisation (voir core/db.py)
+DB_RETRY_MAX_ATTEMPTS = config('DB_RETRY_MAX_ATTEMPTS', default=5, cast=int)
+DB_RETRY_BASE_DELAY = config('DB_RETRY_BASE_DELAY', default=0.02, cast=float)
+DB_RETRY_MAX_DELAY = config('DB_RETRY_MAX_DELAY', default=0.5, cast=float)
+DB_RETRY_BUDGET_SECONDS = config('DB_RETRY_BUDGET_SECONDS', default=2.0, cast=float)
+
+# Connexions PostgreSQL (voir README, « Connexions à la base de données ») :
+# - pool : pool psycopg 3 par processus (min/max, vérification avant usage)
+# - persistent : une connexion par thread réutilisée pendant DB_CONN_MAX_AGE
+# - external : derrière PgBouncer en mode transaction (pas de curseurs
+#   serveur ni de requêtes préparées)
+DB_POOL_MODE = config('DB_POOL_MODE', default='persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=4, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+DB_POOL_MAX_LIFETIME = config('DB_POOL_MAX_LIFETIME', default=1800, cast=float)
+
+
+def connection_settings(database, mode):
+    """Applique un mode de connexion (DB_POOL_MODE) à une base PostgreSQL."""
+    if 'postgresql' not in database['ENGINE']:
+        return database
+    options = database.setdefault('OPTIONS', {})
+
+    if mode == 'pool' and importlib.util.find_spec('psycopg_pool') is None:
+        warnings.warn("DB_POOL_MODE=pool requires psycopg[pool]; using persistent connections")
+        mode = 'persistent'
+
+    if mode == 'pool':
+        # Django vérifie chaque connexion à sa sortie du pool (CONN_HEALTH_CHECKS)
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = True
+        options['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+        }
+    elif mode == 'external':
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        database['CONN_HEALTH_CHECKS'] = True
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+        if importlib.util.find_spec('psycopg') is not None:
+            options['prepare_threshold'] = None
+        # PgBouncer refuse le paramètre de démarrage "options" : l'isolation
+        # est alors fixée par Django au début de chaque transaction
+        if 'serializable' in options.pop('options', ''):
+            try:
+                from psycopg import IsolationLevel
+                options['isolation_level'] = IsolationLevel.SERIALIZABLE
+            except ImportError:
+                from psycopg2.extensions import ISOLATION_LEVEL_SERIALIZABLE
+                options['isolation_level'] = ISOLATION_LEVEL_SERIALIZABLE
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        database['CONN_HEALTH_CHECKS'] = True
+    return database
+
+
+connection_settings(DATABASES['default'], DB_POOL_MODE)
+
+# Réplicas en lecture (voir core/db_router.py) : URLs séparées par des virgules
+DATABASE_REPLICA_URLS = config(
+    'DATABASE_REPLICA_URLS',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+
+
+def replica_databases(urls, mode, **options):
+    """Configuration des réplicas : {'replica_1': {...}, ...}."""
+    replicas = {}
+    for index, url in enumerate(urls, start=1):
+        database = db_url(url)
+        database.update(options)
+        connection_settings(database, mode)
+        # Les tests utilisent la base principale à la place des réplicas
+        database['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica_{index}'] = database
+    return replicas
+
+
+DATABASES.update(replica_databases(DATABASE_REPLICA_URLS, DB_POOL_MODE))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Préfixes d'URL dont les lectures peuvent être servies par un réplica
+DATABASE_REPLICA_PATHS = [
+    '/api/products/',  # Catégories, produits, images
+    '/api/auth/producers/',
+]
+# Après une écriture, le client lit sur la base principale pendant ce délai
+DATABASE_READ_YOUR_WRITES_SECONDS = config('DATABASE_READ_YOUR_WRITES_SECONDS', default=5, cast=int)
+DATABASE_PIN_COOKIE = 'gc_db_primary'
+# Durée d'éviction d'un réplica en erreur
+DATABASE_REPLICA_EJECT_SECONDS = config('DATABASE_REPLICA_EJECT_SECONDS', default=30, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -169,6 +279,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Avatars : tailles des variantes carrées générées par le worker (px)
+AVATAR_SIZES = [64, 128, 256]
+AVATAR_DEFAULT_SIZE = 128
+AVATAR_JPEG_QUALITY = 85
+AVATAR_MAX_UPLOAD_SIZE = config('AVATAR_MAX_UPLOAD_SIZE', default=5 * 1024 * 1024, cast=int)
+
 # ==============================================================================
 # AUTHENTICATION & AUTHORIZATION
 # ==============================================================================
@@ -180,18 +296,43 @@ LOGIN_URL = '/admin/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Tokens d'API (voir accounts/authentication.py)
+AUTH_TOKEN_TTL = config('AUTH_TOKEN_TTL', default=60 * 60 * 24 * 30, cast=int)  # 0 = sans expiration
+AUTH_TOKEN_REFRESH_INTERVAL = config('AUTH_TOKEN_REFRESH_INTERVAL', default=60 * 60, cast=int)
+# Cache des tokens : uniquement avec un cache partagé (Redis), voir core/caches.py
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+# Statistiques utilisateurs du tableau de bord admin (invalidées par signal)
+USER_STATS_CACHE_TIMEOUT = config('USER_STATS_CACHE_TIMEOUT', default=60 * 15, cast=int)
+
 # ==============================================================================
 # DJANGO REST FRAMEWORK
 # ==============================================================================
 
+# JSON via orjson (core/renderers.py, core/parsers.py) ; repli sur json sans orjson
+FAST_JSON_ENABLED = config('FAST_JSON_ENABLED', default=True, cast=bool)
+
+# Formats binaires négociés par Accept / Content-Type (cbor : paquet cbor2 requis)
+BINARY_FORMATS = {
+    'msgpack': ('core.renderers.MessagePackRenderer', 'core.parsers.MessagePackParser'),
+    'cbor': ('core.renderers.CBORRenderer', 'core.parsers.CBORParser'),
+}
+API_BINARY_FORMATS = config(
+    'API_BINARY_FORMATS', default='msgpack',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.ScopedThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': config('DRF_PAGE_SIZE', default=20, cast=int),
     'DEFAULT_FILTER_BACKENDS': [
@@ -200,16 +341,128 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ],
+        'core.renderers.FastJSONRenderer' if FAST_JSON_ENABLED
+        else 'rest_framework.renderers.JSONRenderer',
+    ] + [BINARY_FORMATS[name][0] for name in API_BINARY_FORMATS],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'core.parsers.FastJSONParser' if FAST_JSON_ENABLED else 'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
-    ],
+    ] + [BINARY_FORMATS[name][1] for name in API_BINARY_FORMATS],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# ==============================================================================
+# RATE LIMITING (voir core/throttling.py)
+# ==============================================================================
+
+# Les compteurs vivent dans le cache : il doit être partagé entre les workers
+# (Redis), sinon chaque worker applique son propre budget
+
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+
+# Nombre de proxies de confiance devant l'application (X-Forwarded-For) ;
+# à 0, derrière un load balancer, tous les clients partagent l'adresse du proxy
+RATELIMIT_PROXY_COUNT = config('RATELIMIT_PROXY_COUNT', default=0, cast=int)
+
+# Limites par IP appliquées par le middleware (premier préfixe correspondant)
+RATELIMIT_PATH_SCOPES = [
+    ('/api/auth/login/', 'auth'),
+    ('/api/auth/register/', 'auth'),
+    ('/api/orders/create-from-cart/', 'checkout'),
+    ('/api/products/', 'catalog'),
+    ('/api/', 'api'),
+]
+
+# Budgets par portée : ip_* pour le middleware, les autres pour les throttles DRF
+RATELIMIT_RATES = {
+    'ip_auth': config('RATELIMIT_IP_AUTH', default='30/min'),
+    'ip_checkout': config('RATELIMIT_IP_CHECKOUT', default='30/min'),
+    'ip_catalog': config('RATELIMIT_IP_CATALOG', default='300/min'),
+    'ip_api': config('RATELIMIT_IP_API', default='600/min'),
+    'user': config('RATELIMIT_USER', default='1200/hour'),
+    'auth': config('RATELIMIT_AUTH', default='10/min'),
+    'checkout': config('RATELIMIT_CHECKOUT', default='10/min'),
+    'catalog': config('RATELIMIT_CATALOG', default='600/min'),
+    # Échecs de connexion par adresse e-mail, vérifiés avant le hachage du mot de passe
+    'login_failures': config('RATELIMIT_LOGIN_FAILURES', default='10/hour'),
+}
+
+# ==============================================================================
+# HEALTH CHECKS (voir core/health.py)
+# ==============================================================================
+
+HEALTH_LIVENESS_PATH = '/api/health/live/'
+HEALTH_LIVENESS_ALIASES = ['/api/health/']
+HEALTH_READINESS_PATH = '/api/health/ready/'
+# Délai max de chaque vérification (base de données, cache), en secondes
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=2, cast=float)
+# Durée de réutilisation du résultat de la sonde de readiness
+HEALTH_READINESS_CACHE_SECONDS = config('HEALTH_READINESS_CACHE_SECONDS', default=2, cast=float)
+
+# ==============================================================================
+# MÉTRIQUES PROMETHEUS (voir core/metrics.py)
+# ==============================================================================
+
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_PATH = 'metrics'
+# Le scraper doit envoyer « Authorization: Bearer <jeton> » ; vide : /metrics
+# n'est servi qu'avec DEBUG=True (403 sinon)
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default='')
+
+# ==============================================================================
+# AUDIT SQL : N+1 ET REQUÊTES LENTES (voir core/query_audit.py)
+# ==============================================================================
+
+QUERY_AUDIT_ENABLED = config('QUERY_AUDIT_ENABLED', default=False, cast=bool)
+# Fraction des requêtes auditées (1.0 en local, quelques % en production)
+QUERY_AUDIT_SAMPLE_RATE = config('QUERY_AUDIT_SAMPLE_RATE', default=0.01, cast=float)
+# Seuil de requête lente, en millisecondes
+QUERY_AUDIT_SLOW_MS = config('QUERY_AUDIT_SLOW_MS', default=100, cast=float)
+# Nombre d'exécutions d'une même empreinte à partir duquel on signale un N+1
+QUERY_AUDIT_REPEAT_THRESHOLD = config('QUERY_AUDIT_REPEAT_THRESHOLD', default=5, cast=int)
+QUERY_AUDIT_MAX_OFFENDERS = 5
+QUERY_AUDIT_STACK_DEPTH = 3
+
+# ==============================================================================
+# PROFILAGE DES REQUÊTES (voir core/profiling.py)
+# ==============================================================================
+
+# Expressions régulières des chemins profilés, ex. ^/api/orders/statistics/
+PROFILING_PATHS = config(
+    'PROFILING_PATHS',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+# Fraction des requêtes profilées parmi celles dont le chemin correspond
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.1, cast=float)
+# 'sampling' (piles repliées pour flamegraphs) ou 'cprofile' (pstats)
+PROFILING_MODE = config('PROFILING_MODE', default='sampling')
+PROFILING_SAMPLE_INTERVAL = config('PROFILING_SAMPLE_INTERVAL', default=0.005, cast=float)
+# Tampon circulaire : seuls les N profils les plus récents sont conservés
+PROFILING_DIR = config('PROFILING_DIR', default='/tmp/greencart-profiles')
+PROFILING_MAX_PROFILES = config('PROFILING_MAX_PROFILES', default=50, cast=int)
+
+# ==============================================================================
+# COMPRESSION DES RÉPONSES (voir core/compression.py)
+# ==============================================================================
+
+# gzip, et brotli si le paquet brotli est installé, selon Accept-Encoding
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+# En dessous (octets), le gain ne vaut pas le coût de la compression
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+# Types déjà compressés (préfixes de Content-Type) ; le SVG reste compressé
+COMPRESSION_SKIP_TYPES = [
+    'image/', 'video/', 'audio/', 'font/woff',
+    'application/zip', 'application/gzip', 'application/x-gzip', 'application/pdf',
+]
+# Niveaux rapides pour les réponses compressées à chaque requête
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+# Niveaux denses pour les variantes du cache du catalogue, compressées une fois par entrée
+# (brotli 11 : encore ~5 % de moins, mais ~10 fois plus lent sur une liste de produits)
+COMPRESSION_CACHE_BROTLI_QUALITY = config('COMPRESSION_CACHE_BROTLI_QUALITY', default=9, cast=int)
+COMPRESSION_CACHE_GZIP_LEVEL = config('COMPRESSION_CACHE_GZIP_LEVEL', default=9, cast=int)
+
 # ==============================================================================
 # CORS CONFIGURATION
 # ==============================================================================
@@ -236,6 +489,9 @@ CACHES = {
     }
 }
 
+# Réponses du catalogue public (voir products/cache.py), en secondes ; 0 pour désactiver
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=30, cast=int)
+
 # ==============================================================================
 # EMAIL CONFIGURATION
 # ==============================================================================
@@ -251,6 +507,39 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@localhost')
 
+# ==============================================================================
+# OUTBOX (ÉVÉNEMENTS ASYNCHRONES)
+# ==============================================================================
+
+# Handlers appelés par le worker `process_outbox`, par motif de type d'événement
+OUTBOX_HANDLERS = {
+    'order.*': [
+        'api.outbox.log_event',
+        'orders.events.notify_consumer',
+        'api.outbox.deliver_webhooks',
+    ],
+    'user.avatar_uploaded': [
+        'accounts.avatars.process_avatar_event',
+    ],
+    '*.bulk_updated': [
+        'api.outbox.log_event',
+        'api.outbox.deliver_webhooks',
+    ],
+}
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=100, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=1.0, cast=float)
+OUTBOX_LEASE_SECONDS = config('OUTBOX_LEASE_SECONDS', default=300, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config('OUTBOX_RETRY_BASE_SECONDS', default=2, cast=int)
+OUTBOX_RETRY_MAX_SECONDS = config('OUTBOX_RETRY_MAX_SECONDS', default=3600, cast=int)
+OUTBOX_WEBHOOK_URLS = config(
+    'OUTBOX_WEBHOOK_URLS',
+    default='',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+OUTBOX_WEBHOOK_SECRET = config('OUTBOX_WEBHOOK_SECRET', default='')
+OUTBOX_WEBHOOK_TIMEOUT = config('OUTBOX_WEBHOOK_TIMEOUT', default=5, cast=int)
+
 # ==============================================================================
 # LOGGING CONFIGURATION
 # ==============================================================================
@@ -317,7 +606,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'GreenCart API',
-    'DESCRIPTION': 'API REST pour une plateforme de circuit court connectant producteurs locaux et consommateurs écoresponsables',
+    'DESCRIPTION': 'API REST pour une plateforme de circuit court connectant producteurs locaux et consommateurs écoresponsables'
+                   '\n\nFormats : JSON, et MessagePack ou CBOR quand ils sont activés (`API_BINARY_FORMATS`), '
+                   'négociés par `Accept` / `Content-Type` (`application/msgpack`, `application/cbor`) ou `?format=`.',
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
     'COMPONENT_SPLIT_REQUEST': True,
@@ -388,3 +679,6 @@ SPECTACULAR_SETTINGS = {
         'name': 'MIT License',
     },
 }
+
+# Schéma pré-généré au build de l'image (voir Dockerfile), servi tel quel
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
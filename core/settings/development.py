@@ -27,6 +27,7 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+DATABASES.update(replica_databases(DATABASE_REPLICA_URLS, DB_POOL_MODE))
 
 # Optionnel: PostgreSQL pour le développement
 # DATABASES = {
@@ -31,13 +31,21 @@ DATABASES = {
 }
 
 # Configuration avancée pour PostgreSQL en production
-DATABASES['default'].update({
-    'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
-    'OPTIONS': {
-        'connect_timeout': 10,
-        'options': '-c default_transaction_isolation=serializable'
-    }
-})
+DATABASES['default']['OPTIONS'] = {
+    'connect_timeout': 10,
+    'options': '-c default_transaction_isolation=serializable'
+}
+
+# Pool psycopg 3 par défaut en production (DB_POOL_MODE=external derrière PgBouncer)
+DB_POOL_MODE = config('DB_POOL_MODE', default='pool')
+connection_settings(DATABASES['default'], DB_POOL_MODE)
+
+# Réplicas : pas de SERIALIZABLE (refusé par PostgreSQL sur un hot standby)
+DATABASES.update(replica_databases(
+    DATABASE_REPLICA_URLS,
+    DB_POOL_MODE,
+    OPTIONS={'connect_timeout': config('DB_REPLICA_CONNECT_TIMEOUT', default=3, cast=int)}
+))
 
 # ==============================================================================
 # SECURITY SETTINGS
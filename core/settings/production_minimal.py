@@ -6,14 +6,22 @@ from decouple import config
 
 # Override middleware to add WhiteNoise
 MIDDLEWARE = [
+    'core.health.HealthCheckMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.query_audit.QueryAuditMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
     'corsheaders.middleware.CorsMiddleware',
+    'core.throttling.RateLimitMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
+    'products.cache.CatalogCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'core.middleware.SwaggerCSRFExemptMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -42,6 +50,8 @@ DATABASES = {
         cast=db_url
     )
 }
+connection_settings(DATABASES['default'], DB_POOL_MODE)
+DATABASES.update(replica_databases(DATABASE_REPLICA_URLS, DB_POOL_MODE))
 
 # ==============================================================================
 # SECURITY SETTINGS - MINIMAL
@@ -111,5 +121,6 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # WhiteNoise configuration
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-WHITENOISE_USE_FINDERS = True
-WHITENOISE_AUTOREFRESH = True
\ No newline at end of file
+# Fichiers collectés au build de l'image : pas de recherche ni de rescan à l'exécution
+WHITENOISE_USE_FINDERS = False
+WHITENOISE_AUTOREFRESH = False
\ No newline at end of file
@@ -31,6 +31,17 @@ DATABASES = {
     }
 }
 
+# PostgreSQL facultatif (TEST_DATABASE_URL=postgres://...) : les tests de
+# concurrence (verrous, échecs de sérialisation) sont sautés sur SQLite
+TEST_DATABASE_URL = config('TEST_DATABASE_URL', default='')
+if TEST_DATABASE_URL:
+    DATABASES['default'] = db_url(TEST_DATABASE_URL)
+    # Même isolation qu'en production
+    DATABASES['default']['OPTIONS'] = {
+        'options': '-c default_transaction_isolation=serializable'
+    }
+DATABASES.update(replica_databases(DATABASE_REPLICA_URLS, DB_POOL_MODE))
+
 # ==============================================================================
 # PASSWORD VALIDATION
 # ==============================================================================
@@ -49,6 +60,9 @@ CACHES = {
     }
 }
 
+# Pas de cache du catalogue : les rollbacks des tests ne l'invalident pas (on_commit)
+CATALOG_CACHE_TIMEOUT = 0
+
 # ==============================================================================
 # EMAIL CONFIGURATION
 # ==============================================================================
@@ -165,5 +179,8 @@ REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
     'rest_framework.authentication.SessionAuthentication',
 ]
 
+# Pas de limitation de débit pendant les tests
+RATELIMIT_ENABLED = False
+
 # Désactiver la pagination pour simplifier les tests
 REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS'] = None
\ No newline at end of file
@@ -0,0 +1,694 @@
+"""
+Tests for read-replica routing (the router, ejection and fallback, and the
+middleware's read-your-writes cookie), rate limiting, response compression,
+access to the metrics endpoint, the threads sampled by the profiler, the
+orjson, MessagePack and CBOR renderers and parsers, the query audit and the
+health probes.
+
+No replica runs in the test environment: ``DATABASE_REPLICAS`` is
+overridden and replica connections are assumed to open, so the tests
+check routing decisions, not queries on a replica.
+"""
+import asyncio
+import datetime
+import decimal
+import gzip
+import io
+import json
+import math
+import tempfile
+import threading
+import uuid
+from types import SimpleNamespace
+from unittest import mock, skipIf, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import Producer, User
+from products.models import Category, Product
+
+from . import compression, db_router, health, profiling, query_audit, renderers, throttling
+from .compression import CompressionMiddleware
+from .db_router import ReplicaRouter, ReplicaRoutingMiddleware, use_primary, use_replicas
+from .metrics import metrics_view
+from .parsers import CBORParser, FastJSONParser, MessagePackParser
+from .profiling import ProfilingMiddleware
+from .renderers import CBORRenderer, FastJSONRenderer, MessagePackRenderer
+from .throttling import RateLimitMiddleware, SlidingWindowLimiter, client_ip, parse_rate
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_REPLICA_EJECT_SECONDS=30)
+class ReplicaTestCase(TransactionTestCase):
+
+    def setUp(self):
+        db_router._ejected.clear()
+        self.addCleanup(db_router._ejected.clear)
+        usable = mock.patch.object(db_router, '_usable', return_value=True)
+        self.usable = usable.start()
+        self.addCleanup(usable.stop)
+        self.router = ReplicaRouter()
+
+    def read_db(self, model=Product, **hints):
+        return self.router.db_for_read(model, **hints)
+
+
+class ReplicaRouterTests(ReplicaTestCase):
+
+    def test_reads_use_the_primary_unless_allowed(self):
+        self.assertEqual(self.read_db(), DEFAULT_DB_ALIAS)
+        with use_replicas():
+            self.assertIn(self.read_db(), REPLICAS)
+            with use_primary():
+                self.assertEqual(self.read_db(), DEFAULT_DB_ALIAS)
+
+    def test_a_block_sticks_to_one_replica(self):
+        with use_replicas():
+            first = self.read_db()
+            self.assertEqual({self.read_db() for _ in range(5)}, {first})
+
+    def test_blocks_rotate_over_the_replicas(self):
+        chosen = set()
+        for _ in range(4):
+            with use_replicas():
+                chosen.add(self.read_db())
+        self.assertEqual(chosen, set(REPLICAS))
+
+    def test_writes_and_auth_models_use_the_primary(self):
+        with use_replicas():
+            self.assertEqual(self.router.db_for_write(Product), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.read_db(Token), DEFAULT_DB_ALIAS)
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with use_replicas(), transaction.atomic():
+            self.assertEqual(self.read_db(), DEFAULT_DB_ALIAS)
+
+    def test_related_reads_follow_the_instance(self):
+        product = Product()
+        product._state.db = DEFAULT_DB_ALIAS
+        with use_replicas():
+            self.assertEqual(self.read_db(instance=product), DEFAULT_DB_ALIAS)
+
+
+class EjectionTests(ReplicaTestCase):
+
+    def test_ejected_replica_is_skipped(self):
+        db_router.eject('replica_1', 'test')
+        self.assertEqual(db_router.healthy_replicas(), ['replica_2'])
+        for _ in range(3):
+            with use_replicas():
+                self.assertEqual(self.read_db(), 'replica_2')
+
+    def test_reads_fall_back_to_the_primary_without_healthy_replica(self):
+        for alias in REPLICAS:
+            db_router.eject(alias, 'test')
+        with use_replicas():
+            self.assertEqual(self.read_db(), DEFAULT_DB_ALIAS)
+
+    def test_block_moves_off_a_replica_ejected_meanwhile(self):
+        with use_replicas():
+            first = self.read_db()
+            db_router.eject(first, 'test')
+            self.assertNotIn(self.read_db(), (first, DEFAULT_DB_ALIAS))
+
+    @override_settings(DATABASE_REPLICA_EJECT_SECONDS=0)
+    def test_ejection_expires(self):
+        db_router.eject('replica_1', 'test')
+        self.assertEqual(db_router.healthy_replicas(), REPLICAS)
+
+    def test_replica_that_cannot_connect_is_ejected(self):
+        def usable(alias):
+            if alias == 'replica_1':
+                db_router.eject(alias, 'connection refused')
+                return False
+            return True
+
+        self.usable.side_effect = usable
+        for _ in range(2):
+            with use_replicas():
+                self.assertEqual(self.read_db(), 'replica_2')
+        self.assertEqual(db_router.healthy_replicas(), ['replica_2'])
+
+    def test_connection_errors_eject_the_replica(self):
+        def execute(sql, params, many, context):
+            raise OperationalError('server closed the connection unexpectedly')
+
+        context = {'connection': SimpleNamespace(alias='replica_2')}
+        with self.assertRaises(OperationalError):
+            db_router._eject_on_error(execute, 'SELECT 1', (), False, context)
+        self.assertEqual(db_router.healthy_replicas(), ['replica_1'])
+
+
+class ReplicaRoutingMiddlewareTests(ReplicaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        self.status = 200
+
+    def view(self, request):
+        """Records where the request's catalog reads would go."""
+        self.read_from = self.read_db()
+        return HttpResponse(status=self.status)
+
+    async def async_view(self, request):
+        return self.view(request)
+
+    def test_safe_catalog_requests_read_from_a_replica(self):
+        ReplicaRoutingMiddleware(self.view)(self.factory.get('/api/products/products/'))
+        self.assertIn(self.read_from, REPLICAS)
+
+    def test_other_paths_and_writes_use_the_primary(self):
+        middleware = ReplicaRoutingMiddleware(self.view)
+        middleware(self.factory.get('/api/orders/'))
+        self.assertEqual(self.read_from, DEFAULT_DB_ALIAS)
+        middleware(self.factory.post('/api/products/products/'))
+        self.assertEqual(self.read_from, DEFAULT_DB_ALIAS)
+
+    def test_successful_write_pins_the_client_to_the_primary(self):
+        response = ReplicaRoutingMiddleware(self.view)(self.factory.post('/api/cart/add/'))
+        cookie = response.cookies[settings.DATABASE_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+
+        request = self.factory.get('/api/products/products/')
+        request.COOKIES[settings.DATABASE_PIN_COOKIE] = '1'
+        ReplicaRoutingMiddleware(self.view)(request)
+        self.assertEqual(self.read_from, DEFAULT_DB_ALIAS)
+
+    def test_failed_write_does_not_pin(self):
+        self.status = 400
+        response = ReplicaRoutingMiddleware(self.view)(self.factory.post('/api/cart/add/'))
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+    def test_async_requests_are_routed_too(self):
+        middleware = ReplicaRoutingMiddleware(self.async_view)
+        response = asyncio.run(middleware(self.factory.get('/api/products/categories/')))
+        self.assertIn(self.read_from, REPLICAS)
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        response = ReplicaRoutingMiddleware(self.view)(self.factory.post('/api/cart/add/'))
+        self.assertEqual(self.read_from, DEFAULT_DB_ALIAS)
+        self.assertNotIn(settings.DATABASE_PIN_COOKIE, response.cookies)
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory(headers={'Accept-Encoding': 'br, gzip'})
+        self.response = HttpResponse(b'{"name": "Carottes"}' * 100, content_type='application/json')
+
+    def encoding(self, request):
+        response = CompressionMiddleware(lambda request: self.response)(request)
+        return response.get('Content-Encoding')
+
+    def test_public_responses_prefer_brotli(self):
+        self.assertEqual(self.encoding(self.factory.get('/api/products/')), compression.ENCODINGS[0])
+
+    def test_requests_with_credentials_are_only_gzipped(self):
+        request = self.factory.get('/api/orders/', headers={'Authorization': 'Token abc'})
+        self.assertEqual(self.encoding(request), 'gzip')
+        request = self.factory.get('/api/orders/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        self.assertEqual(self.encoding(request), 'gzip')
+
+    def test_private_responses_are_only_gzipped(self):
+        self.response['Cache-Control'] = 'private'
+        self.assertEqual(self.encoding(self.factory.get('/api/products/')), 'gzip')
+
+    def test_gzip_streams_carry_a_random_file_name(self):
+        self.response = StreamingHttpResponse([b'id,name\n'] + [b'1,Carottes\n'] * 200)
+        request = self.factory.get('/api/orders/export/', headers={'Accept-Encoding': 'gzip'})
+        with mock.patch.object(compression.secrets, 'randbelow', return_value=12):
+            response = CompressionMiddleware(lambda request: self.response)(request)
+            body = b''.join(response.streaming_content)
+        # En-tête gzip : drapeau FNAME puis le nom, après les 10 octets fixes
+        self.assertTrue(body[3] & gzip.FNAME)
+        self.assertEqual(body[10:23], b'a' * 12 + b'\0')
+        self.assertEqual(gzip.decompress(body).count(b'Carottes'), 200)
+
+
+class MetricsViewTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def status(self, **headers):
+        return metrics_view(self.factory.get('/metrics', headers=headers)).status_code
+
+    @override_settings(METRICS_AUTH_TOKEN='s3cret')
+    def test_token_is_required(self):
+        self.assertEqual(self.status(), 401)
+        self.assertEqual(self.status(Authorization='Bearer wrong'), 401)
+        self.assertEqual(self.status(Authorization='Bearer s3cret'), 200)
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=False)
+    def test_no_token_refuses_scrapes_outside_debug(self):
+        self.assertEqual(self.status(), 403)
+
+    @override_settings(METRICS_AUTH_TOKEN='', DEBUG=True)
+    def test_no_token_is_open_in_debug(self):
+        self.assertEqual(self.status(), 200)
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiles = self.settings(
+            PROFILING_DIR=directory.name, PROFILING_PATHS=['^/api/products/'],
+            PROFILING_SAMPLE_RATE=1, PROFILING_MODE='sampling',
+        )
+        profiles.enable()
+        self.addCleanup(profiles.disable)
+        self.factory = RequestFactory()
+        sampler = mock.patch.object(profiling, 'StackSampler', wraps=profiling.StackSampler)
+        self.sampler = sampler.start()
+        self.addCleanup(sampler.stop)
+
+    def test_sync_requests_sample_the_request_thread(self):
+        response = ProfilingMiddleware(lambda request: HttpResponse())(self.factory.get('/api/products/'))
+        self.assertEqual(self.sampler.call_args.args[0], {threading.get_ident()})
+        metadata, _path = profiling.get_profile(response['X-Profile-Id'])
+        self.assertEqual(metadata['threads'], 'request')
+
+    def test_async_requests_sample_the_loop_and_the_sync_thread_only(self):
+        threads = {}
+
+        async def view(request):
+            threads['loop'] = threading.get_ident()
+            threads['sync'] = await sync_to_async(threading.get_ident)()
+            return HttpResponse()
+
+        response = asyncio.run(ProfilingMiddleware(view)(self.factory.get('/api/products/')))
+        self.assertEqual(self.sampler.call_args.args[0], {threads['loop'], threads['sync']})
+        metadata, _path = profiling.get_profile(response['X-Profile-Id'])
+        self.assertEqual(metadata['threads'], 'event_loop+sync')
+
+
+class SlidingWindowLimiterTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        clock = mock.patch.object(throttling.time, 'time', return_value=6000.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+        self.limiter = SlidingWindowLimiter('test', 3, 60)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('100/min'), (100, 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 3600))
+        self.assertIsNone(parse_rate(''))
+
+    def test_rejects_over_the_limit_until_the_window_slides(self):
+        for _ in range(3):
+            self.assertIsNone(self.limiter.consume('ip:1'))
+        self.assertEqual(self.limiter.consume('ip:1'), 60)
+        self.assertIsNone(self.limiter.consume('ip:2'))
+
+        # Fenêtre suivante, à mi-parcours : 3 requêtes précédentes pèsent 1,5
+        self.clock.return_value = 6090.0
+        self.assertIsNone(self.limiter.consume('ip:1'))
+        self.assertIsNone(self.limiter.consume('ip:1'))
+        self.assertEqual(self.limiter.consume('ip:1'), 30)
+
+    def test_check_does_not_count(self):
+        for _ in range(5):
+            self.assertIsNone(self.limiter.check('ip:1'))
+
+
+class ClientIpTests(TestCase):
+
+    def request(self, forwarded):
+        return RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded)
+
+    @override_settings(RATELIMIT_PROXY_COUNT=0)
+    def test_forwarded_header_is_ignored_without_proxies(self):
+        self.assertEqual(client_ip(self.request('203.0.113.7')), '10.0.0.1')
+
+    @override_settings(RATELIMIT_PROXY_COUNT=1)
+    def test_address_added_by_the_trusted_proxy_is_used(self):
+        # L'adresse la plus à gauche vient du client et peut être forgée
+        self.assertEqual(client_ip(self.request('1.2.3.4, 203.0.113.7')), '203.0.113.7')
+
+    @override_settings(RATELIMIT_PROXY_COUNT=2)
+    def test_shorter_header_than_the_proxy_chain_falls_back_to_the_peer(self):
+        self.assertEqual(client_ip(self.request('203.0.113.7')), '10.0.0.1')
+        self.assertEqual(client_ip(self.request('1.2.3.4, 203.0.113.7, 10.1.1.1')), '203.0.113.7')
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_RATES={'ip_api': '2/min'}, RATELIMIT_PROXY_COUNT=0)
+class RateLimitMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse())
+        self.factory = RequestFactory()
+
+    def test_over_budget_requests_get_429_and_retry_after(self):
+        statuses = [self.middleware(self.factory.get('/api/orders/')).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 200])
+        response = self.middleware(self.factory.get('/api/orders/'))
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+
+        other = self.factory.get('/api/orders/', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(self.middleware(other).status_code, 200)
+
+    def test_paths_without_a_budget_are_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(self.middleware(self.factory.get('/admin/')).status_code, 200)
+            self.assertEqual(self.middleware(self.factory.options('/api/orders/')).status_code, 200)
+
+
+@skipUnless(renderers.orjson, 'orjson is not installed')
+class FastJSONTests(TestCase):
+    """orjson gives the bytes and values of DRF's JSON renderer and parser."""
+
+    def assertSameRendering(self, data, accepted_media_type='application/json'):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(FastJSONRenderer().render(data, accepted_media_type), expected)
+        return expected
+
+    def assertSameParsing(self, body):
+        expected = JSONParser().parse(io.BytesIO(body), 'application/json')
+        parsed = FastJSONParser().parse(io.BytesIO(body), 'application/json')
+        self.assertEqual(parsed, expected)
+        self.assertEqual(type(parsed), type(expected))
+
+    def test_values_encoded_by_drf(self):
+        paris = datetime.timezone(datetime.timedelta(hours=2))
+        self.assertSameRendering({
+            'price': decimal.Decimal('12.50'),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'aware': datetime.datetime(2026, 5, 1, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'offset': datetime.datetime(2026, 5, 1, 8, 30, tzinfo=paris),
+            'naive': datetime.datetime(2026, 5, 1, 8, 30, 15, 250000),
+            'day': datetime.date(2026, 5, 1),
+            'time': datetime.time(8, 30, 15, 123456),
+            'label': gettext_lazy('Légumes'),
+            'text': 'ligne\u2028suivante\u2029fin',
+            'numbers': [0.1, 1e15, 0.0001, -2.5, 0.0, 2 ** 63 - 1],
+        })
+
+    def test_floats_orjson_writes_differently(self):
+        for number in (1e16, 1e-05, -1.5e20, 5e-324):
+            with self.subTest(number=number):
+                self.assertIn(repr(number).encode(), self.assertSameRendering({'value': [number]}))
+        self.assertSameRendering({'price': decimal.Decimal('1E-7')})
+
+    def test_non_finite_floats_raise_like_drf(self):
+        for value in (math.nan, math.inf, -math.inf, decimal.Decimal('NaN')):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'value': value})
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({'value': [value]})
+
+    def test_values_orjson_refuses(self):
+        self.assertSameRendering({'big': 2 ** 64, 'small': -2 ** 70})
+        self.assertSameRendering({1: 'un', None: 'rien'})
+        aware_time = {'time': datetime.time(8, 30, tzinfo=datetime.timezone.utc)}
+        for renderer in (JSONRenderer(), FastJSONRenderer()):
+            with self.assertRaisesMessage(ValueError, 'timezone-aware times'):
+                renderer.render(aware_time)
+
+    def test_indented_responses(self):
+        self.assertIn(b'\n    "a"', self.assertSameRendering({'a': [1]}, 'application/json; indent=4'))
+
+    def test_parsing(self):
+        self.assertSameParsing('{"name": "Pommes", "prix": 1.5, "tags": [null, true], "note": "\u2028"}'.encode())
+        self.assertSameParsing(b'{"big": 123456789012345678901234567890, "neg": -18446744073709551616}')
+        self.assertSameParsing(b'[1e300, 9223372036854775807, 1e16]')
+
+    def test_parse_errors_are_worded_by_drf(self):
+        for body in (b'{"a": NaN}', b'[Infinity]', b'{"a": '):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    JSONParser().parse(io.BytesIO(body), 'application/json')
+                with self.assertRaisesMessage(ParseError, str(expected.exception.detail)):
+                    FastJSONParser().parse(io.BytesIO(body), 'application/json')
+
+
+@skipUnless(renderers.msgpack, 'msgpack is not installed')
+class BinaryFormatTests(TestCase):
+    """MessagePack (enabled by default) and CBOR, negotiated by ``Accept`` and ``Content-Type``."""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username='ferme', email='ferme@example.com', password='testpass123', user_type='PRODUCER'
+        )
+        producer = Producer.objects.create(
+            user=user, business_name='Ferme', address='1 rue des Champs', city='Lyon',
+            postal_code='69001', region='Auvergne-Rhône-Alpes',
+        )
+        self.product = Product.objects.create(
+            producer=producer, category=Category.objects.create(name='Légumes'), name='Carottes',
+            description='Carottes', price=decimal.Decimal('2.50'), quantity_available=10,
+        )
+        self.url = f'/api/products/products/{self.product.pk}/'
+
+    def test_values_are_encoded_like_json(self):
+        moment = datetime.datetime(2026, 5, 1, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        identifier = uuid.UUID('12345678-1234-5678-1234-567812345678')
+        data = {'price': decimal.Decimal('2.50'), 'id': identifier, 'day': datetime.date(2026, 5, 1),
+                'at': moment, 'items': [1, 'deux', None, 3.5]}
+        body = MessagePackRenderer().render(data)
+        unpacked = renderers.msgpack.unpackb(body)
+        # Comme en JSON, sauf les Decimals bruts : des chaînes exactes plutôt que des flottants
+        self.assertEqual(unpacked, {**json.loads(JSONRenderer().render(data)), 'price': '2.50'})
+        self.assertEqual(MessagePackParser().parse(io.BytesIO(body)), renderers.msgpack.unpackb(body))
+
+    def test_negotiated_by_accept_or_format(self):
+        expected = self.client.get(self.url).json()
+        self.assertEqual(expected['price'], '2.50')
+        for response in (self.client.get(self.url, headers={'Accept': 'application/msgpack'}),
+                         self.client.get(self.url, {'format': 'msgpack'})):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(renderers.msgpack.unpackb(response.content), expected)
+
+    def test_request_bodies(self):
+        consumer = User.objects.create_user(
+            username='client', email='client@example.com', password='testpass123', user_type='CONSUMER'
+        )
+        self.client.force_login(consumer)
+        body = renderers.msgpack.packb({'product_id': str(self.product.pk), 'quantity': 2})
+        response = self.client.post('/api/cart/add/', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['cart_item']['quantity'], 2)
+
+        response = self.client.post('/api/cart/add/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('MessagePack parse error', response.json()['detail'])
+
+    @skipIf('cbor' in settings.API_BINARY_FORMATS, 'CBOR is enabled')
+    def test_formats_not_enabled_are_not_acceptable(self):
+        response = self.client.get(self.url, headers={'Accept': 'application/cbor'})
+        self.assertEqual(response.status_code, 406)
+
+    @skipUnless(renderers.cbor2, 'cbor2 is not installed')
+    def test_cbor_round_trip(self):
+        moment = datetime.datetime(2026, 5, 1, 8, 30, tzinfo=datetime.timezone.utc)
+        identifier = uuid.UUID('12345678-1234-5678-1234-567812345678')
+        data = {'price': decimal.Decimal('2.50'), 'id': identifier, 'at': moment, 'day': '2026-05-01'}
+        body = CBORRenderer().render(data)
+        self.assertEqual(CBORParser().parse(io.BytesIO(body)), data)
+        with self.assertRaises(ParseError):
+            CBORParser().parse(io.BytesIO(b'\xff'))
+
+
+def load_products_one_by_one(pks):
+    """An N+1 pattern: one query per product."""
+    return [Product.objects.get(pk=pk).name for pk in pks]
+
+
+@override_settings(
+    QUERY_AUDIT_ENABLED=True, QUERY_AUDIT_SAMPLE_RATE=1.0, QUERY_AUDIT_REPEAT_THRESHOLD=5,
+    QUERY_AUDIT_SLOW_MS=1000,
+)
+class QueryAuditTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            username='ferme', email='ferme@example.com', password='testpass123', user_type='PRODUCER'
+        )
+        producer = Producer.objects.create(
+            user=user, business_name='Ferme', address='1 rue des Champs', city='Lyon',
+            postal_code='69001', region='Auvergne-Rhône-Alpes',
+        )
+        category = Category.objects.create(name='Légumes')
+        cls.pks = [
+            Product.objects.create(
+                producer=producer, category=category, name=f'Produit {number}', description='-',
+                price=decimal.Decimal('2.50'), quantity_available=10,
+            ).pk
+            for number in range(6)
+        ]
+
+    def setUp(self):
+        # Le wrapper est posé à l'ouverture d'une connexion, peut-être avant l'activation de l'audit
+        wrappers = mock.patch.object(connection, 'execute_wrappers', [query_audit._audit_query])
+        wrappers.start()
+        self.addCleanup(wrappers.stop)
+        self.path = '/api/products/products/'
+
+    def audit(self, products):
+        """Run ``products`` lookups behind the middleware; returns the logged report or ``None``."""
+        def view(request):
+            request.resolver_match = resolve(request.path)
+            load_products_one_by_one(self.pks[:products])
+            return HttpResponse()
+
+        middleware = query_audit.QueryAuditMiddleware(view)
+        with mock.patch.object(query_audit.logger, 'warning') as warning:
+            middleware(RequestFactory().get(self.path))
+        if not warning.called:
+            return None
+        [(line,)] = [call.args for call in warning.call_args_list]
+        return json.loads(line)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            query_audit.normalize_sql(
+                "SELECT *  FROM t\n WHERE name = 'O''Neil' AND id IN (%s, %s, %s) AND n > 42 LIMIT $1"
+            ),
+            'SELECT * FROM t WHERE name = ? AND id IN (...) AND n > ? LIMIT ?',
+        )
+        self.assertEqual(
+            query_audit.normalize_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t (a, b) VALUES (...)',
+        )
+
+    def test_statements_of_the_same_shape_share_a_fingerprint(self):
+        first, second, other = (
+            query_audit.fingerprint(query_audit.normalize_sql(sql)) for sql in (
+                'SELECT * FROM t WHERE id = 1', 'SELECT * FROM t WHERE id = 22',
+                'SELECT * FROM t WHERE name = 1',
+            )
+        )
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_n_plus_one_is_logged_with_view_count_and_stack(self):
+        report = self.audit(6)
+        self.assertEqual(report['event'], 'query_audit')
+        self.assertEqual(report['view'], resolve(self.path).view_name)
+        self.assertEqual(report['queries'], 6)
+        self.assertEqual(report['distinct'], 1)
+        [repeated] = report['repeated']
+        self.assertEqual(repeated['count'], 6)
+        self.assertIn('products_product', repeated['sql'])
+        self.assertTrue(repeated['stack'][0].startswith('core/tests.py:'))
+        self.assertTrue(any(frame.endswith(' in load_products_one_by_one') for frame in repeated['stack']))
+        self.assertEqual(report['slow'], [])
+
+    def test_repeats_below_the_threshold_are_not_logged(self):
+        self.assertIsNone(self.audit(4))
+
+    @override_settings(QUERY_AUDIT_SLOW_MS=0)
+    def test_slow_queries_are_logged(self):
+        report = self.audit(1)
+        self.assertEqual(report['repeated'], [])
+        self.assertEqual(len(report['slow']), 1)
+        self.assertTrue(report['slow'][0]['stack'])
+
+    def test_requests_out_of_the_sample_are_not_audited(self):
+        with override_settings(QUERY_AUDIT_SAMPLE_RATE=0.0):
+            self.assertIsNone(self.audit(6))
+        with override_settings(QUERY_AUDIT_ENABLED=False):
+            self.assertIsNone(self.audit(6))
+
+    def test_project_stack_skips_django_frames(self):
+        stack = query_audit.project_stack()
+        self.assertTrue(stack[0].startswith('core/tests.py:'))
+        self.assertTrue(stack[0].endswith(' in test_project_stack_skips_django_frames'))
+        self.assertFalse(any('site-packages' in frame for frame in stack))
+
+
+def failing_check():
+    raise OperationalError('connection refused')
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT=1, HEALTH_READINESS_CACHE_SECONDS=60)
+class HealthCheckTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        # Sondes factices : la vraie sonde garderait une connexion ouverte dans son thread
+        checks = mock.patch.dict(health.CHECKS, {'database': self.check, 'cache': self.check})
+        checks.start()
+        self.addCleanup(checks.stop)
+        self.addCleanup(health._last.update, expires=0.0)
+        health._last['expires'] = 0.0
+
+    def check(self):
+        self.calls.append(1)
+
+    def get(self, path, **headers):
+        response = self.client.get(path, headers=headers)
+        return response.status_code, response.json()
+
+    def test_liveness_runs_no_check(self):
+        for path in (settings.HEALTH_LIVENESS_PATH, *settings.HEALTH_LIVENESS_ALIASES):
+            self.assertEqual(self.get(path), (200, {'status': 'ok'}))
+        self.assertEqual(self.calls, [])
+
+    def test_cache_check_reads_its_value_back(self):
+        health.check_cache()
+        with mock.patch.object(health.cache, 'get', return_value=None):
+            with self.assertRaises(RuntimeError):
+                health.check_cache()
+
+    def test_ready(self):
+        self.assertEqual(
+            self.get(settings.HEALTH_READINESS_PATH),
+            (200, {'status': 'ok', 'checks': {'database': 'ok', 'cache': 'ok'}}),
+        )
+
+    def test_failed_check_is_unavailable(self):
+        with mock.patch.dict(health.CHECKS, database=failing_check):
+            status, body = self.get(settings.HEALTH_READINESS_PATH)
+        self.assertEqual(status, 503)
+        self.assertEqual(body, {'status': 'unavailable', 'checks': {'database': 'OperationalError', 'cache': 'ok'}})
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_stuck_check_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with mock.patch.dict(health.CHECKS, cache=release.wait):
+            status, body = self.get(settings.HEALTH_READINESS_PATH)
+        self.assertEqual(status, 503)
+        self.assertEqual(body['checks'], {'database': 'ok', 'cache': 'timeout'})
+
+    def test_result_is_reused_for_a_while(self):
+        self.get(settings.HEALTH_READINESS_PATH)
+        with mock.patch.dict(health.CHECKS, database=failing_check):
+            self.assertEqual(self.get(settings.HEALTH_READINESS_PATH)[0], 200)
+            self.assertEqual(len(self.calls), 2)
+            health._last['expires'] = 0.0
+            self.assertEqual(self.get(settings.HEALTH_READINESS_PATH)[0], 503)
+
+    def test_probes_set_no_cookie(self):
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'unknown'
+        for path in (settings.HEALTH_LIVENESS_PATH, settings.HEALTH_READINESS_PATH):
+            response = self.client.get(path, HTTP_HOST='probe.internal')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.cookies, {})
+            self.assertEqual(response['Cache-Control'], 'no-store')
+            self.assertNotIn('Vary', response)
@@ -0,0 +1,230 @@
+"""
+Cache-backed rate limiting for GreenCart.
+
+Limits use a sliding-window counter: two fixed-window counters (current
+and previous window) stored in the configured cache, the previous one
+weighted by how much of it still overlaps the sliding window. Checking a
+limit costs one ``get_many``; counting a request one ``add`` + ``incr``.
+
+Two layers share the same limiter:
+
+- ``RateLimitMiddleware`` applies per-IP budgets by path prefix before
+  sessions, authentication and serializers run, so floods are rejected
+  cheaply.
+- ``ScopedThrottle`` and its subclasses are DRF throttles that apply
+  per-user (or per-IP for anonymous requests) budgets by scope.
+
+The counters must live in a cache shared by every worker (Redis): with
+the per-process ``LocMemCache`` each gunicorn worker keeps its own
+counts, so the effective budget is multiplied by the number of workers.
+Rejections are counted in ``greencart_throttled_requests_total``.
+"""
+import hashlib
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+from core.metrics import record_throttled
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'100/min' -> (100, 60). Returns None for an empty rate."""
+    if not rate:
+        return None
+    num, period = rate.split('/')
+    return int(num), _PERIODS[period.strip()[0].lower()]
+
+
+class SlidingWindowLimiter:
+    """``limit`` requests per ``window`` seconds for any key."""
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def for_scope(cls, scope):
+        """Build the limiter configured in ``RATELIMIT_RATES``, or None if unlimited."""
+        parsed = parse_rate(settings.RATELIMIT_RATES.get(scope))
+        if parsed is None:
+            return None
+        return cls(scope, *parsed)
+
+    def _keys(self, ident, now):
+        bucket = int(now // self.window)
+        prefix = f'rl:{self.scope}:{ident}:'
+        return prefix + str(bucket), prefix + str(bucket - 1), now % self.window
+
+    def check(self, ident):
+        """
+        Seconds to wait if ``ident`` is over the limit, else None.
+
+        Read-only apart from the throttled-request metric: use it to reject
+        early and ``hit()`` to count the request.
+        """
+        now = time.time()
+        current, previous, elapsed = self._keys(ident, now)
+        counts = cache.get_many([current, previous])
+        weight = (self.window - elapsed) / self.window
+        estimate = counts.get(current, 0) + counts.get(previous, 0) * weight
+        if estimate < self.limit:
+            return None
+        record_throttled(self.scope)
+        return max(1, int(self.window - elapsed))
+
+    def hit(self, ident):
+        """Count one request for ``ident``."""
+        current, _previous, _elapsed = self._keys(ident, time.time())
+        # Garder la fenêtre courante assez longtemps pour servir de précédente
+        if not cache.add(current, 1, self.window * 2):
+            try:
+                cache.incr(current)
+            except ValueError:
+                # Expired between add() and incr()
+                cache.add(current, 1, self.window * 2)
+
+    def consume(self, ident):
+        """Check then count; returns the wait in seconds if rejected, else None."""
+        wait = self.check(ident)
+        if wait is None:
+            self.hit(ident)
+        return wait
+
+
+def client_ip(request):
+    """
+    Client address, taking ``RATELIMIT_PROXY_COUNT`` trusted proxies into account.
+
+    With N proxies in front of the app, the client is the N-th address from
+    the right of X-Forwarded-For; anything further left is client-supplied.
+    """
+    proxies = settings.RATELIMIT_PROXY_COUNT
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        if len(addresses) >= proxies:
+            return addresses[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def hashed(value):
+    """Short stable hash, to keep e-mail addresses out of cache keys."""
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:32]
+
+
+def throttled_response(wait, message='Too many requests. Please try again later.'):
+    response = JsonResponse({'error': message, 'retry_after': wait}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+class RateLimitMiddleware:
+    """
+    Per-IP limits by path prefix (``RATELIMIT_PATH_SCOPES``).
+
+    Placed before session and authentication middleware: a rejected request
+    never touches the database.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.rules = [
+            (prefix, SlidingWindowLimiter.for_scope(f'ip_{scope}'))
+            for prefix, scope in settings.RATELIMIT_PATH_SCOPES
+        ]
+
+    def limiter_for(self, request):
+        """Limiter of the first rule matching the path, if any."""
+        if settings.RATELIMIT_ENABLED and request.method != 'OPTIONS':
+            for prefix, limiter in self.rules:
+                if limiter is not None and request.path.startswith(prefix):
+                    return limiter
+        return None
+
+    def check(self, limiter, request):
+        """Count the request; return a 429 response if over budget."""
+        wait = limiter.consume(client_ip(request))
+        if wait is not None:
+            logger.warning(
+                "Rate limit %s exceeded by %s on %s",
+                limiter.scope, client_ip(request), request.path
+            )
+            return throttled_response(wait)
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        limiter = self.limiter_for(request)
+        if limiter is not None:
+            rejected = self.check(limiter, request)
+            if rejected is not None:
+                return rejected
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        limiter = self.limiter_for(request)
+        if limiter is not None:
+            # Le cache est synchrone : un aller-retour de thread seulement si une règle s'applique
+            rejected = await sync_to_async(self.check)(limiter, request)
+            if rejected is not None:
+                return rejected
+        return await self.get_response(request)
+
+
+class ScopedThrottle(BaseThrottle):
+    """
+    DRF throttle using the sliding-window limiter.
+
+    The scope is the view's ``throttle_scope`` if set, else the class
+    ``scope`` (``user`` by default). Authenticated requests are counted per
+    user, anonymous ones per IP.
+    """
+
+    scope = 'user'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        if not settings.RATELIMIT_ENABLED:
+            return True
+        scope = getattr(view, 'throttle_scope', None) or self.scope
+        limiter = SlidingWindowLimiter.for_scope(scope)
+        if limiter is None:
+            return True
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            ident = f'user:{user.pk}'
+        else:
+            ident = f'ip:{client_ip(request)}'
+
+        self.wait_seconds = limiter.consume(ident)
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AuthThrottle(ScopedThrottle):
+    """Budget for login and registration."""
+    scope = 'auth'
+
+
+class CheckoutThrottle(ScopedThrottle):
+    """Budget for order creation."""
+    scope = 'checkout'
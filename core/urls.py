@@ -9,6 +9,8 @@ from django.http import JsonResponse
 from django.shortcuts import render
 import django
 
+from core.metrics import metrics_view
+
 
 def home_view(request):
     """Vue d'accueil avec informations API GreenCart."""
@@ -35,6 +37,9 @@ urlpatterns = [
     path('api/', include('api.urls', namespace='api')),  # API principale
 ]
 
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path(settings.METRICS_PATH, metrics_view, name='metrics'))
+
 # Servir les fichiers statiques et média
 # En production, WhiteNoise gère les static files automatiquement
 # On ajoute les media files pour tous les environnements
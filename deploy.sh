@@ -1,30 +1,43 @@
 #!/bin/bash
 # Deployment script for GreenCart API
+#
+#   ./deploy.sh release   # once per deploy: checks + migrations (advisory lock)
+#   ./deploy.sh web       # serving process (default)
+#   ./deploy.sh start     # release, then web: for hosts without a release hook
+#                         # (Render free plan); concurrent starts wait on the lock
+#
+# Static files and the OpenAPI schema are built with the image (see Dockerfile).
 
 set -e  # Exit on error
 
-echo "🚀 Starting GreenCart API deployment..."
-
-# Run database migrations
-echo "📦 Running database migrations..."
-python manage.py migrate --noinput
-
-# Collect static files
-echo "📁 Collecting static files..."
-python manage.py collectstatic --noinput --clear
-
-# Create test data (only if not in production with real data)
-if [ "${POPULATE_TEST_DATA:-true}" = "true" ]; then
-    echo "🌱 Creating test data..."
-    python create_test_data.py || echo "⚠️ Test data creation failed or data already exists"
-fi
-
-# Create tokens for existing users
-echo "🔑 Creating auth tokens..."
-python fix_swagger_auth.py || echo "ℹ️ Token creation completed"
-
-echo "✅ Deployment completed successfully!"
-
-# Start the application
-echo "🌐 Starting Gunicorn server..."
-exec gunicorn --bind 0.0.0.0:${PORT:-8000} --workers ${WORKERS:-3} --timeout 120 core.wsgi:application
\ No newline at end of file
+release() {
+    echo "📦 Running release phase..."
+    if [ "${POPULATE_TEST_DATA:-false}" = "true" ]; then
+        # Refusé par la commande si DEBUG n'est pas activé
+        python manage.py release --test-data
+    else
+        python manage.py release
+    fi
+}
+
+web() {
+    echo "🌐 Starting Gunicorn server (${SERVER_MODE:-wsgi})..."
+    exec gunicorn -c gunicorn.conf.py
+}
+
+case "${1:-web}" in
+    release)
+        release
+        ;;
+    web)
+        web
+        ;;
+    start)
+        release
+        web
+        ;;
+    *)
+        echo "Usage: $0 [release|web|start]" >&2
+        exit 2
+        ;;
+esac
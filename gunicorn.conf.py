@@ -0,0 +1,54 @@
+"""
+Gunicorn configuration for GreenCart API.
+
+``SERVER_MODE`` selects how requests are served:
+
+- ``wsgi`` (default): sync workers running ``core.wsgi``; async views run
+  through ``async_to_sync``;
+- ``asgi``: uvicorn workers running ``core.asgi``; async views (catalog,
+  cart, order detail) are awaited on the event loop and sync views run in
+  a thread.
+
+Prometheus metrics (core/metrics.py) are written by every worker to
+``PROMETHEUS_MULTIPROC_DIR`` and aggregated on scrape; the directory is
+emptied when gunicorn loads this file and the files of dead workers are marked.
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+"""
+import os
+import shutil
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WORKERS', '3'))
+timeout = int(os.environ.get('TIMEOUT', '120'))
+# Django est importé une fois dans le master, les workers démarrent par fork
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() == 'true'
+accesslog = '-'
+errorlog = '-'
+
+# Défini avant le chargement de l'application : prometheus_client le lit à l'import
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/greencart-metrics'
+)
+# Vidé ici et non dans on_starting : avec preload_app, l'application et ses
+# compteurs sont chargés avant ce hook. Les échantillons d'un démarrage
+# précédent fausseraient les compteurs.
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+if SERVER_MODE == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    wsgi_app = 'core.asgi:application'
+elif SERVER_MODE == 'wsgi':
+    wsgi_app = 'core.wsgi:application'
+else:
+    raise ValueError(f"SERVER_MODE must be 'wsgi' or 'asgi', not {SERVER_MODE!r}")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
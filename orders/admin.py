@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Order, OrderItem, OrderStatusHistory
+from .models import Order, OrderItem, OrderStatusHistory, SubOrder
+
+
+class SubOrderInline(admin.TabularInline):
+    model = SubOrder
+    extra = 0
+    raw_id_fields = ['producer']
+    readonly_fields = ['subtotal', 'total_items']
 
 
 class OrderItemInline(admin.TabularInline):
@@ -11,7 +18,7 @@ class OrderItemInline(admin.TabularInline):
 class OrderStatusHistoryInline(admin.TabularInline):
     model = OrderStatusHistory
     extra = 0
-    raw_id_fields = ['changed_by']
+    raw_id_fields = ['changed_by', 'sub_order']
 
 
 @admin.register(Order)
@@ -29,7 +36,7 @@ class OrderAdmin(admin.ModelAdmin):
         'consumer__first_name', 'consumer__last_name'
     ]
     raw_id_fields = ['consumer']
-    inlines = [OrderItemInline, OrderStatusHistoryInline]
+    inlines = [SubOrderInline, OrderItemInline, OrderStatusHistoryInline]
     
     fieldsets = (
         ('Informations de base', {
@@ -61,6 +68,20 @@ class OrderAdmin(admin.ModelAdmin):
     total_amount_display.short_description = 'Total'
 
 
+@admin.register(SubOrder)
+class SubOrderAdmin(admin.ModelAdmin):
+    list_display = [
+        'order', 'producer', 'status', 'subtotal',
+        'total_items', 'created_at'
+    ]
+    list_filter = ['status', 'producer__region', 'created_at']
+    search_fields = [
+        'order__order_number', 'producer__business_name'
+    ]
+    raw_id_fields = ['order', 'producer']
+    readonly_fields = ['subtotal', 'total_items', 'created_at', 'updated_at']
+
+
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = [
@@ -89,4 +110,4 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
         'order__order_number', 'changed_by__email',
         'reason'
     ]
-    raw_id_fields = ['order', 'changed_by']
\ No newline at end of file
+    raw_id_fields = ['order', 'sub_order', 'changed_by']
\ No newline at end of file
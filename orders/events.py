@@ -0,0 +1,100 @@
+"""
+Outbox events published by the orders app.
+
+Publishers are called inside the order transactions; the handlers below
+run later in the ``process_outbox`` worker.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+
+from api.outbox import publish
+
+from .models import Order
+
+User = get_user_model()
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_CANCELLED = 'order.cancelled'
+
+
+def _order_payload(order):
+    return {
+        'order_number': order.order_number,
+        'consumer_id': order.consumer_id,
+        'status': order.status,
+        'total_amount': order.total_amount,
+    }
+
+
+def publish_order_created(order, sub_orders):
+    """Record that an order was placed, with its per-producer split."""
+    payload = _order_payload(order)
+    payload['sub_orders'] = [
+        {
+            'producer_id': sub_order.producer_id,
+            'subtotal': sub_order.subtotal,
+            'total_items': sub_order.total_items,
+        }
+        for sub_order in sub_orders
+    ]
+    return publish(ORDER_CREATED, order, payload)
+
+
+def publish_status_changed(order, sub_order, old_status, changed_by=None, reason=''):
+    """Record a producer's sub-order status change."""
+    payload = _order_payload(order)
+    payload.update({
+        'producer_id': sub_order.producer_id,
+        'sub_order_id': sub_order.pk,
+        'old_status': old_status,
+        'new_status': sub_order.status,
+        'changed_by_id': getattr(changed_by, 'pk', None),
+        'reason': reason,
+    })
+    return publish(ORDER_STATUS_CHANGED, order, payload)
+
+
+def publish_order_cancelled(order, changed_by=None, reason=''):
+    """Record that an order was cancelled."""
+    payload = _order_payload(order)
+    payload.update({
+        'changed_by_id': getattr(changed_by, 'pk', None),
+        'reason': reason,
+    })
+    return publish(ORDER_CANCELLED, order, payload)
+
+
+NOTIFICATION_SUBJECTS = {
+    ORDER_CREATED: "Votre commande {order_number} est enregistrée",
+    ORDER_STATUS_CHANGED: "Votre commande {order_number} : {status}",
+    ORDER_CANCELLED: "Votre commande {order_number} est annulée",
+}
+
+
+def notify_consumer(event):
+    """
+    Outbox handler: email the consumer about their order.
+
+    A failed send raises, so the event is retried. Once sent, the handler
+    is marked completed and other handlers' failures do not send it again;
+    only a worker crash between the send and the save can repeat it.
+    """
+    subject = NOTIFICATION_SUBJECTS.get(event.event_type)
+    payload = event.payload
+    consumer = User.objects.filter(pk=payload.get('consumer_id'), is_active=True).first()
+    if subject is None or consumer is None or not consumer.email:
+        return
+
+    status = payload.get('new_status') or payload.get('status')
+    subject = subject.format(
+        order_number=payload.get('order_number'),
+        status=dict(Order.STATUS_CHOICES).get(status, status),
+    )
+    lines = [f"Bonjour {consumer.get_full_name() or consumer.username},", "", f"{subject}."]
+    if payload.get('reason'):
+        lines.append(f"Motif : {payload['reason']}")
+    lines += ["", "L'équipe GreenCart"]
+
+    send_mail(subject, "\n".join(lines), settings.DEFAULT_FROM_EMAIL, [consumer.email])
@@ -0,0 +1,185 @@
+"""
+Streaming exports of orders and order items in GreenCart.
+
+Rows are read with ``iterator(chunk_size=...)`` (server-side cursors on
+PostgreSQL) and written out in chunks of ``EXPORT_LINES_PER_CHUNK`` lines,
+so memory usage stays flat whatever the size of the order history.
+
+Behind PgBouncer in transaction mode (``DB_POOL_MODE=external``) server-side
+cursors are disabled and ``iterator()`` would read the whole result at once.
+Rows are then read by keyset pagination instead: one query per
+``EXPORT_CHUNK_SIZE`` rows, each resuming after the last row of the previous
+one on the export ordering. Memory stays flat; the export is no longer one
+snapshot, so rows changed while it runs may show their new values.
+"""
+import csv
+import itertools
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from accounts.roles import get_producer
+
+from .models import Order, OrderItem
+
+# Nombre de lignes lues par aller-retour avec la base
+EXPORT_CHUNK_SIZE = 2000
+
+# Ordres d'export : uniques, la pagination par clé reprend après la dernière ligne
+ORDER_EXPORT_ORDERING = ['order_date', 'id']
+ORDER_ITEM_EXPORT_ORDERING = ['order__order_date', 'order_id', 'created_at', 'id']
+# Lignes par morceau envoyé (un passage de thread par morceau sous ASGI)
+EXPORT_LINES_PER_CHUNK = 200
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+ORDER_EXPORT_FIELDS = [
+    'id', 'order_number', 'status', 'order_date', 'consumer__email',
+    'delivery_city', 'delivery_postal_code', 'delivery_date',
+    'total_amount', 'confirmed_at', 'shipped_at', 'delivered_at',
+]
+
+ORDER_ITEM_EXPORT_FIELDS = [
+    'id', 'order__order_number', 'order__status', 'order__order_date',
+    'producer__business_name', 'product__name', 'quantity',
+    'unit_price', 'total_price',
+]
+
+
+class ExportFilterError(ValueError):
+    """Raised when export filters cannot be parsed."""
+
+
+def filter_orders(queryset, status=None, date_from=None, date_to=None, prefix=''):
+    """
+    Apply status and date-range filters to an Order or OrderItem queryset.
+
+    Dates are ISO strings (YYYY-MM-DD) and both bounds are inclusive.
+    ``prefix`` is the lookup path to the order ('order__' for items).
+    """
+    if status:
+        status = status.upper()
+        if status not in dict(Order.STATUS_CHOICES):
+            raise ExportFilterError(f"Unknown status '{status}'.")
+        queryset = queryset.filter(**{f'{prefix}status': status})
+
+    # Bornes converties en datetimes pour profiter de l'index sur order_date
+    for value, lookup, offset in ((date_from, 'gte', 0), (date_to, 'lt', 1)):
+        if not value:
+            continue
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ExportFilterError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+        bound = timezone.make_aware(
+            datetime.combine(parsed + timedelta(days=offset), time.min)
+        )
+        queryset = queryset.filter(**{f'{prefix}order_date__{lookup}': bound})
+
+    return queryset
+
+
+def after(ordering, values):
+    """Rows strictly after ``values`` on ``ordering`` (a lexicographic comparison)."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        condition |= Q(**dict(zip(ordering[:index], values)), **{f'{field}__gt': values[index]})
+    return condition
+
+
+def keyset_rows(queryset, ordering, fields):
+    """``values(*fields)`` in ``ordering`` order, one query per ``EXPORT_CHUNK_SIZE`` rows."""
+    keys = [field for field in ordering if field not in fields]
+    queryset = queryset.order_by(*ordering).values(*fields, *keys)
+    page = queryset
+    while page is not None:
+        rows = list(page[:EXPORT_CHUNK_SIZE])
+        if len(rows) == EXPORT_CHUNK_SIZE:
+            page = queryset.filter(after(ordering, [rows[-1][field] for field in ordering]))
+        else:
+            page = None
+        for row in rows:
+            for key in keys:
+                del row[key]
+            yield row
+
+
+def export_rows(queryset, ordering, fields):
+    """Stream ``values(*fields)`` rows with the best method for the connection."""
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        return keyset_rows(queryset, ordering, fields)
+    return queryset.order_by(*ordering).values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_order_rows(queryset):
+    """Yield one dict per order, without instantiating model objects."""
+    return export_rows(queryset, ORDER_EXPORT_ORDERING, ORDER_EXPORT_FIELDS)
+
+
+def export_order_item_rows(queryset):
+    """Yield one dict per order item, without instantiating model objects."""
+    return export_rows(queryset, ORDER_ITEM_EXPORT_ORDERING, ORDER_ITEM_EXPORT_FIELDS)
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, fieldnames):
+    """Yield CSV lines (header first) for an iterable of dicts."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fieldnames)
+    for row in rows:
+        yield writer.writerow([
+            '' if row[field] is None else row[field] for field in fieldnames
+        ])
+
+
+def stream_ndjson(rows):
+    """Yield one JSON document per line for an iterable of dicts."""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def chunked(lines, size=EXPORT_LINES_PER_CHUNK):
+    """Join ``lines`` into strings of up to ``size`` lines."""
+    lines = iter(lines)
+    while chunk := ''.join(itertools.islice(lines, size)):
+        yield chunk
+
+
+def stream_export(rows, fieldnames, export_format):
+    """Return the chunk generator for the requested export format."""
+    if export_format == 'csv':
+        return chunked(stream_csv(rows, fieldnames))
+    return chunked(stream_ndjson(rows))
+
+
+def orders_for_user(user):
+    """Orders visible to a user: all for staff, own sub-orders for producers, own orders otherwise."""
+    if user.is_staff or user.is_superuser:
+        return Order.objects.all()
+    producer = get_producer(user)
+    if producer is not None:
+        return Order.objects.filter(sub_orders__producer=producer)
+    return Order.objects.filter(consumer=user)
+
+
+def order_items_for_user(user):
+    """Order items visible to a user, following the same rules as orders_for_user."""
+    if user.is_staff or user.is_superuser:
+        return OrderItem.objects.all()
+    producer = get_producer(user)
+    if producer is not None:
+        return OrderItem.objects.filter(producer=producer)
+    return OrderItem.objects.filter(order__consumer=user)
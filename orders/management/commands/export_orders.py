@@ -0,0 +1,78 @@
+"""
+Export orders or order items to CSV/NDJSON without loading the history in memory.
+
+Usage:
+    python manage.py export_orders --format csv --output orders.csv
+    python manage.py export_orders --items --producer 12 --status DELIVERED \
+        --date-from 2025-01-01 --date-to 2025-12-31
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Producer
+from orders.exports import (
+    EXPORT_FORMATS,
+    ORDER_EXPORT_FIELDS,
+    ORDER_ITEM_EXPORT_FIELDS,
+    ExportFilterError,
+    export_order_item_rows,
+    export_order_rows,
+    filter_orders,
+    stream_export,
+)
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = "Stream orders (or order items) to CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', action='store_true', help='Export order lines instead of orders')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--status', help='Only orders with this status')
+        parser.add_argument('--date-from', help='Orders placed on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--date-to', help='Orders placed on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--producer', type=int, help='Restrict to one producer (id)')
+        parser.add_argument('--output', help='Output file (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        if options['producer'] and not Producer.objects.filter(pk=options['producer']).exists():
+            raise CommandError(f"Producer {options['producer']} does not exist.")
+
+        if options['items']:
+            queryset = OrderItem.objects.all()
+            if options['producer']:
+                queryset = queryset.filter(producer_id=options['producer'])
+            row_factory, fieldnames, prefix = export_order_item_rows, ORDER_ITEM_EXPORT_FIELDS, 'order__'
+        else:
+            queryset = Order.objects.all()
+            if options['producer']:
+                queryset = queryset.filter(sub_orders__producer_id=options['producer'])
+            row_factory, fieldnames, prefix = export_order_rows, ORDER_EXPORT_FIELDS, ''
+
+        try:
+            queryset = filter_orders(
+                queryset,
+                status=options['status'],
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                prefix=prefix,
+            )
+        except ExportFilterError as exc:
+            raise CommandError(str(exc))
+
+        lines = stream_export(row_factory(queryset), fieldnames, options['format'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                count = self._write(lines, output)
+            self.stderr.write(self.style.SUCCESS(f"✅ {count} lines written to {options['output']}"))
+        else:
+            self._write(lines, sys.stdout)
+
+    def _write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
@@ -0,0 +1,179 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:05
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def create_sub_orders(apps, schema_editor):
+    """Create one sub-order per (order, producer) for existing orders."""
+    OrderItem = apps.get_model("orders", "OrderItem")
+    SubOrder = apps.get_model("orders", "SubOrder")
+
+    rows = (
+        OrderItem.objects.order_by()
+        .values(
+            "order_id",
+            "producer_id",
+            "order__status",
+            "order__confirmed_at",
+            "order__shipped_at",
+            "order__delivered_at",
+        )
+        .annotate(subtotal=Sum("total_price"), total_items=Sum("quantity"))
+    )
+
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(
+            SubOrder(
+                order_id=row["order_id"],
+                producer_id=row["producer_id"],
+                status=row["order__status"],
+                subtotal=row["subtotal"],
+                total_items=row["total_items"],
+                confirmed_at=row["order__confirmed_at"],
+                shipped_at=row["order__shipped_at"],
+                delivered_at=row["order__delivered_at"],
+            )
+        )
+        if len(batch) >= 2000:
+            SubOrder.objects.bulk_create(batch)
+            batch = []
+    SubOrder.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_create_default_superuser"),
+        ("orders", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubOrder",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("CONFIRMED", "Confirmée"),
+                            ("CANCELLED", "Annulée"),
+                            ("SHIPPED", "Expédiée"),
+                            ("DELIVERED", "Livrée"),
+                        ],
+                        default="PENDING",
+                        help_text="Statut de la sous-commande chez ce producteur",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "subtotal",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Montant des articles de ce producteur",
+                        max_digits=10,
+                        validators=[django.core.validators.MinValueValidator(0)],
+                        verbose_name="Sous-total",
+                    ),
+                ),
+                (
+                    "total_items",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Quantité totale commandée chez ce producteur",
+                        verbose_name="Nombre d'articles",
+                    ),
+                ),
+                (
+                    "confirmed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Confirmée le"
+                    ),
+                ),
+                (
+                    "shipped_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Expédiée le"
+                    ),
+                ),
+                (
+                    "delivered_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Livrée le"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sub_orders",
+                        to="orders.order",
+                        verbose_name="Commande",
+                    ),
+                ),
+                (
+                    "producer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sub_orders",
+                        to="accounts.producer",
+                        verbose_name="Producteur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sous-commande",
+                "verbose_name_plural": "Sous-commandes",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="orderstatushistory",
+            name="sub_order",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Renseigné quand le changement concerne un seul producteur",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="status_history",
+                to="orders.suborder",
+                verbose_name="Sous-commande",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="suborder",
+            index=models.Index(
+                fields=["producer", "-created_at"],
+                name="orders_subo_produce_bc8c9f_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="suborder",
+            index=models.Index(
+                fields=["producer", "status"], name="orders_subo_produce_b35f54_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="suborder",
+            constraint=models.UniqueConstraint(
+                fields=("order", "producer"), name="unique_sub_order_per_producer"
+            ),
+        ),
+        migrations.RunPython(create_sub_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:53
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_sub_orders"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                models.OrderBy(
+                    django.db.models.functions.text.Length("order_number"),
+                    descending=True,
+                ),
+                models.OrderBy(models.F("order_number"), descending=True),
+                name="orders_order_number_seq_idx",
+            ),
+        ),
+    ]
@@ -2,10 +2,12 @@
 Models for orders management in GreenCart.
 """
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Length
 from django.core.validators import MinValueValidator
 from django.conf import settings
 from django.utils import timezone
+from core.db import RetryableConflict
 from products.models import Product
 from accounts.models import Producer
 
@@ -24,6 +26,28 @@ class Order(models.Model):
         ('DELIVERED', 'Livrée'),
     ]
     
+    # Statuts à partir desquels une annulation est possible
+    CANCELLABLE_STATUSES = ['PENDING', 'CONFIRMED']
+    
+    # Transitions de statut autorisées
+    STATUS_TRANSITIONS = {
+        'PENDING': ['CONFIRMED', 'CANCELLED'],
+        'CONFIRMED': ['SHIPPED', 'CANCELLED'],
+        'SHIPPED': ['DELIVERED'],
+        'CANCELLED': [],  # Cannot change from cancelled
+        'DELIVERED': []   # Cannot change from delivered
+    }
+    
+    # Champ de date renseigné à l'entrée dans chaque statut
+    STATUS_TIMESTAMP_FIELDS = {
+        'CONFIRMED': 'confirmed_at',
+        'SHIPPED': 'shipped_at',
+        'DELIVERED': 'delivered_at',
+    }
+    
+    # Ordre d'avancement utilisé pour dériver le statut depuis les sous-commandes
+    STATUS_PROGRESS = ['PENDING', 'CONFIRMED', 'SHIPPED', 'DELIVERED']
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # Numéro de commande lisible
@@ -134,33 +158,59 @@ class Order(models.Model):
             models.Index(fields=['consumer', '-order_date']),
             models.Index(fields=['status']),
             models.Index(fields=['order_date']),
+            # Dernier numéro de l'année : les numéros s'allongent après 999
+            models.Index(
+                Length('order_number').desc(), models.F('order_number').desc(),
+                name='orders_order_number_seq_idx'
+            ),
         ]
     
     def __str__(self):
         return f"Commande {self.order_number or self.id} - {self.consumer.email}"
     
+    def _next_order_number(self):
+        """Format: GC2024001 (GreenCart + année + numéro séquentiel)."""
+        prefix = f'GC{timezone.now().year}'
+        # GC20261000 suit GC2026999 : trier par longueur avant l'ordre alphabétique
+        last_order = Order.objects.filter(
+            order_number__startswith=prefix
+        ).order_by(Length('order_number').desc(), '-order_number').first()
+        
+        if last_order and last_order.order_number:
+            last_num = int(last_order.order_number[len(prefix):])
+            new_num = last_num + 1
+        else:
+            new_num = 1
+        
+        return f'{prefix}{new_num:03d}'
+    
     def save(self, *args, **kwargs):
         # Générer un numéro de commande si pas présent
-        if not self.order_number:
-            # Format: GC2024001 (GreenCart + année + numéro séquentiel)
-            year = timezone.now().year
-            last_order = Order.objects.filter(
-                order_number__startswith=f'GC{year}'
-            ).order_by('-order_number').first()
-            
-            if last_order and last_order.order_number:
-                last_num = int(last_order.order_number[-3:])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            
-            self.order_number = f'GC{year}{new_num:03d}'
+        if self.order_number:
+            return super().save(*args, **kwargs)
         
-        super().save(*args, **kwargs)
+        # Two concurrent checkouts can read the same last number. The loser
+        # hits the unique constraint; its snapshot cannot see the winner's
+        # row, so the whole transaction is replayed (atomic_with_retry)
+        # rather than picking another number here.
+        self.order_number = self._next_order_number()
+        try:
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            self.order_number = ''
+            if 'order_number' in str(exc):
+                raise RetryableConflict(str(exc)) from exc
+            raise
+    
+    def _items_prefetched(self):
+        return 'items' in getattr(self, '_prefetched_objects_cache', {})
     
     @property
     def total_items(self):
         """Retourne le nombre total d'articles dans la commande."""
+        if self._items_prefetched():
+            return sum(item.quantity for item in self.items.all())
         return self.items.aggregate(
             total=models.Sum('quantity')
         )['total'] or 0
@@ -168,6 +218,10 @@ class Order(models.Model):
     @property
     def producers_involved(self):
         """Retourne la liste des producteurs impliqués dans cette commande."""
+        if self._items_prefetched():
+            # Lignes préchargées avec leur producteur : pas de requête
+            producers = {item.producer_id: item.producer for item in self.items.all()}
+            return list(producers.values())
         return Producer.objects.filter(
             id__in=self.items.values_list('producer_id', flat=True).distinct()
         )
@@ -175,35 +229,261 @@ class Order(models.Model):
     @property
     def can_be_cancelled(self):
         """Vérifie si la commande peut être annulée."""
-        return self.status in ['PENDING', 'CONFIRMED']
+        return self.status in self.CANCELLABLE_STATUSES
     
     @property
     def is_completed(self):
         """Vérifie si la commande est terminée."""
         return self.status in ['DELIVERED', 'CANCELLED']
     
-    def cancel(self):
-        """Annule la commande et remet les stocks."""
-        if self.can_be_cancelled:
-            # Remettre les stocks
-            for item in self.items.all():
-                item.product.increase_stock(item.quantity)
+    @classmethod
+    def derive_status(cls, statuses):
+        """
+        Derive the order status from its sub-order statuses.
+
+        Cancelled sub-orders are ignored unless all of them are cancelled;
+        otherwise the order is as advanced as its least advanced sub-order.
+        """
+        active = [status for status in statuses if status != 'CANCELLED']
+        if not active:
+            return 'CANCELLED' if statuses else None
+        return min(active, key=cls.STATUS_PROGRESS.index)
+    
+    def refresh_status(self, changed_by=None, reason=''):
+        """
+        Recompute the order status from its sub-orders.
+
+        The order row is only written when the derived status actually
+        changes, so producers updating their own sub-orders rarely contend
+        on the shared order row.
+        """
+        with transaction.atomic():
+            old_status = Order.objects.select_for_update().values_list(
+                'status', flat=True
+            ).get(pk=self.pk)
+            new_status = self.derive_status(
+                list(self.sub_orders.values_list('status', flat=True))
+            )
+            self.status = old_status
+            if new_status is None or new_status == old_status:
+                return False
+            
+            now = timezone.now()
+            changes = {'status': new_status, 'updated_at': now}
+            timestamp_field = self.STATUS_TIMESTAMP_FIELDS.get(new_status)
+            if timestamp_field:
+                changes[timestamp_field] = now
+            Order.objects.filter(pk=self.pk).update(**changes)
+            for field, value in changes.items():
+                setattr(self, field, value)
+            
+            if changed_by is not None:
+                OrderStatusHistory.objects.create(
+                    order=self,
+                    old_status=old_status,
+                    new_status=new_status,
+                    changed_by=changed_by,
+                    reason=reason
+                )
+        return True
+    
+    def cancel(self, changed_by=None, reason=''):
+        """
+        Annule la commande et remet les stocks.
+
+        The order row and its sub-orders are locked before their status is
+        checked, so a concurrent cancellation cannot restore the stock twice.
+        Stock for every line is restored with one set-based UPDATE instead of
+        one save per product.
+        """
+        with transaction.atomic():
+            old_status = Order.objects.select_for_update().values_list(
+                'status', flat=True
+            ).get(pk=self.pk)
+            self.status = old_status
+            if old_status not in self.CANCELLABLE_STATUSES:
+                return False
+            
+            # Une sous-commande déjà expédiée empêche l'annulation globale
+            sub_orders = list(
+                self.sub_orders.select_for_update().exclude(status='CANCELLED')
+            )
+            if any(sub.status not in self.CANCELLABLE_STATUSES for sub in sub_orders):
+                return False
             
+            # Remettre les stocks (une seule requête pour toutes les lignes)
+            items = self.items.all()
+            if sub_orders:
+                items = items.filter(
+                    producer_id__in=[sub.producer_id for sub in sub_orders]
+                )
+            restore_stock(items)
+            
+            now = timezone.now()
+            SubOrder.objects.filter(pk__in=[sub.pk for sub in sub_orders]).update(
+                status='CANCELLED',
+                updated_at=now
+            )
             self.status = 'CANCELLED'
-            self.save(update_fields=['status'])
-            return True
-        return False
+            self.updated_at = now
+            Order.objects.filter(pk=self.pk).update(
+                status=self.status,
+                updated_at=self.updated_at
+            )
+            
+            if changed_by is not None:
+                OrderStatusHistory.objects.create(
+                    order=self,
+                    old_status=old_status,
+                    new_status='CANCELLED',
+                    changed_by=changed_by,
+                    reason=reason
+                )
+        return True
     
     def confirm(self):
-        """Confirme la commande."""
+        """Confirme la commande et toutes ses sous-commandes en attente."""
         if self.status == 'PENDING':
             self.status = 'CONFIRMED'
             self.confirmed_at = timezone.now()
             self.save(update_fields=['status', 'confirmed_at'])
+            self.sub_orders.filter(status='PENDING').update(
+                status='CONFIRMED',
+                confirmed_at=self.confirmed_at,
+                updated_at=self.confirmed_at
+            )
             return True
         return False
 
 
+def restore_stock(items):
+    """Put the quantities of an OrderItem queryset back in stock, in one UPDATE."""
+    quantities = dict(
+        items.order_by().values('product_id').annotate(
+            total=models.Sum('quantity')
+        ).values_list('product_id', 'total')
+    )
+    return Product.increase_stock_bulk(quantities)
+
+
+class SubOrder(models.Model):
+    """
+    Part of an order fulfilled by a single producer.
+
+    Created at checkout for each (order, producer) pair. Producers move their
+    own sub-order through the status workflow; the parent order status is
+    derived from its sub-orders.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='sub_orders',
+        verbose_name='Commande'
+    )
+    
+    producer = models.ForeignKey(
+        Producer,
+        on_delete=models.CASCADE,
+        related_name='sub_orders',
+        verbose_name='Producteur'
+    )
+    
+    status = models.CharField(
+        'Statut',
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        default='PENDING',
+        help_text='Statut de la sous-commande chez ce producteur'
+    )
+    
+    subtotal = models.DecimalField(
+        'Sous-total',
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        help_text='Montant des articles de ce producteur'
+    )
+    
+    total_items = models.PositiveIntegerField(
+        'Nombre d\'articles',
+        default=0,
+        help_text='Quantité totale commandée chez ce producteur'
+    )
+    
+    confirmed_at = models.DateTimeField('Confirmée le', null=True, blank=True)
+    shipped_at = models.DateTimeField('Expédiée le', null=True, blank=True)
+    delivered_at = models.DateTimeField('Livrée le', null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Sous-commande'
+        verbose_name_plural = 'Sous-commandes'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'producer'],
+                name='unique_sub_order_per_producer'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['producer', '-created_at']),
+            models.Index(fields=['producer', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.order.order_number} - {self.producer.business_name}"
+    
+    @property
+    def items(self):
+        """Retourne les articles de la commande fournis par ce producteur."""
+        return OrderItem.objects.filter(order_id=self.order_id, producer_id=self.producer_id)
+    
+    def change_status(self, new_status, changed_by, reason=''):
+        """
+        Move this sub-order to a new status and re-derive the order status.
+
+        Cancelling a sub-order puts this producer's lines back in stock.
+        Returns False if the transition is no longer allowed.
+        """
+        with transaction.atomic():
+            old_status = SubOrder.objects.select_for_update().values_list(
+                'status', flat=True
+            ).get(pk=self.pk)
+            self.status = old_status
+            if new_status not in Order.STATUS_TRANSITIONS.get(old_status, []):
+                return False
+            
+            if new_status == 'CANCELLED':
+                restore_stock(self.items)
+            
+            self.status = new_status
+            update_fields = ['status', 'updated_at']
+            timestamp_field = Order.STATUS_TIMESTAMP_FIELDS.get(new_status)
+            if timestamp_field:
+                setattr(self, timestamp_field, timezone.now())
+                update_fields.append(timestamp_field)
+            self.save(update_fields=update_fields)
+            
+            OrderStatusHistory.objects.create(
+                order_id=self.order_id,
+                sub_order=self,
+                old_status=old_status,
+                new_status=new_status,
+                changed_by=changed_by,
+                reason=reason
+            )
+            
+            self.order.refresh_status(
+                changed_by=changed_by,
+                reason=f'Derived from {self.producer.business_name} sub-order'
+            )
+        return True
+
+
 class OrderItem(models.Model):
     """
     Individual item in an order.
@@ -301,6 +581,16 @@ class OrderStatusHistory(models.Model):
         choices=Order.STATUS_CHOICES
     )
     
+    sub_order = models.ForeignKey(
+        SubOrder,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='status_history',
+        verbose_name='Sous-commande',
+        help_text='Renseigné quand le changement concerne un seul producteur'
+    )
+    
     changed_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -1,12 +1,18 @@
 """
 Serializers for orders management in GreenCart.
 """
+from collections import defaultdict
+from decimal import Decimal
 from rest_framework import serializers
-from django.utils import timezone
 from django.db import transaction
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field
-from .models import Order, OrderItem, OrderStatusHistory
+from core.db import atomic_with_retry
+from core import metrics
+from .models import Order, OrderItem, OrderStatusHistory, SubOrder
+from . import events
 from products.serializers import ProductListSerializer
+from accounts.counters import increment_orders_count_on_commit
 from accounts.serializers import ProducerSerializer
 
 
@@ -36,12 +42,30 @@ class OrderStatusHistorySerializer(serializers.ModelSerializer):
         model = OrderStatusHistory
         fields = [
             'id', 'order', 'old_status', 'new_status',
-            'old_status_display', 'new_status_display',
+            'old_status_display', 'new_status_display', 'sub_order',
             'changed_by', 'changed_by_name', 'reason', 'changed_at'
         ]
         read_only_fields = ['id', 'changed_at']
 
 
+class SubOrderSerializer(serializers.ModelSerializer):
+    """Serializer for SubOrder model (one producer's part of an order)."""
+    
+    order_number = serializers.CharField(source='order.order_number', read_only=True)
+    producer_name = serializers.CharField(source='producer.business_name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = SubOrder
+        fields = [
+            'id', 'order', 'order_number', 'producer', 'producer_name',
+            'status', 'status_display', 'subtotal', 'total_items',
+            'confirmed_at', 'shipped_at', 'delivered_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for Order model."""
     
@@ -50,6 +74,7 @@ class OrderSerializer(serializers.ModelSerializer):
     status_history = OrderStatusHistorySerializer(many=True, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
     producers_involved = ProducerSerializer(many=True, read_only=True)
+    sub_orders = SubOrderSerializer(many=True, read_only=True)
     can_be_cancelled = serializers.BooleanField(read_only=True)
     is_completed = serializers.BooleanField(read_only=True)
     
@@ -61,7 +86,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'delivery_postal_code', 'delivery_date', 'order_date',
             'confirmed_at', 'shipped_at', 'delivered_at', 'notes',
             'consumer_notes', 'items', 'status_history', 'producers_involved',
-            'can_be_cancelled', 'is_completed', 'created_at', 'updated_at'
+            'sub_orders', 'can_be_cancelled', 'is_completed', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'order_number', 'consumer', 'total_amount', 'total_items',
@@ -113,11 +138,13 @@ class CreateOrderSerializer(serializers.Serializer):
         try:
             cart = request.user.cart
             if not cart.items.exists():
+                metrics.record_checkout_failure('empty_cart')
                 raise serializers.ValidationError("Cart is empty.")
             
             # Check that all items are still available
             for item in cart.items.all():
                 if not item.is_available():
+                    metrics.record_checkout_failure('unavailable')
                     raise serializers.ValidationError(
                         f"Product '{item.product.name}' is no longer available in requested quantity."
                     )
@@ -126,7 +153,7 @@ class CreateOrderSerializer(serializers.Serializer):
         
         return attrs
     
-    @transaction.atomic
+    @atomic_with_retry
     def create(self, validated_data):
         """Create order from cart."""
         request = self.context.get('request')
@@ -147,18 +174,35 @@ class CreateOrderSerializer(serializers.Serializer):
             status='PENDING'
         )
         
-        # Create order items from cart items
-        for cart_item in cart.items.all():
+        # Create order items from cart items, grouped per producer
+        sub_totals = defaultdict(lambda: {'subtotal': Decimal('0'), 'total_items': 0})
+        for cart_item in cart.items.select_related('product'):
+            # Reduce product stock (conditional update, fails if stock ran out
+            # since validation; the whole order is then rolled back)
+            if not cart_item.product.reduce_stock(cart_item.quantity):
+                metrics.record_checkout_failure('out_of_stock')
+                raise serializers.ValidationError(
+                    f"Product '{cart_item.product.name}' is no longer available in requested quantity."
+                )
+            
             OrderItem.objects.create(
                 order=order,
                 product=cart_item.product,
-                producer=cart_item.product.producer,
+                producer_id=cart_item.product.producer_id,
                 quantity=cart_item.quantity,
                 unit_price=cart_item.price_at_time
             )
             
-            # Reduce product stock
-            cart_item.product.reduce_stock(cart_item.quantity)
+            sub_total = sub_totals[cart_item.product.producer_id]
+            sub_total['subtotal'] += cart_item.total_price
+            sub_total['total_items'] += cart_item.quantity
+        
+        # One fulfilment sub-order per producer
+        sub_orders = SubOrder.objects.bulk_create([
+            SubOrder(order=order, producer_id=producer_id, **totals)
+            for producer_id, totals in sub_totals.items()
+        ])
+        increment_orders_count_on_commit(sub_totals)
         
         # Clear cart
         cart.clear()
@@ -172,70 +216,59 @@ class CreateOrderSerializer(serializers.Serializer):
             reason='Order created'
         )
         
+        events.publish_order_created(order, sub_orders)
+        transaction.on_commit(lambda: metrics.record_order_created(total_amount))
+        
         return order
 
 
 class UpdateOrderStatusSerializer(serializers.Serializer):
-    """Serializer for updating order status (producers only)."""
+    """
+    Serializer for updating order status (producers only).
+
+    Producers update their own sub-order; the order status is derived from
+    all of its sub-orders.
+    """
     
     status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
     reason = serializers.CharField(max_length=500, required=False, allow_blank=True)
     
     def validate(self, attrs):
         """Validate status transition."""
-        order = self.context.get('order')
+        sub_order = self.context.get('sub_order')
         new_status = attrs['status']
-        current_status = order.status
-        
-        # Define valid status transitions
-        valid_transitions = {
-            'PENDING': ['CONFIRMED', 'CANCELLED'],
-            'CONFIRMED': ['SHIPPED', 'CANCELLED'],
-            'SHIPPED': ['DELIVERED'],
-            'CANCELLED': [],  # Cannot change from cancelled
-            'DELIVERED': []   # Cannot change from delivered
-        }
+        current_status = sub_order.status
         
-        if new_status not in valid_transitions.get(current_status, []):
+        if new_status not in Order.STATUS_TRANSITIONS.get(current_status, []):
             raise serializers.ValidationError(
                 f"Cannot change status from {current_status} to {new_status}."
             )
         
         return attrs
     
-    @transaction.atomic
+    @atomic_with_retry
     def save(self):
-        """Update order status."""
+        """Update the producer's sub-order status."""
         order = self.context.get('order')
+        sub_order = self.context.get('sub_order')
         request = self.context.get('request')
         
-        old_status = order.status
         new_status = self.validated_data['status']
         reason = self.validated_data.get('reason', '')
+        # Re-read inside the transaction: this may be a retry
+        sub_order.refresh_from_db(fields=['status'])
+        old_status = sub_order.status
         
-        # Update order status
-        order.status = new_status
-        
-        # Update timestamp fields
-        now = timezone.now()
-        if new_status == 'CONFIRMED':
-            order.confirmed_at = now
-        elif new_status == 'SHIPPED':
-            order.shipped_at = now
-        elif new_status == 'DELIVERED':
-            order.delivered_at = now
-        
-        order.save()
+        if not sub_order.change_status(new_status, changed_by=request.user, reason=reason):
+            raise serializers.ValidationError(
+                f"Cannot change status from {sub_order.status} to {new_status}."
+            )
         
-        # Create status history
-        OrderStatusHistory.objects.create(
-            order=order,
-            old_status=old_status,
-            new_status=new_status,
-            changed_by=request.user,
-            reason=reason
+        order.refresh_from_db()
+        events.publish_status_changed(
+            order, sub_order, old_status, changed_by=request.user, reason=reason
         )
-        
+        transaction.on_commit(lambda: metrics.record_status_change(new_status))
         return order
 
 
@@ -253,22 +286,17 @@ class CancelOrderSerializer(serializers.Serializer):
         
         return attrs
     
-    @transaction.atomic
+    @atomic_with_retry
     def save(self):
         """Cancel the order."""
         order = self.context.get('order')
         request = self.context.get('request')
         reason = self.validated_data.get('reason', 'Cancelled by customer')
         
-        # Cancel the order (this will restore stock)
-        if order.cancel():
-            # Create status history
-            OrderStatusHistory.objects.create(
-                order=order,
-                old_status='PENDING' if order.status == 'CANCELLED' else order.status,
-                new_status='CANCELLED',
-                changed_by=request.user,
-                reason=reason
-            )
+        # Cancel the order (restores stock and records the status history)
+        if not order.cancel(changed_by=request.user, reason=reason):
+            raise serializers.ValidationError("This order cannot be cancelled.")
         
+        events.publish_order_cancelled(order, changed_by=request.user, reason=reason)
+        transaction.on_commit(lambda: metrics.record_status_change('CANCELLED'))
         return order
\ No newline at end of file
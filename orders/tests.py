@@ -1 +1,299 @@
-# Tests will be implemented later
\ No newline at end of file
+"""
+Tests for order cancellation, stock restoration, exports and consumer
+notifications.
+
+The concurrent tests need row locks and serialization failures, so they
+only run on PostgreSQL (``TEST_DATABASE_URL``); they are skipped on SQLite.
+"""
+import gzip
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from django.core import mail
+from django.db import connections
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Producer, User
+from api import outbox
+from api.models import OutboxEvent
+from cart.models import Cart
+from core.db import atomic_with_retry
+from products.models import Category, Product
+
+from . import events, exports
+from .models import Order, OrderItem, SubOrder
+
+
+def make_user(name, user_type='CONSUMER'):
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='testpass123', user_type=user_type
+    )
+
+
+def make_producer(name):
+    return Producer.objects.create(
+        user=make_user(name, 'PRODUCER'), business_name=name.title(),
+        address='1 rue des Champs', city='Lyon', postal_code='69001', region='Auvergne-Rhône-Alpes',
+    )
+
+
+def make_product(producer, category, name, stock):
+    return Product.objects.create(
+        producer=producer, category=category, name=name, description=name,
+        price=Decimal('2.50'), quantity_available=stock,
+    )
+
+
+def make_order(consumer, lines):
+    """A PENDING order with one sub-order per producer; ``lines`` is ``[(product, quantity)]``."""
+    order = Order.objects.create(
+        consumer=consumer, total_amount=Decimal('0'), delivery_address='2 rue du Marché',
+        delivery_city='Lyon', delivery_postal_code='69002',
+    )
+    for product, quantity in lines:
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity, unit_price=product.price
+        )
+    for producer_id in {product.producer_id for product, _quantity in lines}:
+        SubOrder.objects.create(order=order, producer_id=producer_id, subtotal=Decimal('0'), total_items=0)
+    return order
+
+
+def stock(product):
+    return Product.objects.values_list('quantity_available', flat=True).get(pk=product.pk)
+
+
+class CatalogFixtureMixin:
+
+    def setUp(self):
+        self.consumer = make_user('consumer')
+        self.producer = make_producer('ferme')
+        self.other_producer = make_producer('verger')
+        self.category = Category.objects.create(name='Légumes')
+        self.carrots = make_product(self.producer, self.category, 'Carottes', 10)
+        self.apples = make_product(self.other_producer, self.category, 'Pommes', 10)
+
+
+class IncreaseStockBulkTests(CatalogFixtureMixin, TestCase):
+
+    def test_adds_each_quantity_in_one_query(self):
+        with self.assertNumQueries(1):
+            updated = Product.increase_stock_bulk({self.carrots.pk: 3, self.apples.pk: 5})
+        self.assertEqual(updated, 2)
+        self.assertEqual(stock(self.carrots), 13)
+        self.assertEqual(stock(self.apples), 15)
+
+    def test_leaves_other_products_alone(self):
+        Product.increase_stock_bulk({self.carrots.pk: 1})
+        self.assertEqual(stock(self.apples), 10)
+
+    def test_empty_mapping_runs_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(Product.increase_stock_bulk({}), 0)
+
+
+class CancelOrderTests(CatalogFixtureMixin, TestCase):
+
+    def test_restores_the_stock_of_every_line(self):
+        order = make_order(self.consumer, [(self.carrots, 2), (self.apples, 3)])
+        self.assertTrue(order.cancel(changed_by=self.consumer))
+        self.assertEqual(stock(self.carrots), 12)
+        self.assertEqual(stock(self.apples), 13)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'CANCELLED')
+        self.assertFalse(order.sub_orders.exclude(status='CANCELLED').exists())
+
+    def test_second_cancellation_does_not_restore_again(self):
+        order = make_order(self.consumer, [(self.carrots, 2)])
+        self.assertTrue(order.cancel())
+        self.assertFalse(Order.objects.get(pk=order.pk).cancel())
+        self.assertEqual(stock(self.carrots), 12)
+
+    def test_lines_of_cancelled_sub_orders_are_not_restored(self):
+        order = make_order(self.consumer, [(self.carrots, 2), (self.apples, 3)])
+        order.sub_orders.filter(producer=self.other_producer).update(status='CANCELLED')
+        self.assertTrue(order.cancel())
+        self.assertEqual(stock(self.carrots), 12)
+        self.assertEqual(stock(self.apples), 10)
+
+    def test_shipped_sub_order_blocks_cancellation(self):
+        order = make_order(self.consumer, [(self.carrots, 2), (self.apples, 3)])
+        order.sub_orders.filter(producer=self.other_producer).update(status='SHIPPED')
+        self.assertFalse(order.cancel())
+        self.assertEqual(stock(self.carrots), 10)
+
+
+def checkout(consumer, *products):
+    """Check out one unit of each product as ``consumer``; returns the response."""
+    cart = Cart.objects.create(consumer=consumer)
+    for product in products:
+        cart.add_product(product, 1)
+    client = APIClient()
+    client.force_authenticate(consumer)
+    return client.post('/api/orders/create-from-cart/', {
+        'delivery_address': '3 place Bellecour', 'delivery_city': 'Lyon',
+        'delivery_postal_code': '69002',
+    }, format='json')
+
+
+def orders_count(producer):
+    return Producer.objects.values_list('orders_count', flat=True).get(pk=producer.pk)
+
+
+class CheckoutTests(CatalogFixtureMixin, TestCase):
+
+    def test_producer_order_counts_are_bumped_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(checkout(self.consumer, self.carrots, self.apples).status_code, 201)
+            self.assertEqual(orders_count(self.producer), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(orders_count(self.producer), 1)
+        self.assertEqual(orders_count(self.other_producer), 1)
+
+
+class ExportTests(CatalogFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = [make_order(self.consumer, [(self.carrots, 1)]) for _ in range(3)]
+
+    def test_streams_every_order(self):
+        self.client.force_login(self.consumer)
+        response = self.client.get('/api/orders/export/', {'export_format': 'ndjson'})
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_keyset_pagination_without_server_side_cursors(self):
+        # Même date pour toutes : l'ordre repose sur l'id
+        Order.objects.update(order_date=timezone.now())
+        make_order(self.consumer, [(self.carrots, 1), (self.apples, 2)])
+        expected_orders = list(exports.export_order_rows(Order.objects.all()))
+        expected_items = list(exports.export_order_item_rows(OrderItem.objects.all()))
+        with mock.patch.dict(connections['default'].settings_dict, DISABLE_SERVER_SIDE_CURSORS=True), \
+                mock.patch.object(exports, 'EXPORT_CHUNK_SIZE', 2):
+            # 2 + 2 lignes, puis une page vide
+            with self.assertNumQueries(3):
+                self.assertEqual(list(exports.export_order_rows(Order.objects.all())), expected_orders)
+            with self.assertNumQueries(3):
+                self.assertEqual(list(exports.export_order_item_rows(OrderItem.objects.all())), expected_items)
+        self.assertEqual(len(expected_orders), 4)
+        self.assertEqual(len(expected_items), 5)
+
+    async def test_asgi_export_is_an_async_stream(self):
+        client = AsyncClient()
+        await client.aforce_login(self.consumer)
+        response = await client.get('/api/orders/export/', headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join([chunk async for chunk in response.streaming_content]))
+        header, *rows = body.decode().splitlines()
+        self.assertTrue(header.startswith('id,order_number'))
+        self.assertEqual(len(rows), 3)
+
+
+class NotifyConsumerTests(CatalogFixtureMixin, TestCase):
+
+    def notify(self, event):
+        events.notify_consumer(OutboxEvent.objects.get(pk=event.pk))
+
+    def test_emails_the_consumer_when_an_order_is_cancelled(self):
+        order = make_order(self.consumer, [(self.carrots, 2)])
+        self.notify(events.publish_order_cancelled(order, reason='Rupture'))
+        [message] = mail.outbox
+        self.assertEqual(message.to, ['consumer@example.com'])
+        self.assertEqual(message.subject, f'Votre commande {order.order_number} est annulée')
+        self.assertIn('Motif : Rupture', message.body)
+
+    def test_status_change_names_the_new_status(self):
+        order = make_order(self.consumer, [(self.carrots, 2)])
+        sub_order = order.sub_orders.get()
+        sub_order.status = 'SHIPPED'
+        self.notify(events.publish_status_changed(order, sub_order, 'PENDING'))
+        self.assertEqual(mail.outbox[0].subject, f'Votre commande {order.order_number} : Expédiée')
+
+    @override_settings(
+        OUTBOX_HANDLERS={'order.*': ['orders.events.notify_consumer', 'api.outbox.deliver_webhooks']},
+        OUTBOX_WEBHOOK_URLS=['http://127.0.0.1:9/'], OUTBOX_MAX_ATTEMPTS=3,
+    )
+    def test_failing_webhook_does_not_resend_the_email(self):
+        outbox._handler_cache.clear()
+        self.addCleanup(outbox._handler_cache.clear)
+        event = events.publish_order_created(make_order(self.consumer, [(self.carrots, 2)]), [])
+        for _ in range(3):
+            OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+            self.assertEqual(outbox.drain(), (0, 1))
+        self.assertEqual(OutboxEvent.objects.get(pk=event.pk).status, 'FAILED')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_inactive_consumer_is_not_emailed(self):
+        order = make_order(self.consumer, [(self.carrots, 2)])
+        User.objects.filter(pk=self.consumer.pk).update(is_active=False)
+        self.notify(events.publish_order_created(order, []))
+        self.assertEqual(mail.outbox, [])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+@override_settings(DB_RETRY_MAX_ATTEMPTS=50, DB_RETRY_BUDGET_SECONDS=30)
+class ConcurrentStockTests(CatalogFixtureMixin, TransactionTestCase):
+    """Cancellations and checkouts racing on the same rows (PostgreSQL, SERIALIZABLE)."""
+
+    def run_concurrently(self, *functions):
+        """Start every function at once, each in its own thread and connection."""
+        barrier = threading.Barrier(len(functions))
+        results = [None] * len(functions)
+
+        def run(index, function):
+            try:
+                barrier.wait()
+                results[index] = function()
+            except Exception as exc:  # noqa: BLE001 - remonté par le test
+                results[index] = exc
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=item) for item in enumerate(functions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def cancel(self, order):
+        return atomic_with_retry(lambda: Order.objects.get(pk=order.pk).cancel())
+
+    def checkout(self, product):
+        """A new consumer checking out one unit of ``product``; returns the HTTP status."""
+        consumer = make_user(f'buyer{User.objects.count()}')
+        return lambda: checkout(consumer, product).status_code
+
+    def test_concurrent_cancellations_restore_stock_once(self):
+        order = make_order(self.consumer, [(self.carrots, 2), (self.apples, 3)])
+        results = self.run_concurrently(*[self.cancel(order) for _ in range(6)])
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(stock(self.carrots), 12)
+        self.assertEqual(stock(self.apples), 13)
+
+    def test_cancellation_racing_checkouts_loses_no_update(self):
+        order = make_order(self.consumer, [(self.carrots, 4)])
+        checkouts = [self.checkout(self.carrots) for _ in range(5)]
+        results = self.run_concurrently(self.cancel(order), *checkouts)
+        self.assertEqual(results, [True] + [201] * 5)
+        self.assertEqual(stock(self.carrots), 10 + 4 - 5)
+        self.assertEqual(orders_count(self.producer), 5)
+
+    def test_concurrent_bulk_increases_add_up(self):
+        increase = atomic_with_retry(
+            lambda: Product.increase_stock_bulk({self.carrots.pk: 1, self.apples.pk: 2})
+        )
+        self.run_concurrently(*[increase] * 8)
+        self.assertEqual(stock(self.carrots), 18)
+        self.assertEqual(stock(self.apples), 26)
@@ -8,6 +8,7 @@ from . import views
 # Create router for ViewSets
 router = DefaultRouter()
 router.register(r'orders', views.OrderViewSet, basename='order')
+router.register(r'sub-orders', views.SubOrderViewSet, basename='suborder')
 
 app_name = 'orders'
 
@@ -17,6 +18,8 @@ urlpatterns = [
     path('producer-orders/', views.producer_orders, name='producer_orders'),
     path('create-from-cart/', views.create_order_from_cart, name='create_from_cart'),
     path('statistics/', views.order_statistics, name='statistics'),
+    path('export/', views.export_orders, name='export_orders'),
+    path('export/items/', views.export_order_items, name='export_order_items'),
     path('<uuid:order_id>/', views.order_detail, name='order_detail'),
     
     # ViewSet routes
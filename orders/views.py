@@ -1,16 +1,27 @@
 """
 API views for orders management in GreenCart.
 """
+from decimal import Decimal
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Prefetch, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.openapi import OpenApiTypes, OpenApiResponse
 
-from .models import Order, OrderItem, OrderStatusHistory
+from asgiref.sync import sync_to_async
+
+from accounts.roles import get_producer
+from core.async_views import AsyncRetrieveModelMixin, aiterate, async_api_view, is_asgi_request
+from core.db import atomic_with_retry
+from core.throttling import CheckoutThrottle
+from .models import Order, OrderItem, OrderStatusHistory, SubOrder
 from .serializers import (
     OrderSerializer,
     OrderListSerializer,
@@ -18,10 +29,34 @@ from .serializers import (
     CreateOrderSerializer,
     UpdateOrderStatusSerializer,
     CancelOrderSerializer,
-    OrderStatusHistorySerializer
+    OrderStatusHistorySerializer,
+    SubOrderSerializer
+)
+from .exports import (
+    EXPORT_FORMATS,
+    ORDER_EXPORT_FIELDS,
+    ORDER_ITEM_EXPORT_FIELDS,
+    ExportFilterError,
+    export_order_item_rows,
+    export_order_rows,
+    filter_orders,
+    order_items_for_user,
+    orders_for_user,
+    stream_export,
 )
 
 
+def with_order_details(queryset):
+    """Load everything ``OrderSerializer`` renders (required by the async views)."""
+    return queryset.prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related(
+            'product__producer', 'product__category', 'producer__user'
+        )),
+        Prefetch('status_history', queryset=OrderStatusHistory.objects.select_related('changed_by')),
+        Prefetch('sub_orders', queryset=SubOrder.objects.select_related('producer')),
+    )
+
+
 @extend_schema_view(
     list=extend_schema(
         tags=['Orders'],
@@ -58,8 +93,8 @@ from .serializers import (
         description="Supprime une commande (admin uniquement)"
     )
 )
-class OrderViewSet(viewsets.ModelViewSet):
-    """ViewSet for orders management."""
+class OrderViewSet(AsyncRetrieveModelMixin, viewsets.ModelViewSet):
+    """ViewSet for orders management (detail is async)."""
     
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -76,21 +111,31 @@ class OrderViewSet(viewsets.ModelViewSet):
             return CreateOrderSerializer
         return OrderSerializer
     
+    def get_throttles(self):
+        """Order creation uses the checkout budget."""
+        if self.action == 'create':
+            return [CheckoutThrottle()]
+        return super().get_throttles()
+    
     def get_queryset(self):
         """Filter queryset based on user type."""
         user = self.request.user
         
         if user.is_staff or user.is_superuser:
             # Staff can see all orders
-            return Order.objects.all()
-        elif hasattr(user, 'producer_profile'):
-            # Producers can see orders containing their products
-            return Order.objects.filter(
-                items__producer=user.producer_profile
-            ).distinct()
+            queryset = Order.objects.all()
         else:
-            # Consumers can only see their own orders
-            return Order.objects.filter(consumer=user)
+            producer = get_producer(user)
+            if producer is not None:
+                # Producers can see orders they have a sub-order in
+                queryset = Order.objects.filter(sub_orders__producer=producer)
+            else:
+                # Consumers can only see their own orders
+                queryset = Order.objects.filter(consumer=user)
+        
+        if self.action == 'retrieve':
+            queryset = with_order_details(queryset)
+        return queryset
     
     def perform_create(self, serializer):
         """Create order from user's cart."""
@@ -155,14 +200,15 @@ class OrderViewSet(viewsets.ModelViewSet):
         order = self.get_object()
         
         # Only producers involved in the order can update status
-        if not hasattr(request.user, 'producer_profile'):
+        producer = get_producer(request.user)
+        if producer is None:
             return Response(
                 {'error': 'Only producers can update order status.'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        producer = request.user.producer_profile
-        if not order.items.filter(producer=producer).exists():
+        sub_order = order.sub_orders.filter(producer=producer).first()
+        if sub_order is None:
             return Response(
                 {'error': 'You can only update status for orders containing your products.'},
                 status=status.HTTP_403_FORBIDDEN
@@ -170,7 +216,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         serializer = UpdateOrderStatusSerializer(
             data=request.data,
-            context={'order': order, 'request': request}
+            context={'order': order, 'sub_order': sub_order, 'request': request}
         )
         
         if serializer.is_valid():
@@ -187,6 +233,45 @@ class OrderViewSet(viewsets.ModelViewSet):
         )
 
 
+@extend_schema_view(
+    list=extend_schema(
+        tags=['Orders'],
+        summary="Mes sous-commandes",
+        description="Récupère les sous-commandes du producteur connecté (toutes pour le staff)",
+        parameters=[
+            OpenApiParameter('status', OpenApiTypes.STR, description='Filtrer par statut de sous-commande'),
+        ]
+    ),
+    retrieve=extend_schema(
+        tags=['Orders'],
+        summary="Détail d'une sous-commande",
+        description="Récupère une sous-commande du producteur connecté"
+    )
+)
+class SubOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for producer fulfilment sub-orders (read-only)."""
+    
+    serializer_class = SubOrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ['status']
+    ordering_fields = ['created_at', 'subtotal', 'status']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        """Producers see their own sub-orders, staff see all of them."""
+        user = self.request.user
+        queryset = SubOrder.objects.select_related('order', 'producer')
+        
+        if user.is_staff or user.is_superuser:
+            return queryset
+        
+        producer = get_producer(user)
+        if producer is not None:
+            return queryset.filter(producer=producer)
+        return queryset.none()
+
+
 @extend_schema(
     tags=['Orders'],
     summary="Mes commandes",
@@ -198,12 +283,13 @@ class OrderViewSet(viewsets.ModelViewSet):
 def my_orders(request):
     """Get current user's orders."""
     user = request.user
+    producer = get_producer(user)
     
-    if hasattr(user, 'producer_profile'):
-        # Producer - get orders containing their products
+    if producer is not None:
+        # Producer - get orders they have a sub-order in
         orders = Order.objects.filter(
-            items__producer=user.producer_profile
-        ).distinct().order_by('-order_date')
+            sub_orders__producer=producer
+        ).order_by('-order_date')
     else:
         # Consumer - get their own orders
         orders = Order.objects.filter(consumer=user).order_by('-order_date')
@@ -232,21 +318,19 @@ def my_orders(request):
 @permission_classes([permissions.IsAuthenticated])
 def producer_orders(request):
     """Get orders for current producer."""
-    if not hasattr(request.user, 'producer_profile'):
+    producer = get_producer(request.user)
+    if producer is None:
         return Response(
             {'error': 'Only producers can access this endpoint.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    producer = request.user.producer_profile
-    orders = Order.objects.filter(
-        items__producer=producer
-    ).distinct().order_by('-order_date')
-    
-    # Add filtering options
+    # Add filtering options (on the producer's own sub-order status)
+    filters = {'sub_orders__producer': producer}
     status_filter = request.query_params.get('status')
     if status_filter:
-        orders = orders.filter(status=status_filter)
+        filters['sub_orders__status'] = status_filter
+    orders = Order.objects.filter(**filters).order_by('-order_date')
     
     serializer = OrderListSerializer(orders, many=True)
     return Response(serializer.data)
@@ -261,12 +345,12 @@ def producer_orders(request):
         403: OpenApiResponse(description="Permission denied")
     }
 )
-@api_view(['GET'])
+@async_api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def order_detail(request, order_id):
+async def order_detail(request, order_id):
     """Get order details."""
     try:
-        order = Order.objects.get(id=order_id)
+        order = await with_order_details(Order.objects.all()).aget(id=order_id)
     except Order.DoesNotExist:
         return Response(
             {'error': 'Order not found.'},
@@ -275,14 +359,15 @@ def order_detail(request, order_id):
     
     # Check permissions
     user = request.user
+    producer = await sync_to_async(get_producer)(user)
     if user.is_staff or user.is_superuser:
         # Staff can see all orders
         pass
-    elif order.consumer == user:
+    elif order.consumer_id == user.pk:
         # Consumer can see their own order
         pass
-    elif (hasattr(user, 'producer_profile') and 
-          order.items.filter(producer=user.producer_profile).exists()):
+    elif (producer is not None and
+          any(sub_order.producer_id == producer.pk for sub_order in order.sub_orders.all())):
         # Producer can see orders containing their products
         pass
     else:
@@ -307,15 +392,21 @@ def order_detail(request, order_id):
 )
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([CheckoutThrottle])
 def create_order_from_cart(request):
     """Create order from user's cart."""
-    serializer = CreateOrderSerializer(
-        data=request.data,
-        context={'request': request}
-    )
+    # Validation et création dans la même transaction : sous SERIALIZABLE,
+    # les lectures de la validation peuvent elles aussi échouer et être rejouées
+    @atomic_with_retry
+    def place_order():
+        serializer = CreateOrderSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        return serializer, serializer.save() if serializer.is_valid() else None
     
-    if serializer.is_valid():
-        order = serializer.save()
+    serializer, order = place_order()
+    if order is not None:
         order_serializer = OrderSerializer(order)
         return Response({
             'message': 'Order created successfully.',
@@ -354,26 +445,22 @@ def create_order_from_cart(request):
 def order_statistics(request):
     """Get order statistics."""
     user = request.user
+    producer = get_producer(user)
     
-    if hasattr(user, 'producer_profile'):
-        # Producer statistics
-        producer = user.producer_profile
-        orders = Order.objects.filter(items__producer=producer).distinct()
-        
-        stats = {
-            'total_orders': orders.count(),
-            'pending_orders': orders.filter(status='PENDING').count(),
-            'confirmed_orders': orders.filter(status='CONFIRMED').count(),
-            'shipped_orders': orders.filter(status='SHIPPED').count(),
-            'delivered_orders': orders.filter(status='DELIVERED').count(),
-            'cancelled_orders': orders.filter(status='CANCELLED').count(),
-            'total_revenue': sum(
-                item.total_price for item in OrderItem.objects.filter(
-                    producer=producer,
-                    order__status='DELIVERED'
-                )
+    if producer is not None:
+        # Producer statistics, from the producer's own sub-orders (one query)
+        stats = SubOrder.objects.filter(producer=producer).aggregate(
+            total_orders=Count('id'),
+            pending_orders=Count('id', filter=Q(status='PENDING')),
+            confirmed_orders=Count('id', filter=Q(status='CONFIRMED')),
+            shipped_orders=Count('id', filter=Q(status='SHIPPED')),
+            delivered_orders=Count('id', filter=Q(status='DELIVERED')),
+            cancelled_orders=Count('id', filter=Q(status='CANCELLED')),
+            total_revenue=Coalesce(
+                Sum('subtotal', filter=Q(status='DELIVERED')),
+                Decimal('0')
             )
-        }
+        )
     else:
         # Consumer statistics
         orders = Order.objects.filter(consumer=user)
@@ -390,4 +477,89 @@ def order_statistics(request):
             )
         }
     
-    return Response(stats)
\ No newline at end of file
+    return Response(stats)
+
+
+EXPORT_PARAMETERS = [
+    OpenApiParameter('export_format', OpenApiTypes.STR, description='Format du fichier: csv (défaut) ou ndjson'),
+    OpenApiParameter('status', OpenApiTypes.STR, description='Filtrer par statut de commande'),
+    OpenApiParameter('date_from', OpenApiTypes.DATE, description='Commandes passées à partir de cette date (incluse)'),
+    OpenApiParameter('date_to', OpenApiTypes.DATE, description='Commandes passées jusqu\'à cette date (incluse)'),
+]
+
+
+def _streaming_export(request, queryset, row_factory, fieldnames, basename, prefix=''):
+    """Build a streaming CSV/NDJSON response for an export request."""
+    export_format = request.query_params.get('export_format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Unsupported export format '{export_format}'. Use csv or ndjson."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        queryset = filter_orders(
+            queryset,
+            status=request.query_params.get('status'),
+            date_from=request.query_params.get('date_from'),
+            date_to=request.query_params.get('date_to'),
+            prefix=prefix,
+        )
+    except ExportFilterError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    content = stream_export(row_factory(queryset), fieldnames, export_format)
+    if is_asgi_request(request):
+        # Sinon Django lirait tout l'export en mémoire avant de l'envoyer
+        content = aiterate(content)
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    filename = f"{basename}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@extend_schema(
+    tags=['Orders'],
+    summary="Exporter les commandes",
+    description="Exporte l'historique des commandes en flux CSV ou NDJSON (mémoire constante quelle que soit la taille de l'historique)",
+    parameters=EXPORT_PARAMETERS,
+    responses={
+        200: OpenApiResponse(description="Fichier CSV ou NDJSON"),
+        400: OpenApiResponse(description="Filtres invalides")
+    }
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_orders(request):
+    """Stream the user's order history as CSV or NDJSON."""
+    return _streaming_export(
+        request,
+        orders_for_user(request.user),
+        export_order_rows,
+        ORDER_EXPORT_FIELDS,
+        'orders'
+    )
+
+
+@extend_schema(
+    tags=['Orders'],
+    summary="Exporter les lignes de commande",
+    description="Exporte les articles commandés en flux CSV ou NDJSON (les producteurs ne voient que leurs propres lignes)",
+    parameters=EXPORT_PARAMETERS,
+    responses={
+        200: OpenApiResponse(description="Fichier CSV ou NDJSON"),
+        400: OpenApiResponse(description="Filtres invalides")
+    }
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_order_items(request):
+    """Stream the user's order lines as CSV or NDJSON."""
+    return _streaming_export(
+        request,
+        order_items_for_user(request.user),
+        export_order_item_rows,
+        ORDER_ITEM_EXPORT_FIELDS,
+        'order-items',
+        prefix='order__'
+    )
\ No newline at end of file
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
-    verbose_name = 'Products'
\ No newline at end of file
+    verbose_name = 'Products'
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import products.signals  # noqa
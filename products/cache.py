@@ -0,0 +1,150 @@
+"""
+Response cache for the public catalog.
+
+``CatalogCacheMiddleware`` caches the ``GET`` responses of the viewset
+actions listed in ``cached_actions`` (product and category lists and
+details, ...). These actions are public and render the same document for
+every user, so a hit is answered before sessions, authentication and DRF
+throttling. Requests carrying credentials (``Authorization`` header or
+session cookie) bypass the cache: they go through authentication, so an
+invalid token is rejected whether or not the page is cached. Entries are keyed by absolute URL (pagination links) and
+``Accept`` (JSON, MessagePack, ...), and kept ``CATALOG_CACHE_TIMEOUT``
+seconds.
+
+Each entry stores the body together with its gzip and brotli variants,
+compressed once at dense levels; ``CompressionMiddleware`` sends the
+variant the client accepts without compressing it again.
+
+Saving or deleting a product, an image, a category or a producer bumps the
+catalog version, which invalidates every entry; so do the bulk updates of
+``accounts/bulk.py``. Stock changes made by orders (``update()``, no
+signal) show up when entries expire. Clients that just wrote
+(read-your-writes cookie, see ``core/db_router.py``) bypass the cache.
+
+The version lives in the default cache, so the cache is only used when
+that cache is shared by every worker (``core.caches.cache_is_shared``):
+with ``LocMemCache`` an invalidation would only reach one process.
+"""
+import hashlib
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from core.caches import cache_is_shared, carries_credentials
+from core.compression import compress_variants
+from core.metrics import record_cache_lookup
+
+CATALOG_VERSION_KEY = 'products:catalog_version'
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def cached_match(request):
+    """Resolver match of a cacheable catalog request, or ``None``."""
+    if (not settings.CATALOG_CACHE_TIMEOUT or not cache_is_shared() or request.method != 'GET'
+            or settings.DATABASE_PIN_COOKIE in request.COOKIES or carries_credentials(request)):
+        return None
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    action = getattr(match.func, 'actions', {}).get('get')
+    if action is None or action not in getattr(getattr(match.func, 'cls', None), 'cached_actions', ()):
+        return None
+    return match
+
+
+def cache_key(request):
+    variant = f"{request.build_absolute_uri()}\n{request.headers.get('Accept', '')}"
+    return 'products:catalog:' + hashlib.md5(variant.encode()).hexdigest()
+
+
+def cacheable(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def entry_for(response, version, variants):
+    return {
+        'version': version,
+        'headers': list(response.items()),
+        'content': response.content,
+        'variants': variants,
+    }
+
+
+def response_for(entry):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers']:
+        response.headers[header] = value
+    response.compressed_variants = entry['variants']
+    return response
+
+
+class CatalogCacheMiddleware:
+    """Serve catalog responses, and their compressed variants, from the cache."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def lookup(self, key, cached):
+        """``(fresh entry or None, version)`` from ``get_many()`` results."""
+        version = cached.get(CATALOG_VERSION_KEY)
+        entry = cached.get(key)
+        if entry is not None and entry['version'] != version:
+            entry = None
+        record_cache_lookup('catalog', entry is not None)
+        return entry, version
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = cached_match(request)
+        if match is None:
+            return self.get_response(request)
+        key = cache_key(request)
+        entry, version = self.lookup(key, cache.get_many([CATALOG_VERSION_KEY, key]))
+        if entry is not None:
+            request.resolver_match = match
+            return response_for(entry)
+        if version is None:
+            version = cache.get_or_set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+        response = self.get_response(request)
+        if cacheable(response):
+            response.compressed_variants = compress_variants(response)
+            cache.set(key, entry_for(response, version, response.compressed_variants),
+                      settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    async def __acall__(self, request):
+        match = cached_match(request)
+        if match is None:
+            return await self.get_response(request)
+        key = cache_key(request)
+        entry, version = self.lookup(key, await cache.aget_many([CATALOG_VERSION_KEY, key]))
+        if entry is not None:
+            request.resolver_match = match
+            return response_for(entry)
+        if version is None:
+            version = await cache.aget_or_set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+        response = await self.get_response(request)
+        if cacheable(response):
+            # Compression dense : hors de la boucle d'événements
+            response.compressed_variants = await sync_to_async(
+                compress_variants, thread_sensitive=False
+            )(response)
+            await cache.aset(key, entry_for(response, version, response.compressed_variants),
+                             settings.CATALOG_CACHE_TIMEOUT)
+        return response
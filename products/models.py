@@ -192,6 +192,18 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.name} - {self.producer.business_name}"
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Producteur enregistré, pour recompter aussi l'ancien quand le produit change de producteur
+        self._loaded_producer_id = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # None : producer_id différé, valeur enregistrée inconnue
+        instance._loaded_producer_id = instance.__dict__.get('producer_id')
+        return instance
+    
     @property
     def is_available(self):
         """Vérifie si le produit est disponible."""
@@ -210,17 +222,44 @@ class Product(models.Model):
         return f"{self.price}€ / {self.get_unit_display().lower()}"
     
     def reduce_stock(self, quantity):
-        """Réduit le stock du produit."""
-        if self.quantity_available >= quantity:
+        """
+        Réduit le stock du produit.
+
+        The check and the decrement happen in a single conditional UPDATE,
+        so concurrent checkouts can never oversell or lose an update.
+        """
+        updated = Product.objects.filter(
+            pk=self.pk,
+            quantity_available__gte=quantity
+        ).update(quantity_available=models.F('quantity_available') - quantity)
+        if updated:
             self.quantity_available -= quantity
-            self.save(update_fields=['quantity_available'])
-            return True
-        return False
+        return bool(updated)
     
     def increase_stock(self, quantity):
         """Augmente le stock du produit."""
+        Product.objects.filter(pk=self.pk).update(
+            quantity_available=models.F('quantity_available') + quantity
+        )
         self.quantity_available += quantity
-        self.save(update_fields=['quantity_available'])
+    
+    @classmethod
+    def increase_stock_bulk(cls, quantities):
+        """
+        Augmente le stock de plusieurs produits en une seule requête.
+
+        ``quantities`` maps product ids to the quantity to add back.
+        """
+        if not quantities:
+            return 0
+        return cls.objects.filter(pk__in=quantities.keys()).update(
+            quantity_available=models.F('quantity_available') + models.Case(
+                *[models.When(pk=pk, then=models.Value(quantity))
+                  for pk, quantity in quantities.items()],
+                default=models.Value(0),
+                output_field=models.PositiveIntegerField()
+            )
+        )
 
 
 class ProductImage(models.Model):
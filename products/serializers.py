@@ -5,6 +5,7 @@ from rest_framework import serializers
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field
 from .models import Category, Product, ProductImage
+from accounts.roles import get_producer
 from accounts.serializers import ProducerSerializer
 
 
@@ -23,7 +24,9 @@ class CategorySerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.IntegerField)
     def get_products_count(self, obj):
-        """Count active products in this category."""
+        """Count active products in this category (annotated by the catalog views)."""
+        if hasattr(obj, 'active_products_count'):
+            return obj.active_products_count
         return obj.products.filter(is_active=True).count()
 
 
@@ -92,8 +95,9 @@ class ProductSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create product with producer from request user."""
         request = self.context.get('request')
-        if request and hasattr(request.user, 'producer_profile'):
-            validated_data['producer'] = request.user.producer_profile
+        producer = get_producer(request.user) if request else None
+        if producer is not None:
+            validated_data['producer'] = producer
         return super().create(validated_data)
 
 
@@ -163,8 +167,9 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         validated_data['category'] = validated_data.pop('category_id')
         
-        if request and hasattr(request.user, 'producer_profile'):
-            validated_data['producer'] = request.user.producer_profile
+        producer = get_producer(request.user) if request else None
+        if producer is not None:
+            validated_data['producer'] = producer
         
         return Product.objects.create(**validated_data)
     
@@ -0,0 +1,36 @@
+"""
+Signals for the products app.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.counters import refresh_catalog_counters
+from accounts.models import Producer
+from .cache import invalidate_catalog
+from .models import Category, Product, ProductImage
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def update_producer_catalog(sender, instance, **kwargs):
+    """Keep the producer's active product count and catalog date current."""
+    refresh_catalog_counters(instance.producer_id)
+    previous = instance._loaded_producer_id
+    if previous is not None and previous != instance.producer_id:
+        # Produit déplacé : l'ancien producteur le perd
+        refresh_catalog_counters(previous)
+    instance._loaded_producer_id = instance.producer_id
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Producer)
+@receiver(post_delete, sender=Producer)
+def expire_catalog_cache(sender, instance, **kwargs):
+    """Drop cached catalog responses once the change is committed."""
+    transaction.on_commit(invalidate_catalog)
@@ -1 +1,113 @@
-# Tests will be implemented later
\ No newline at end of file
+"""
+Tests for the catalog response cache and the producer catalog counters.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.bulk import bulk_update_producers
+from accounts.models import Producer, User
+
+from .cache import CATALOG_VERSION_KEY
+from .models import Category, Product
+
+CATEGORIES_URL = '/api/products/categories/'
+
+
+class SharedCache(LocMemCache):
+    """Stands in for Redis: a backend that ``cache_is_shared()`` accepts."""
+
+
+SHARED_CACHES = {'default': {'BACKEND': 'products.tests.SharedCache', 'LOCATION': 'catalog'}}
+
+
+@override_settings(CACHES=SHARED_CACHES, CATALOG_CACHE_TIMEOUT=60)
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        Category.objects.create(name='Légumes')
+        self.addCleanup(cache.clear)
+
+    def queries(self, **headers):
+        """Number of queries run to answer a categories list request."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(CATEGORIES_URL, headers=headers)
+        self.status = response.status_code
+        return len(queries)
+
+    def test_hit_runs_no_query(self):
+        self.assertGreater(self.queries(), 0)
+        self.assertEqual(self.queries(), 0)
+        self.assertEqual(self.status, 200)
+
+    def test_requests_with_credentials_bypass_the_cache(self):
+        # Authentifiées à chaque fois : un token invalide est rejeté, en cache ou non
+        self.queries()
+        self.assertGreater(self.queries(Authorization='Token bogus'), 0)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = 'unknown'
+        self.assertGreater(self.queries(), 0)
+        self.assertEqual(self.status, 200)
+
+    def test_bulk_producer_update_invalidates_the_catalog(self):
+        user = User.objects.create_user(
+            username='ferme', email='ferme@example.com', password='testpass123', user_type='PRODUCER'
+        )
+        Producer.objects.create(
+            user=user, business_name='Ferme', address='1 rue des Champs', city='Lyon',
+            postal_code='69001', region='Auvergne-Rhône-Alpes',
+        )
+        self.queries()
+        version = cache.get(CATALOG_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_producers(Producer.objects.all(), is_verified=True)
+        self.assertNotEqual(cache.get(CATALOG_VERSION_KEY), version)
+        self.assertGreater(self.queries(), 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_not_used(self):
+        self.queries()
+        self.assertGreater(self.queries(), 0)
+
+
+def make_producer(name):
+    user = User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='testpass123', user_type='PRODUCER'
+    )
+    return Producer.objects.create(
+        user=user, business_name=name.title(), address='1 rue des Champs', city='Lyon',
+        postal_code='69001', region='Auvergne-Rhône-Alpes',
+    )
+
+
+class ProducerCatalogCounterTests(TestCase):
+
+    def setUp(self):
+        self.first, self.second = make_producer('ferme'), make_producer('verger')
+        self.product = Product.objects.create(
+            producer=self.first, category=Category.objects.create(name='Fruits'), name='Pommes',
+            description='Pommes', price='3.00', quantity_available=10,
+        )
+
+    def counts(self):
+        return [
+            Producer.objects.values_list('active_products_count', flat=True).get(pk=producer.pk)
+            for producer in (self.first, self.second)
+        ]
+
+    def test_moving_a_product_recounts_both_producers(self):
+        self.assertEqual(self.counts(), [1, 0])
+        product = Product.objects.get(pk=self.product.pk)
+        product.producer = self.second
+        product.save()
+        self.assertEqual(self.counts(), [0, 1])
+        # Le produit déplacé ne recompte plus l'ancien producteur
+        with self.assertNumQueries(2):
+            product.save(update_fields=['quantity_available'])
+
+    def test_moving_a_new_instance_recounts_both_producers(self):
+        self.product.producer = self.second
+        self.product.save()
+        self.assertEqual(self.counts(), [0, 1])
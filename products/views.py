@@ -8,10 +8,13 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from django.db import models
+from django.db.models import Count, Q
 from datetime import timedelta
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.openapi import OpenApiTypes
 
+from accounts.roles import get_producer
+from core.async_views import AsyncListModelMixin, AsyncRetrieveModelMixin
 from .models import Category, Product, ProductImage
 from .serializers import (
     CategorySerializer,
@@ -38,12 +41,17 @@ from .serializers import (
         description="Récupère les détails d'une catégorie spécifique"
     )
 )
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for product categories (read-only)."""
+class CategoryViewSet(AsyncListModelMixin, AsyncRetrieveModelMixin, viewsets.ReadOnlyModelViewSet):
+    """ViewSet for product categories (read-only, async)."""
     
-    queryset = Category.objects.all()
+    queryset = Category.objects.annotate(
+        active_products_count=Count('products', filter=Q(products__is_active=True))
+    )
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'catalog'
+    # Réponses identiques pour tous : servies par le cache du catalogue (products/cache.py)
+    cached_actions = ['list', 'retrieve']
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
@@ -93,11 +101,13 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         description="Supprime un produit (producteur propriétaire uniquement)"
     )
 )
-class ProductViewSet(viewsets.ModelViewSet):
-    """ViewSet for products management."""
+class ProductViewSet(AsyncListModelMixin, AsyncRetrieveModelMixin, viewsets.ModelViewSet):
+    """ViewSet for products management (list and detail are async)."""
     
     queryset = Product.objects.filter(is_active=True)
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'catalog'
+    cached_actions = ['list', 'retrieve', 'featured', 'by_region']
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['category', 'producer', 'is_organic', 'is_local']
     search_fields = ['name', 'description', 'producer__business_name']
@@ -154,12 +164,28 @@ class ProductViewSet(viewsets.ModelViewSet):
         if available_only and available_only.lower() == 'true':
             queryset = queryset.filter(quantity_available__gt=0)
         
+        # Load what the serializers render (required by the async actions)
+        if self.action in ['list', 'featured']:
+            queryset = queryset.select_related('producer', 'category')
+        elif self.action == 'retrieve':
+            queryset = queryset.select_related('producer__user', 'category').prefetch_related('images')
+        
         return queryset
     
+    async def retrieve(self, request, *args, **kwargs):
+        """Product detail; the nested category count is fetched asynchronously too."""
+        product = await self.aget_object()
+        product.category.active_products_count = await Product.objects.filter(
+            category_id=product.category_id, is_active=True
+        ).acount()
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
+    
     def perform_create(self, serializer):
         """Create product with producer from current user."""
-        if hasattr(self.request.user, 'producer_profile'):
-            serializer.save(producer=self.request.user.producer_profile)
+        producer = get_producer(self.request.user)
+        if producer is not None:
+            serializer.save(producer=producer)
         else:
             return Response(
                 {'error': 'Only producers can create products.'},
@@ -168,8 +194,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         """Update product - only producer owner can update."""
-        if (hasattr(self.request.user, 'producer_profile') and 
-            self.get_object().producer == self.request.user.producer_profile):
+        producer = get_producer(self.request.user)
+        if producer is not None and serializer.instance.producer_id == producer.pk:
             serializer.save()
         else:
             return Response(
@@ -179,8 +205,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         """Delete product - only producer owner can delete."""
-        if (hasattr(self.request.user, 'producer_profile') and 
-            instance.producer == self.request.user.producer_profile):
+        producer = get_producer(self.request.user)
+        if producer is not None and instance.producer_id == producer.pk:
             instance.delete()
         else:
             return Response(
@@ -197,13 +223,14 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def my_products(self, request):
         """Get products of the current producer."""
-        if not hasattr(request.user, 'producer_profile'):
+        producer = get_producer(request.user)
+        if producer is None:
             return Response(
                 {'error': 'Only producers can access this endpoint.'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        products = Product.objects.filter(producer=request.user.producer_profile)
+        products = Product.objects.filter(producer=producer)
         page = self.paginate_queryset(products)
         
         if page is not None:
@@ -240,8 +267,6 @@ class ProductViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_region(self, request):
         """Get products grouped by producer region."""
-        from django.db.models import Count
-        
         regions = Product.objects.filter(is_active=True).values(
             'producer__region'
         ).annotate(
@@ -295,10 +320,9 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         """Filter images based on product ownership."""
         user = self.request.user
         
-        if hasattr(user, 'producer_profile'):
-            return ProductImage.objects.filter(
-                product__producer=user.producer_profile
-            )
+        producer = get_producer(user)
+        if producer is not None:
+            return ProductImage.objects.filter(product__producer=producer)
         
         return ProductImage.objects.none()
     
@@ -306,8 +330,8 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         """Create image only if user owns the product."""
         product = serializer.validated_data['product']
         
-        if (hasattr(self.request.user, 'producer_profile') and 
-            product.producer == self.request.user.producer_profile):
+        producer = get_producer(self.request.user)
+        if producer is not None and product.producer_id == producer.pk:
             serializer.save()
         else:
             return Response(